@@ -0,0 +1,120 @@
+"""
+AI Request Scheduler for MockExamify
+Bounded concurrency and a shared rate limit for OpenRouter calls made from asyncio code
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# How often a request waiting for a concurrency slot checks again
+SLOT_POLL_SECONDS = 0.05
+
+
+class RateLimiter:
+    """
+    Spaces request starts evenly (requests_per_minute) across every thread and event loop
+    in the process. Streamlit's run_async may create a fresh loop per call, so the state
+    is guarded by a threading lock rather than an asyncio primitive.
+    """
+
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    async def acquire(self):
+        """Wait for the next free request slot"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def back_off(self, seconds: float):
+        """Hold all new requests for a while (e.g. after a 429 from the provider)"""
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+class AIScheduler:
+    """
+    Runs AI calls with at most max_concurrency in flight across every thread and event loop
+    in the process (e.g. files parsed concurrently on their own loops) and a shared
+    process-wide rate limit.
+    """
+
+    def __init__(self, max_concurrency: int, requests_per_minute: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+
+    async def _acquire_slot(self):
+        # Polled rather than waited for in a thread: a blocked thread per waiting request
+        # would exhaust the default executor, and a cancelled wait would leak its slot
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(SLOT_POLL_SECONDS)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one concurrency slot for the duration of a request"""
+        await self._acquire_slot()
+        try:
+            await self.rate_limiter.acquire()
+            yield
+        finally:
+            self._slots.release()
+
+    async def map_ordered(
+        self,
+        items: Sequence[Any],
+        worker: Callable[[int, Any], Awaitable[Any]],
+        on_progress: Optional[Callable[[int, int, int, Any], None]] = None,
+    ) -> List[Tuple[Any, Optional[Exception]]]:
+        """
+        Run worker(index, item) for every item concurrently; results come back in input order.
+
+        The worker is responsible for taking scheduler slots around its own requests (so
+        retries and follow-up requests are also bounded). A failing item does not cancel the
+        others - its exception is returned in place of a result.
+
+        Args:
+            items: Work items (e.g. document chunks)
+            worker: Async callable taking (index, item)
+            on_progress: Optional callback(completed, total, index, result) after each item
+
+        Returns:
+            List of (result, error) tuples in the same order as items
+        """
+        total = len(items)
+        results: List[Tuple[Any, Optional[Exception]]] = [(None, None)] * total
+        completed = 0
+
+        async def run(index: int, item: Any):
+            nonlocal completed
+            try:
+                results[index] = (await worker(index, item), None)
+            except Exception as e:
+                logger.error(f"Scheduled AI task {index + 1}/{total} failed: {e}")
+                results[index] = (None, e)
+            completed += 1
+            if on_progress:
+                try:
+                    on_progress(completed, total, index, results[index][0])
+                except Exception as e:
+                    logger.warning(f"Progress callback failed: {e}")
+
+        await asyncio.gather(*(run(i, item) for i, item in enumerate(items)))
+        return results
+
+
+# Global instance
+ai_scheduler = AIScheduler(config.AI_MAX_CONCURRENT_REQUESTS, config.AI_REQUESTS_PER_MINUTE)
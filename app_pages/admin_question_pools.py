@@ -8,7 +8,8 @@ import os
 import re
 import subprocess
 import sys
-from typing import Any, Dict, List
+import uuid
+from typing import Any, Dict, List, Optional
 
 import streamlit as st
 
@@ -95,6 +96,14 @@ def show_admin_question_pools():
                     st.session_state.pool_name = pool["pool_name"]
                     st.rerun()
 
+                if st.button(f"🧹 Find Duplicates", key=f"dedupe_{pool['id']}"):
+                    # Dry run first - nothing is marked until the admin confirms
+                    st.session_state.confirm_dedupe_pool = pool["id"]
+                    st.session_state.dedupe_dry_run_task = start_pool_dedupe(
+                        pool["id"], dry_run=True
+                    )
+                    st.rerun()
+
                 if st.button(f"🗑️ Delete Pool", key=f"delete_{pool['id']}", type="secondary"):
                     st.session_state.confirm_delete_pool = pool["id"]
                     st.rerun()
@@ -113,6 +122,10 @@ def show_admin_question_pools():
     if hasattr(st.session_state, "confirm_delete_pool") and st.session_state.confirm_delete_pool:
         show_delete_confirmation(st.session_state.confirm_delete_pool, pools)
 
+    # Handle duplicate marking confirmation
+    if hasattr(st.session_state, "confirm_dedupe_pool") and st.session_state.confirm_dedupe_pool:
+        show_dedupe_confirmation(st.session_state.confirm_dedupe_pool, pools)
+
 
 def show_pool_questions(pool_id: str):
     """Display questions in a specific pool"""
@@ -530,8 +543,21 @@ def show_background_task_status():
         # Get recent tasks
         tasks = get_recent_tasks(limit=5)
 
+        # OCR imports that failed or whose process died (their checkpoints are kept)
+        try:
+            from ocr_jobs import launch_job, list_resumable_jobs
+
+            resumable_jobs = list_resumable_jobs()
+        except Exception:
+            resumable_jobs = []
+        resumable_ids = {job["job_id"] for job in resumable_jobs}
+
         # Check if any are running
-        running_tasks = [t for t in tasks if t.get("status") == "running"]
+        running_tasks = [
+            t
+            for t in tasks
+            if t.get("status") == "running" and t.get("task_id") not in resumable_ids
+        ]
         completed_tasks = [t for t in tasks if t.get("status") == "completed"][:3]
         failed_tasks = [t for t in tasks if t.get("status") == "failed"][:2]
 
@@ -544,7 +570,7 @@ def show_background_task_status():
         )
 
         with st.expander(panel_title, expanded=running_count > 0):
-            if not tasks:
+            if not tasks and not resumable_jobs:
                 st.info(
                     "No background tasks. Tasks will appear here when you:\n"
                     "- Upload questions (auto AI fix)\n"
@@ -601,6 +627,25 @@ def show_background_task_status():
                             f"❌ {task.get('description', 'Task')} failed: {task.get('error_message', 'Unknown error')}"
                         )
 
+            # Interrupted OCR imports can be resumed from their last checkpoint
+            if resumable_jobs:
+                st.markdown("---")
+                st.markdown("**Interrupted OCR imports:**")
+                for job in resumable_jobs:
+                    col1, col2 = st.columns([3, 1])
+                    with col1:
+                        st.markdown(f"⏸️ {job['source_filename']}")
+                        st.caption(
+                            f"Pool: {job.get('pool_name')} | "
+                            f"{job['pages_done']}/{job.get('total_pages') or '?'} pages OCRed"
+                            + (f" | {job['error_message']}" if job.get("error_message") else "")
+                        )
+                    with col2:
+                        if st.button("▶️ Resume", key=f"resume_ocr_{job['job_id']}"):
+                            launch_job(job["job_id"])
+                            st.success("Resumed in the background")
+                            st.rerun()
+
             # Refresh button
             if st.button("🔄 Refresh Status", key="refresh_bg_status"):
                 st.rerun()
@@ -685,6 +730,81 @@ def show_delete_confirmation(pool_id: str, pools: List[Dict[str, Any]]):
             st.rerun()
 
 
+def start_pool_dedupe(pool_id: str, dry_run: bool) -> str:
+    """Spawn the detached background dedupe process for a whole pool; returns its task id"""
+    task_id = f"pool_dedupe_{uuid.uuid4().hex[:8]}"
+    command = [
+        sys.executable,
+        os.path.join(os.getcwd(), "background_pool_dedupe.py"),
+        pool_id,
+        "--task-id",
+        task_id,
+    ]
+    if dry_run:
+        command.append("--dry-run")
+    subprocess.Popen(
+        command,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        stdin=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    return task_id
+
+
+def show_dedupe_confirmation(pool_id: str, pools: List[Dict[str, Any]]):
+    """Show the dry run result of a pool dedupe and ask before marking duplicates"""
+    from background_task_status import get_all_tasks
+
+    pool = next((p for p in pools if p["id"] == pool_id), None)
+
+    if not pool:
+        return
+
+    task_id = st.session_state.get("dedupe_dry_run_task")
+    task = next((t for t in get_all_tasks() if t["task_id"] == task_id), None)
+
+    st.markdown("---")
+    st.markdown(f"### 🧹 Duplicates in **{pool['pool_name']}**")
+
+    ready = False
+    if not task or task.get("status") == "running":
+        st.info(
+            "⏳ Dry run in progress - nothing is changed yet. Refresh to see the result.\n\n"
+            "📋 Check `background_pool_dedupe.log` for progress."
+        )
+    elif task.get("status") == "failed":
+        st.error(f"Duplicate scan failed: {task.get('error_message')}")
+    else:
+        st.warning(
+            f"⚠️ {task.get('completion_message', 'Dry run complete')}\n\n"
+            "Marked duplicates are left out of new mock exams. Mark them now?"
+        )
+        ready = True
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        if st.button(
+            "✅ Yes, Mark Duplicates", type="primary", disabled=not ready, use_container_width=True
+        ):
+            start_pool_dedupe(pool_id, dry_run=False)
+            del st.session_state.confirm_dedupe_pool
+            st.success(
+                "🧹 Marking duplicates in the background.\n\n"
+                "📋 Check `background_pool_dedupe.log` for progress."
+            )
+
+    with col2:
+        if st.button("🔄 Refresh", use_container_width=True):
+            st.rerun()
+
+    with col3:
+        if st.button("⬅️ Cancel", key="cancel_dedupe", use_container_width=True):
+            del st.session_state.confirm_dedupe_pool
+            st.rerun()
+
+
 async def load_question_pools() -> List[Dict[str, Any]]:
     """Load all question pools"""
     try:
@@ -768,9 +888,34 @@ def update_question(question_id: str, updated_data: Dict[str, Any]) -> bool:
             st.warning("Demo mode: Changes not saved")
             return True
 
+        from question_pool_manager import stored_question_hash
+        from verdict_cache import invalidate_on_edit
+
         # Use admin_client to bypass RLS for question updates
         client = db.admin_client if db.admin_client else db.client
 
+        # Drop cached AI verdicts for the old content before it changes
+        invalidate_on_edit(client, question_id, updated_data)
+
+        # Keep content_hash (exact dedupe, duplicate_cache keys) in step with the content
+        if "question_text" in updated_data or "choices" in updated_data:
+            content = dict(updated_data)
+            if "question_text" not in content or "choices" not in content:
+                current = (
+                    client.table("pool_questions")
+                    .select("question_text, choices")
+                    .eq("id", question_id)
+                    .execute()
+                )
+                for field, value in (current.data or [{}])[0].items():
+                    content.setdefault(field, value)
+            updated_data = {
+                **updated_data,
+                "content_hash": stored_question_hash(
+                    content.get("question_text"), content.get("choices")
+                ),
+            }
+
         response = (
             client.table("pool_questions").update(updated_data).eq("id", question_id).execute()
         )
@@ -1017,6 +1162,36 @@ async def process_ai_fixes(
     }
 
 
+# Error patterns that repeat with exactly the same text (matched by search_pattern)
+EXACT_TEXT_PATTERN_TYPES = ("ocr_space", "missing_space")
+# Error patterns that can appear with different text - every question gets validated
+VALIDATE_ALL_PATTERN_TYPES = ("spelling", "grammar", "word_usage", "text_error", "wrong_answer")
+
+
+def compile_search_patterns(patterns: List[Dict[str, Any]]) -> Optional[re.Pattern]:
+    """
+    One regex matching any exact-text search_pattern (lowercase), built once per fix session
+    so the pool is scanned in a single pass instead of once per pattern
+    """
+    terms = {
+        p["search_pattern"].lower()
+        for p in patterns
+        if p.get("pattern_type") in EXACT_TEXT_PATTERN_TYPES and p.get("search_pattern")
+    }
+    if not terms:
+        return None
+    # Longest first, so a pattern is not shadowed by one of its prefixes
+    return re.compile("|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)))
+
+
+def _searchable_text(question: Dict[str, Any]) -> str:
+    """Lowercased question text and choices (NUL-separated, so no match spans two fields)"""
+    choices = question.get("choices") or []
+    if isinstance(choices, str):
+        choices = json.loads(choices)
+    return "\x00".join([question.get("question_text") or ""] + [c or "" for c in choices]).lower()
+
+
 async def find_similar_errors_in_pool(
     pool_id: str,
     patterns: List[Dict[str, Any]],
@@ -1035,102 +1210,54 @@ async def find_similar_errors_in_pool(
     Returns:
         List of question IDs that match the patterns
     """
-    import json
     import logging
-    import re
 
     from db import db
 
     logger = logging.getLogger(__name__)
 
-    if exclude_question_ids is None:
-        exclude_question_ids = []
-
-    # Get all questions from the pool
-    all_questions = await db.get_pool_questions(pool_id)
-
-    # Filter to only questions from the same source files
-    if source_files:
-        all_questions = [q for q in all_questions if q.get("source_file") in source_files]
-        logger.info(
-            f"Filtering to {len(all_questions)} questions from source files: {source_files}"
-        )
-
-    matching_question_ids = set()
+    excluded = set(exclude_question_ids or [])
 
     # Check if we have patterns that require full source file validation
-    has_wrong_answer_pattern = any(p.get("pattern_type") == "wrong_answer" for p in patterns)
-    has_grammar_spelling_pattern = any(
-        p.get("pattern_type") in ["grammar", "spelling", "word_usage", "text_error"]
-        for p in patterns
-    )
-    has_ocr_spacing_pattern = any(
-        p.get("pattern_type") in ["ocr_space", "missing_space"] for p in patterns
-    )
-
-    if has_wrong_answer_pattern:
+    if any(p.get("pattern_type") == "wrong_answer" for p in patterns):
         logger.info(
             f"Wrong answer pattern detected - will validate questions from same source file(s)"
         )
-
-    if has_grammar_spelling_pattern:
+    if any(
+        p.get("pattern_type") in ["grammar", "spelling", "word_usage", "text_error"]
+        for p in patterns
+    ):
         logger.info(
             f"Grammar/spelling/text error pattern detected - will validate questions from same source file(s)"
         )
 
-    for question in all_questions:
-        question_id = question.get("id")
-
-        # Skip excluded questions
-        if question_id in exclude_question_ids:
-            continue
-
-        question_text = question.get("question_text", "")
-        choices = (
-            json.loads(question.get("choices", "[]"))
-            if isinstance(question.get("choices"), str)
-            else question.get("choices", [])
-        )
-        correct_answer = question.get("correct_answer")
-
-        # Check each pattern
-        for pattern in patterns:
-            pattern_type = pattern.get("pattern_type")
-
-            # OCR and spacing errors: Only check for exact text matches (these repeat exactly)
-            if pattern_type in ["ocr_space", "missing_space"]:
-                search_pattern = pattern.get("search_pattern", "")
-
-                # Use case-insensitive search for better matching
-                if search_pattern:
-                    if search_pattern.lower() in question_text.lower():
-                        matching_question_ids.add(question_id)
-                        logger.info(
-                            f"Found {pattern_type} pattern '{search_pattern}' in question {question_id}"
-                        )
-
-                    # Also check in choices
-                    for choice in choices:
-                        if search_pattern.lower() in choice.lower():
-                            matching_question_ids.add(question_id)
-                            logger.info(
-                                f"Found {pattern_type} pattern '{search_pattern}' in choice of question {question_id}"
-                            )
-
-            # Grammar, spelling, word usage, text errors: Validate ALL questions
-            # because similar types of errors could appear with different text
-            elif pattern_type in ["spelling", "grammar", "word_usage", "text_error"]:
-                matching_question_ids.add(question_id)
-                logger.info(f"Adding question {question_id} for {pattern_type} validation")
+    # Grammar, spelling, word usage, text errors and wrong answers: validate ALL questions
+    # because similar errors could appear with different text (wrong answers could be
+    # scattered across A, B, C, D randomly - the AI validates each one)
+    validate_all = any(p.get("pattern_type") in VALIDATE_ALL_PATTERN_TYPES for p in patterns)
+    # OCR and spacing errors: only exact text matches (these repeat exactly)
+    matcher = None if validate_all else compile_search_patterns(patterns)
+    if not validate_all and matcher is None:
+        return []
 
-            # Wrong answer: Validate all questions in pool
-            elif pattern_type == "wrong_answer":
-                # When wrong answers are detected, validate all questions in pool
-                # because wrong answers could be scattered across A, B, C, D randomly
-                # The AI will validate each one to determine if it's actually wrong
-                matching_question_ids.add(question_id)
+    matching_question_ids = []
+    scanned = 0
+    # Only questions from the same source files, streamed with just the columns needed
+    columns = "id" if validate_all else "id, question_text, choices"
+    async for page in db.iter_pool_questions(pool_id, columns, source_files=source_files):
+        for question in page:
+            scanned += 1
+            question_id = question.get("id")
+            if question_id in excluded:
+                continue
+            if validate_all or matcher.search(_searchable_text(question)):
+                matching_question_ids.append(question_id)
 
-    return list(matching_question_ids)
+    logger.info(
+        f"Pattern scan: {len(matching_question_ids)} of {scanned} questions match "
+        f"(source files: {source_files})"
+    )
+    return matching_question_ids
 
 
 def apply_approved_fixes(fix_results: List[Dict[str, Any]]):
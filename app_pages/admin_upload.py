@@ -10,9 +10,11 @@ import io
 import json
 import logging
 import os
-from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 import config
 from auth_utils import AuthUtils, run_async
@@ -865,6 +867,71 @@ async def process_mock_upload(
         return False
 
 
+async def parse_uploaded_files(
+    uploaded_files,
+    pool_id=None,
+    pool_name=None,
+    on_file_done: Optional[Callable[[int, Any, Any, Optional[Exception]], None]] = None,
+) -> List[Tuple[Any, Optional[Exception]]]:
+    """
+    Parse several uploaded files concurrently (up to UPLOAD_PARSE_CONCURRENCY at once)
+
+    Each file is parsed in its own worker thread. OCR runs in the shared OCR process pool and
+    AI extraction goes through the shared AI scheduler, so concurrent files share its
+    concurrency cap and rate limit. A file that fails does not affect the others.
+
+    Args:
+        uploaded_files: Uploaded file objects
+        pool_id: Optional pool ID for background OCR processing
+        pool_name: Optional pool name for background OCR processing
+        on_file_done: Optional callback(index, uploaded_file, result, error) as each file finishes
+
+    Returns:
+        List of (result, error) tuples in upload order, where result is what
+        parse_uploaded_file returned
+    """
+    max_workers = max(1, min(config.UPLOAD_PARSE_CONCURRENCY, len(uploaded_files)))
+    # Parser progress messages render from the worker threads into this page
+    script_ctx = get_script_run_ctx()
+    loop = asyncio.get_running_loop()
+
+    def parse_in_thread(uploaded_file):
+        if script_ctx is not None:
+            add_script_run_ctx(ctx=script_ctx)
+        return parse_uploaded_file(uploaded_file, pool_id, pool_name)
+
+    async def parse_one(index: int, uploaded_file, executor: ThreadPoolExecutor):
+        try:
+            result = (await loop.run_in_executor(executor, parse_in_thread, uploaded_file), None)
+        except Exception as e:
+            logger.error(f"Error parsing {uploaded_file.name}: {e}")
+            result = (None, e)
+        if on_file_done:
+            on_file_done(index, uploaded_file, *result)
+        return result
+
+    # Dedicated threads so the script context never leaks into shared executor threads
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload-parse") as executor:
+        return list(
+            await asyncio.gather(*(parse_one(i, f, executor) for i, f in enumerate(uploaded_files)))
+        )
+
+
+async def load_pool_questions_for_dedupe(db, pool_id: str) -> List[Dict[str, Any]]:
+    """Existing pool questions in the format expected by question_pool_manager"""
+    existing_questions = await db.get_pool_questions(pool_id)
+    return [
+        {
+            "question": eq["question_text"],
+            "choices": (
+                json.loads(eq["choices"]) if isinstance(eq["choices"], str) else eq["choices"]
+            ),
+            "correct_index": eq["correct_answer"],
+        }
+        for eq in existing_questions
+    ]
+
+
 async def process_pool_upload(
     pool_name, category, description, uploaded_files, enable_ai_detection, similarity_threshold
 ):
@@ -891,62 +958,52 @@ async def process_pool_upload(
 
         pool_id = pool["id"]
 
-        # Get existing questions from pool
-        existing_questions = await db.get_pool_questions(pool_id)
-        progress_placeholder.info(f"📊 Found {len(existing_questions)} existing questions in pool")
-
-        # Convert existing questions to format expected by question_pool_manager
-        existing_q_list = []
-        for eq in existing_questions:
-            existing_q_list.append(
-                {
-                    "question": eq["question_text"],
-                    "choices": (
-                        json.loads(eq["choices"])
-                        if isinstance(eq["choices"], str)
-                        else eq["choices"]
-                    ),
-                    "correct_index": eq["correct_answer"],
-                }
-            )
+        existing_count = await db.count_pool_questions(pool_id)
+        progress_placeholder.info(f"📊 Found {existing_count} existing questions in pool")
 
-        # Process each uploaded file
+        # Parse the uploaded files concurrently, then dedupe and insert them together
         all_new_questions = []
         total_extracted = 0
         background_processing_triggered = False
 
-        for idx, uploaded_file in enumerate(uploaded_files, 1):
-            progress_placeholder.info(
-                f"📄 Processing file {idx}/{len(uploaded_files)}: {uploaded_file.name}"
-            )
+        progress_placeholder.info(f"📄 Processing {len(uploaded_files)} file(s)...")
+        file_placeholders = [st.empty() for _ in uploaded_files]
+        for placeholder, uploaded_file in zip(file_placeholders, uploaded_files):
+            placeholder.info(f"⏳ Waiting: {uploaded_file.name}")
+        files_done = 0
+
+        def on_file_done(index, uploaded_file, questions, error):
+            nonlocal files_done
+            files_done += 1
+            progress_placeholder.info(f"📄 Processed {files_done}/{len(uploaded_files)} files")
+            placeholder = file_placeholders[index]
+            if error:
+                placeholder.error(f"❌ Error processing {uploaded_file.name}: {str(error)}")
+            elif questions == "__BACKGROUND_PROCESSING__":
+                placeholder.info(f"🔄 Background OCR processing started for {uploaded_file.name}")
+            else:
+                placeholder.success(
+                    f"✅ Extracted {len(questions)} questions from {uploaded_file.name}"
+                )
 
-            try:
-                # Parse questions from file (pass pool info for background OCR processing)
-                questions = parse_uploaded_file(uploaded_file, pool_id, pool_name)
-
-                # Check if background processing was triggered
-                if questions == "__BACKGROUND_PROCESSING__":
-                    background_processing_triggered = True
-                    stats_placeholder.info(
-                        f"🔄 Background OCR processing started for {uploaded_file.name}"
-                    )
-                    continue
+        parse_results = await parse_uploaded_files(uploaded_files, pool_id, pool_name, on_file_done)
 
-                total_extracted += len(questions)
+        for uploaded_file, (questions, error) in zip(uploaded_files, parse_results):
+            if error:
+                continue
 
-                # Add source filename to each question
-                for q in questions:
-                    q["source_file"] = uploaded_file.name
+            # Check if background processing was triggered
+            if questions == "__BACKGROUND_PROCESSING__":
+                background_processing_triggered = True
+                continue
 
-                all_new_questions.extend(questions)
+            total_extracted += len(questions)
 
-                stats_placeholder.success(
-                    f"✅ Extracted {len(questions)} questions from {uploaded_file.name}"
-                )
+            # Add source filename to each question
+            for q in questions:
+                q["source_file"] = uploaded_file.name
 
-            except Exception as e:
-                stats_placeholder.error(f"❌ Error processing {uploaded_file.name}: {str(e)}")
-                continue
+            all_new_questions.extend(questions)
 
         # If background processing was triggered, show success message and exit
         if background_processing_triggered:
@@ -973,9 +1030,23 @@ async def process_pool_upload(
             f"🔍 Detecting duplicates in {len(all_new_questions)} new questions..."
         )
 
-        # Step 1: Detect exact duplicates (fast)
+        # Step 1: Detect exact duplicates (fast) - only the new batch's content hashes are
+        # looked up in the pool, so this does not grow with the pool size
+        existing_q_list = None
+        new_hashes = [question_pool_manager.calculate_question_hash(q) for q in all_new_questions]
+        try:
+            existing_hashes = await db.get_existing_content_hashes(pool_id, new_hashes)
+        except Exception as e:
+            # Uploads store content_hash, so the column must exist
+            st.error(
+                f"Could not look up question hashes ({e}). The pool_questions.content_hash "
+                "column is required - run migrations/add_pool_questions_content_hash.sql "
+                "and backfill_content_hashes.py."
+            )
+            return False
+
         unique_after_exact, exact_duplicates = question_pool_manager.detect_exact_duplicates(
-            all_new_questions, existing_q_list
+            all_new_questions, existing_hashes=existing_hashes
         )
 
         stats_placeholder.info(
@@ -988,40 +1059,44 @@ async def process_pool_upload(
         ai_duplicates_found = 0
         ai_detection_skipped = False
 
+        if enable_ai_detection and unique_after_exact:
+            # Near-duplicate detection compares against the whole pool
+            existing_q_list = await load_pool_questions_for_dedupe(db, pool_id)
+
         if enable_ai_detection and unique_after_exact and existing_q_list:
             progress_placeholder.info(
                 "🤖 Running AI duplicate detection (this may take a moment)..."
             )
 
-            # For performance, we'll check AI similarity for questions that passed exact check
+            # Local near-duplicate index over the whole pool, built once for the upload
+            similarity_index = question_pool_manager.build_similarity_index(existing_q_list)
             final_unique = []
 
-            for idx, new_q in enumerate(unique_after_exact):
-                # Check if this question is similar to any existing questions
-                similar, error = await question_pool_manager.detect_similar_questions_with_ai(
-                    new_q, existing_q_list, threshold=similarity_threshold
-                )
+            # One batch: cached AI verdicts are looked up in bulk, only new pairs go to the AI
+            similar_results, error = await question_pool_manager.detect_similar_questions_batch(
+                unique_after_exact,
+                existing_q_list,
+                threshold=similarity_threshold,
+                index=similarity_index,
+            )
 
-                # If we hit a rate limit error, skip the rest of AI detection
-                if error and ("rate limit" in error.lower() or "429" in error):
-                    ai_detection_skipped = True
-                    # Add remaining questions without AI check
-                    final_unique.append(new_q)
-                    final_unique.extend(unique_after_exact[idx + 1 :])
-                    remaining_count = len(unique_after_exact) - idx - 1
-                    progress_placeholder.warning(
-                        f"⚠️ AI duplicate detection paused due to API rate limits. "
-                        f"Continuing with exact matching only for remaining {remaining_count} questions..."
-                    )
-                    break
+            # If we hit a rate limit error, questions not fully checked are kept
+            if error and ("rate limit" in error.lower() or "429" in error):
+                ai_detection_skipped = True
+                remaining_count = sum(1 for similar in similar_results if similar is None)
+                progress_placeholder.warning(
+                    f"⚠️ AI duplicate detection paused due to API rate limits. "
+                    f"Continuing with exact matching only for remaining {remaining_count} questions..."
+                )
 
+            for new_q, similar in zip(unique_after_exact, similar_results):
                 if similar:
                     # Found semantic duplicate
                     ai_duplicates_found += 1
                     new_q["is_duplicate"] = True
                     new_q["similarity_score"] = similar[0][1] * 100  # Convert to percentage
                 else:
-                    # No similar questions found - add to unique list
+                    # No similar questions found (or not checked) - add to unique list
                     final_unique.append(new_q)
 
             questions_to_add = final_unique
@@ -1071,19 +1146,19 @@ async def process_pool_upload(
             # Validate questions for critical errors (missing context, case studies, etc.)
             progress_placeholder.info("🔍 Validating questions for completeness...")
 
-            validated_questions = []
+            # Reject every invalid question (missing fields and bad choices are not marked
+            # CRITICAL). Results are memoized, so add_questions_to_pool does not validate these
+            # again
+            validated_questions, rejected = QuestionValidator.validate_batch(
+                questions_to_add, strict=True
+            )
             rejected_questions = []
 
-            for q in questions_to_add:
-                is_valid, errors = QuestionValidator.validate_question(q)
-
-                if not is_valid:
-                    # Extract CRITICAL errors
-                    critical_errors = [e for e in errors if "CRITICAL" in e]
-                    q["validation_errors"] = critical_errors
-                    rejected_questions.append(q)
-                else:
-                    validated_questions.append(q)
+            for item in rejected:
+                # Extract CRITICAL errors
+                q = item["question"]
+                q["validation_errors"] = [e for e in item["errors"] if "CRITICAL" in e]
+                rejected_questions.append(q)
 
             # Show validation results if questions were rejected
             if rejected_questions:
@@ -1475,8 +1550,8 @@ async def process_pool_upload(
             - **Unique questions added: {len(questions_to_add)}**
 
             **Pool Status:**
-            - Previous questions in pool: {len(existing_q_list)}
-            - New total (estimated): {len(existing_q_list) + len(questions_to_add)}
+            - Previous questions in pool: {existing_count}
+            - New total (estimated): {existing_count + len(questions_to_add)}
             """
             )
 
@@ -1503,3 +1578,9 @@ async def process_pool_upload(
         st.error(f"Error processing pool upload: {str(e)}")
         logger.error(f"Pool upload error: {e}", exc_info=True)
         return {"success": False}
+
+    finally:
+        from question_validator import QuestionValidator
+
+        # Drop the memoized validation results however the upload ended
+        QuestionValidator.clear_cache()
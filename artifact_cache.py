@@ -0,0 +1,154 @@
+"""
+Artifact Cache for MockExamify
+Content-addressed disk cache for the expensive steps of document import, so re-uploading
+the same PDF/DOCX (or re-running an import after a crash) skips OCR and AI extraction.
+
+Entries:
+    .cache/artifacts/<kind>/<key[:2]>/<key>.json
+
+- kind: "ocr_page", "text_chunks", "ai_questions", ...
+- key: SHA-256 of the content (file bytes + page, chunk text, ...) plus the version of the
+  parser/prompt that produced it, so changing either simply misses the old entries
+
+The cache is bounded by ARTIFACT_CACHE_MAX_MB; least recently used entries are evicted.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(".cache", "artifacts")
+
+# Eviction scans the cache directory, so only do it every N writes
+EVICTION_CHECK_INTERVAL = 50
+# Evict down to this fraction of the size limit so eviction does not run on every write
+EVICTION_TARGET_RATIO = 0.9
+
+_writes_since_check = EVICTION_CHECK_INTERVAL  # check on the first write
+_eviction_lock = threading.Lock()
+
+
+def _get_cache_root() -> str:
+    """Get the artifact cache directory"""
+    return os.path.join(os.getcwd(), CACHE_DIR)
+
+
+def _get_max_bytes() -> int:
+    """Size limit for the artifact cache (ARTIFACT_CACHE_MAX_MB)"""
+    import config
+
+    return max(0, config.ARTIFACT_CACHE_MAX_MB) * 1024 * 1024
+
+
+def hash_bytes(data: Union[bytes, str]) -> str:
+    """SHA-256 hex digest of file content or text"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_artifact_key(version: str, *parts: Any) -> str:
+    """Key from the producer version and the content-derived parts (hashes, page numbers, ...)"""
+    payload = json.dumps([version, *parts], ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_path(kind: str, key: str) -> str:
+    return os.path.join(_get_cache_root(), kind, key[:2], f"{key}.json")
+
+
+def get_artifact(kind: str, key: str) -> Optional[Any]:
+    """Return a cached artifact, or None on a miss"""
+    path = _entry_path(kind, key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable artifact cache entry {path}: {e}")
+        return None
+
+    try:
+        # Mark as recently used for eviction
+        os.utime(path, None)
+    except OSError:
+        pass
+    return entry.get("value")
+
+
+def store_artifact(kind: str, key: str, value: Any):
+    """Persist an artifact (atomic write, failures are logged and ignored)"""
+    path = _entry_path(kind, key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {"kind": kind, "cached_at": time.time(), "value": value}, f, ensure_ascii=False
+            )
+        os.replace(temp_file, path)
+    except Exception as e:
+        logger.warning(f"Could not write artifact cache entry: {e}")
+        return
+
+    _maybe_evict()
+
+
+def _maybe_evict():
+    """Evict least recently used entries once the cache grows past its size limit"""
+    global _writes_since_check
+    with _eviction_lock:
+        _writes_since_check += 1
+        if _writes_since_check < EVICTION_CHECK_INTERVAL:
+            return
+        _writes_since_check = 0
+
+    try:
+        evict_to_size(_get_max_bytes())
+    except Exception as e:
+        logger.warning(f"Artifact cache eviction failed: {e}")
+
+
+def evict_to_size(max_bytes: int) -> int:
+    """
+    Remove least recently used entries until the cache is under max_bytes
+    (down to EVICTION_TARGET_RATIO of it). Returns the number of entries removed.
+    """
+    entries: List[Tuple[float, int, str]] = []
+    total_size = 0
+    for dirpath, _, filenames in os.walk(_get_cache_root()):
+        for filename in filenames:
+            if not filename.endswith(".json"):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total_size += stat.st_size
+
+    if total_size <= max_bytes:
+        return 0
+
+    target = int(max_bytes * EVICTION_TARGET_RATIO)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total_size <= target:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total_size -= size
+        removed += 1
+
+    logger.info(f"Artifact cache: evicted {removed} entries ({total_size // 1024} KB left)")
+    return removed
@@ -6,6 +6,7 @@ import asyncio
 import re
 import json
 from db import db
+from question_pool_manager import stored_question_hash
 
 async def fix_questions():
     """Fix the corrupted questions"""
@@ -100,7 +101,8 @@ async def fix_questions():
             try:
                 update_data = {
                     'question_text': fixed_text,
-                    'choices': json.dumps(fixed_choices) if isinstance(fixed_choices, list) else fixed_choices
+                    'choices': json.dumps(fixed_choices) if isinstance(fixed_choices, list) else fixed_choices,
+                    'content_hash': stored_question_hash(fixed_text, fixed_choices)
                 }
 
                 result = db.admin_client.table("pool_questions").update(update_data).eq("id", question_id).execute()
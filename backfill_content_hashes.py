@@ -0,0 +1,96 @@
+"""
+One-off script to fill pool_questions.content_hash for existing questions
+Run after migrations/add_pool_questions_content_hash.sql so exact duplicate detection on
+upload (which only looks up the new questions' hashes) also sees older questions.
+
+    python backfill_content_hashes.py              # all pools
+    python backfill_content_hashes.py <pool_id>    # one pool
+"""
+
+import asyncio
+import json
+import logging
+import sys
+from typing import Optional
+
+from db import db
+from question_pool_manager import calculate_question_hash
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Rows fetched per page while scanning for missing hashes
+PAGE_SIZE = 500
+
+
+async def backfill_content_hashes(pool_id: Optional[str] = None):
+    """Compute and store the content hash of every question that does not have one yet"""
+    # Use admin_client to bypass RLS policies
+    client = db.admin_client if db.admin_client else db.client
+
+    updated_count = 0
+    failed_count = 0
+
+    while True:
+        # Updated rows drop out of the filter, so always read the first page
+        query = (
+            client.table("pool_questions")
+            .select("id, question_text, choices")
+            .is_("content_hash", "null")
+        )
+        if pool_id:
+            query = query.eq("pool_id", pool_id)
+        result = query.limit(PAGE_SIZE).execute()
+
+        rows = result.data or []
+        if not rows:
+            break
+
+        page_failures = 0
+        for row in rows:
+            try:
+                choices = row["choices"]
+                if isinstance(choices, str):
+                    choices = json.loads(choices)
+                content_hash = calculate_question_hash(
+                    {"question": row["question_text"], "choices": choices or []}
+                )
+                update_result = (
+                    client.table("pool_questions")
+                    .update({"content_hash": content_hash})
+                    .eq("id", row["id"])
+                    .execute()
+                )
+                if update_result.data:
+                    updated_count += 1
+                else:
+                    page_failures += 1
+                    logger.error(f"❌ Failed to update question {row['id']}")
+            except Exception as e:
+                page_failures += 1
+                logger.error(f"❌ Error processing question {row.get('id')}: {e}")
+
+        failed_count += page_failures
+        logger.info(f"Hashed {updated_count} questions so far...")
+
+        if page_failures == len(rows):
+            # Nothing on this page could be updated - stop instead of re-reading it forever
+            logger.error("Stopping: no question on the current page could be updated")
+            break
+
+    logger.info("=" * 60)
+    logger.info("BACKFILL COMPLETE!")
+    logger.info(f"✅ Successfully updated: {updated_count}")
+    logger.info(f"❌ Failed: {failed_count}")
+    logger.info("=" * 60)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(backfill_content_hashes(sys.argv[1] if len(sys.argv) > 1 else None))
+    except KeyboardInterrupt:
+        logger.info("\n⚠️ Process interrupted by user")
+        sys.exit(0)
+    except Exception as e:
+        logger.error(f"Fatal error: {e}")
+        sys.exit(1)
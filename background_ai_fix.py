@@ -28,7 +28,10 @@ def update_question(question_id: str, updated_data: Dict[str, Any]) -> bool:
     """Update a specific question in the database"""
     try:
         from db import db
+        from verdict_cache import invalidate_on_edit
         client = db.admin_client if db.admin_client else db.client
+        # Drop cached AI verdicts for the old content before it changes
+        invalidate_on_edit(client, question_id, updated_data)
         response = (
             client.table("pool_questions").update(updated_data).eq("id", question_id).execute()
         )
@@ -49,6 +52,7 @@ async def run_ai_fix_for_questions(pool_id: str, source_files: List[str] = None,
     """
     from db import db
     from openrouter_utils import fix_question_errors
+    from question_pool_manager import stored_question_hash
     from background_task_status import start_task, update_task_progress, complete_task, fail_task
 
     logger.info(f"Starting AI fix for pool {pool_id}")
@@ -124,7 +128,10 @@ async def run_ai_fix_for_questions(pool_id: str, source_files: List[str] = None,
                     # Prepare update data
                     updated_data = {
                         'question_text': fix_result['fixed_question'],
-                        'choices': json.dumps(fix_result['fixed_choices'])
+                        'choices': json.dumps(fix_result['fixed_choices']),
+                        'content_hash': stored_question_hash(
+                            fix_result['fixed_question'], fix_result['fixed_choices']
+                        )
                     }
 
                     # Update correct answer if changed
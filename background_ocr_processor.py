@@ -8,9 +8,13 @@ import logging
 import os
 import re
 import sys
+import threading
+import time
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 
+from ocr_corruption import detect_ocr_corruption
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -48,25 +52,6 @@ INCOMPLETE_PATTERNS = [
     r'^With reference to',
 ]
 
-# OCR corruption patterns
-OCR_CORRUPTION_PATTERNS = [
-    (r'\$[oO]\.', 'Dollar sign followed by letter o/O instead of zero'),
-    (r'\bordinai-y\b', 'ordinai-y instead of ordinary'),
-    (r'\bordinan/\b', 'ordinan/ instead of ordinary'),
-    (r'\bstmctures\b', 'stmctures instead of structures'),
-    (r'\binvestrnent\b', 'investrnent instead of investment'),
-    (r'\bgovernrnent\b', 'governrnent instead of government'),
-    (r'\bmanagernent\b', 'managernent instead of management'),
-    (r'\bperforrnance\b', 'performrnance instead of performance'),
-    (r'\brnake\b', 'rnake instead of make'),
-    (r'\brnay\b', 'rnay instead of may'),
-    (r'\brnust\b', 'rnust instead of must'),
-    (r'\brnore\b', 'rnore instead of more'),
-    (r'\b[Il]00\%', 'Letter I or l instead of 1 in 100%'),
-    (r'\s{4,}', 'Four or more consecutive spaces'),
-    (r'determined by the\s*Choices', 'Question text bleeding into choices'),
-]
-
 
 def detect_incomplete_question(question_text: str) -> Optional[str]:
     """
@@ -92,17 +77,6 @@ def detect_incomplete_question(question_text: str) -> Optional[str]:
     return None
 
 
-def detect_ocr_corruption(question_text: str) -> Optional[str]:
-    """
-    Detect OCR corruption in question text (spelling errors, malformed text).
-    Returns the first corruption found, None if clean.
-    """
-    for pattern, description in OCR_CORRUPTION_PATTERNS:
-        if re.search(pattern, question_text, re.IGNORECASE):
-            return description
-    return None
-
-
 async def attempt_heal_question(question: Dict, full_text: str, question_index: int) -> Tuple[bool, Optional[Dict]]:
     """
     Attempt to heal an incomplete question by finding and merging context from the full OCR text.
@@ -175,182 +149,544 @@ Rewritten question:"""
         return False, None
 
 
-async def process_scanned_pdf(file_path: str, pool_id: str, pool_name: str, source_filename: str):
-    """
-    Process a scanned PDF with OCR in the background
-
-    Args:
-        file_path: Path to the saved PDF file
-        pool_id: ID of the pool to add questions to
-        pool_name: Name of the pool
-        source_filename: Original filename
-    """
-    from db import db
-    from document_parser import DocumentParser
-
-    logger.info(f"Starting background OCR processing for: {source_filename}")
-    logger.info(f"Pool: {pool_name} (ID: {pool_id})")
-
-    try:
-        # Read the file
-        with open(file_path, 'rb') as f:
-            file_bytes = f.read()
-
-        logger.info(f"File loaded: {len(file_bytes)} bytes")
-
-        # Initialize parser
-        parser = DocumentParser()
-
-        # Extract text using OCR (no page limit for background processing)
-        logger.info("Starting OCR extraction...")
-        import fitz
-        import easyocr
-        import numpy as np
-        from PIL import Image
-
-        pdf_doc = fitz.open(stream=file_bytes, filetype="pdf")
-        total_pages = len(pdf_doc)
-        logger.info(f"PDF has {total_pages} pages - processing all pages in background")
+# Pipeline tuning: bounded queues give backpressure between stages
+PAGE_QUEUE_SIZE = 16
+INSERT_BATCH_SIZE = 25
+# Pages of text used to plan the extraction chunk size
+PLAN_SAMPLE_PAGES = 3
+# Minimum seconds between background_task_status progress writes
+STATUS_UPDATE_INTERVAL = 2.0
 
-        # Initialize EasyOCR reader
-        reader = easyocr.Reader(["en"], gpu=False, verbose=False)
+# End-of-stream marker passed between pipeline stages
+_END = None
 
-        all_text = []
 
-        for i in range(total_pages):
-            page = pdf_doc[i]
+async def validate_extracted_question(
+    q: Dict, idx: int, full_text: str, stats: Dict[str, int]
+) -> Optional[Dict]:
+    """
+    Validate one extracted question, healing it if it references missing context.
+    Returns the (possibly healed) question, or None if it must be skipped.
+    """
+    # Check if question has all required fields
+    if not q.get("question") or not isinstance(q.get("choices"), list):
+        logger.warning(f"Question {idx} missing question text or choices - skipping")
+        stats["invalid"] += 1
+        return None
+
+    # Check if choices is not empty
+    if len(q["choices"]) == 0:
+        logger.warning(f"Question {idx} has empty choices array - skipping")
+        stats["invalid"] += 1
+        return None
+
+    # Check if correct_index is valid
+    if not isinstance(q.get("correct_index"), int):
+        logger.warning(f"Question {idx} missing or invalid correct_index - skipping")
+        stats["invalid"] += 1
+        return None
+
+    if q["correct_index"] < 0 or q["correct_index"] >= len(q["choices"]):
+        logger.warning(f"Question {idx} has correct_index {q['correct_index']} out of range for {len(q['choices'])} choices - skipping")
+        stats["invalid"] += 1
+        return None
+
+    # Check for OCR corruption (malformed text)
+    question_text = q.get("question", "")
+    corruption_reason = detect_ocr_corruption(question_text)
+
+    if corruption_reason:
+        logger.warning(f"Question {idx}: OCR corruption detected - {corruption_reason}")
+        logger.warning(f"  Question text: {question_text[:100]}...")
+        logger.warning(f"  Skipping corrupted question")
+        stats["invalid"] += 1
+        return None
+
+    # Check for incomplete questions (missing context)
+    incomplete_reason = detect_incomplete_question(question_text)
+
+    if incomplete_reason:
+        logger.info(f"Question {idx}: Detected incomplete - {incomplete_reason}")
+        logger.info(f"  Attempting to heal question...")
+
+        # Try to heal the question
+        success, healed_q = await attempt_heal_question(q, full_text, idx)
+
+        if success and healed_q:
+            # Use the healed question
+            stats["healed"] += 1
+            logger.info(f"Question {idx}: ✅ Successfully healed")
+            return healed_q
+
+        # Could not heal - skip this question
+        logger.warning(f"Question {idx}: ❌ Could not heal - skipping")
+        stats["incomplete_skipped"] += 1
+        return None
+
+    return q
+
+
+class _JobProgress:
+    """Mirrors job progress to background_task_status (throttled - it rewrites a JSON file)"""
+
+    def __init__(self, job_id: str, stats: Dict[str, int]):
+        self.job_id = job_id
+        self.stats = stats
+        self._last_update = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, current_item: str, force: bool = False):
+        from background_task_status import update_task_progress
+
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_update < STATUS_UPDATE_INTERVAL:
+                return
+            self._last_update = now
+        update_task_progress(
+            self.job_id,
+            processed=self.stats["pages_done"],
+            fixed=self.stats["inserted"],
+            errors=self.stats["failed_pages"] + self.stats["invalid"],
+            current_item=current_item,
+        )
 
-            logger.info(f"OCR processing page {i+1}/{total_pages}...")
 
-            # Render page to image (150 DPI)
-            mat = fitz.Matrix(150 / 72, 150 / 72)
-            pix = page.get_pixmap(matrix=mat)
+async def _ocr_stage(
+    job_id: str,
+    page_layers: List[Dict],
+    page_queue: asyncio.Queue,
+    stats: Dict[str, int],
+    progress: _JobProgress,
+):
+    """Stage 1: page texts (checkpoint, native text layer or OCR) in completion order"""
+    from ocr_engine import ocr_pdf_pages
+    from ocr_jobs import get_saved_pages, get_source_path, save_page
+
+    loop = asyncio.get_running_loop()
+    saved_pages = get_saved_pages(job_id)
+    ocr_pages = [
+        layer["page_index"]
+        for layer in page_layers
+        if layer["needs_ocr"] and layer["page_index"] not in saved_pages
+    ]
+    if saved_pages:
+        logger.info(f"Resuming: {len(saved_pages)} OCR pages restored from checkpoints")
+
+    def push_page(completed, total, page_index, page_text):
+        # Called in the OCR thread
+        if page_text is not None:
+            save_page(job_id, page_index, page_text)
+            stats["pages_done"] += 1
+        else:
+            stats["failed_pages"] += 1
+        # Blocks while the page queue is full (backpressure)
+        asyncio.run_coroutine_threadsafe(page_queue.put((page_index, page_text)), loop).result()
+        # Log progress every 5 pages
+        if completed % 5 == 0 or completed == total:
+            logger.info(f"OCR progress: {completed}/{total} pages completed")
+        progress.update(f"OCR page {page_index + 1}/{len(page_layers)}")
+
+    # Pages are OCRed in parallel by warmed worker processes, off the event loop
+    ocr_task = asyncio.create_task(
+        asyncio.to_thread(
+            ocr_pdf_pages,
+            get_source_path(job_id),
+            ocr_pages,
+            dpi=150,
+            paragraph=True,
+            on_progress=push_page,
+        )
+    )
+
+    # Checkpointed pages and pages with a usable text layer are ready immediately
+    for layer in page_layers:
+        page_index = layer["page_index"]
+        if page_index in saved_pages:
+            stats["pages_done"] += 1
+            await page_queue.put((page_index, saved_pages[page_index]))
+        elif not layer["needs_ocr"]:
+            stats["pages_done"] += 1
+            await page_queue.put((page_index, layer["text"]))
 
-            # Convert to PIL Image then numpy array
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            img_array = np.array(img)
+    try:
+        await ocr_task
+    finally:
+        if not ocr_task.cancelled():
+            # Lets the assembly stage finish with the pages that did arrive
+            await page_queue.put(_END)
+
+
+async def _assemble_stage(
+    job_id: str,
+    page_queue: asyncio.Queue,
+    chunk_queue: asyncio.Queue,
+    parser,
+    document_parts: List[str],
+    text_complete: asyncio.Event,
+    extraction_workers: int,
+):
+    """Stage 2: restore page order and cut extraction chunks as soon as enough text is in"""
+    from document_chunking import StreamingChunker
+    from ocr_jobs import load_job, update_job
+
+    pending_pages: Dict[int, Optional[str]] = {}
+    next_page = 0
+    chunker = None
+    sample: List[str] = []
+    chunk_count = 0
+
+    async def emit(chunks: List[str]):
+        nonlocal chunk_count
+        for chunk in chunks:
+            await chunk_queue.put((chunk_count, chunk))
+            chunk_count += 1
+
+    def plan_chunker():
+        # A resumed job reuses its chunk size so chunk checkpoints line up
+        chunk_size = (load_job(job_id) or {}).get("chunk_size")
+        if not chunk_size:
+            sample_text = "".join(sample)
+            prompt_overhead = len(parser._create_extraction_prompt(""))
+            chunk_size = parser.chunk_planner.plan_chunk_chars(sample_text, prompt_overhead)
+            update_job(job_id, chunk_size=chunk_size)
+        logger.info(f"Streaming extraction chunks of up to {chunk_size} chars")
+        return StreamingChunker(chunk_size)
+
+    while True:
+        item = await page_queue.get()
+        if item is _END:
+            break
+        page_index, page_text = item
+        pending_pages[page_index] = page_text
+
+        while next_page in pending_pages:
+            page_text = pending_pages.pop(next_page)
+            next_page += 1
+            if not page_text:
+                continue
+            page_text += "\n\n"
+            document_parts.append(page_text)
 
-            # Run OCR
+            if chunker is None:
+                sample.append(page_text)
+                if len(sample) < PLAN_SAMPLE_PAGES:
+                    continue
+                chunker = plan_chunker()
+                page_text = "".join(sample)
+            await emit(chunker.feed(page_text))
+
+    # Pages whose OCR failed arrive as None and are skipped above; pages still pending here
+    # follow a page that never arrived (the OCR stage stopped early)
+    for page_index in sorted(pending_pages):
+        if not pending_pages[page_index]:
+            continue
+        page_text = pending_pages[page_index] + "\n\n"
+        document_parts.append(page_text)
+        if chunker is None:
+            sample.append(page_text)
+        else:
+            await emit(chunker.feed(page_text))
+    if chunker is None and sample:
+        chunker = plan_chunker()
+        await emit(chunker.feed("".join(sample)))
+    if chunker is not None:
+        await emit(chunker.finish())
+
+    text_complete.set()
+    logger.info(f"All pages assembled: {chunk_count} extraction chunks")
+    for _ in range(extraction_workers):
+        await chunk_queue.put(_END)
+
+
+async def _extract_stage(
+    job_id: str,
+    chunk_queue: asyncio.Queue,
+    result_queue: asyncio.Queue,
+    parser,
+    client,
+    progress: _JobProgress,
+):
+    """Stage 3 (one of several workers): AI extraction, bounded by the shared AI scheduler"""
+    from ocr_jobs import get_saved_chunk, save_chunk
+
+    while True:
+        item = await chunk_queue.get()
+        if item is _END:
+            break
+        chunk_index, chunk = item
+
+        questions = get_saved_chunk(job_id, chunk_index, chunk)
+        if questions is not None:
+            logger.info(f"Chunk {chunk_index + 1}: {len(questions)} questions from checkpoint")
+        else:
+            progress.update(f"Extracting chunk {chunk_index + 1}")
             try:
-                results = reader.readtext(
-                    img_array,
-                    paragraph=True,
-                    batch_size=4
-                )
-                page_text = "\n".join([result[1] for result in results])
-                all_text.append(page_text)
-
-                # Log progress every 5 pages
-                if (i + 1) % 5 == 0:
-                    logger.info(f"Progress: {i+1}/{total_pages} pages completed")
-
+                questions = await parser._extract_chunk(client, chunk, f"Chunk {chunk_index + 1}")
+                if questions:
+                    save_chunk(job_id, chunk_index, chunk, questions)
             except Exception as e:
-                logger.error(f"OCR failed on page {i+1}: {e}")
+                logger.error(f"Extraction failed for chunk {chunk_index + 1}: {e}")
+                questions = []
+        await result_queue.put((chunk_index, questions))
+
+
+async def _validate_stage(
+    job_id: str,
+    result_queue: asyncio.Queue,
+    insert_queue: asyncio.Queue,
+    document_parts: List[str],
+    source_filename: str,
+    stats: Dict[str, int],
+):
+    """Stage 4: stitch chunk results in document order, validate and heal questions"""
+    from document_chunking import ChunkStitcher
+    from ocr_jobs import get_inserted_keys, question_key
+
+    stitcher = ChunkStitcher()
+    pending_results: Dict[int, List[Dict]] = {}
+    next_chunk = 0
+    # Questions a previous run of this job already added to the pool
+    inserted_keys = get_inserted_keys(job_id)
+    # Document text so far, joined again only when more pages have been assembled
+    document_text = ""
+    joined_parts = 0
+
+    def full_text() -> str:
+        nonlocal document_text, joined_parts
+        if joined_parts != len(document_parts):
+            document_text = "".join(document_parts)
+            joined_parts = len(document_parts)
+        return document_text
+
+    async def validate(questions: List[Dict]):
+        for q in questions:
+            stats["extracted"] += 1
+            key = question_key(q)
+            if key in inserted_keys:
+                stats["already_inserted"] += 1
                 continue
+            q = await validate_extracted_question(q, stats["extracted"], full_text(), stats)
+            if q is not None:
+                # Question is valid (or was successfully healed)
+                q["source_file"] = source_filename
+                await insert_queue.put((key, q))
+
+    while True:
+        item = await result_queue.get()
+        if item is _END:
+            break
+        chunk_index, questions = item
+        pending_results[chunk_index] = questions
+        while next_chunk in pending_results:
+            await validate(stitcher.add(pending_results.pop(next_chunk) or []))
+            next_chunk += 1
+
+    await validate(stitcher.finish())
+    await insert_queue.put(_END)
+
+
+async def _insert_stage(
+    job_id: str,
+    insert_queue: asyncio.Queue,
+    document_parts: List[str],
+    text_complete: asyncio.Event,
+    pool_id: str,
+    source_filename: str,
+    stats: Dict[str, int],
+    progress: _JobProgress,
+):
+    """
+    Stage 5: batched DB inserts. Inserts start once all pages are assembled, so an answer
+    key at the end of the document can still correct questions extracted before it.
+    """
+    from db import db
+    from document_chunking import apply_answer_key, build_answer_key_index
+    from ocr_jobs import mark_inserted
 
-        pdf_doc.close()
-
-        combined_text = "\n\n".join(all_text)
-        logger.info(f"OCR completed: {len(combined_text)} characters extracted from {total_pages} pages")
-
-        if not combined_text or len(combined_text) < 100:
-            logger.error("OCR did not extract sufficient text")
-            return
-
-        # Parse questions from extracted text
-        logger.info("Parsing questions from extracted text...")
-        questions = parser._parse_questions_with_ai(combined_text)
-
-        if not questions:
-            logger.error("No questions could be extracted from OCR text")
-            return
-
-        logger.info(f"Extracted {len(questions)} questions")
-
-        # Validate and filter questions
-        valid_questions = []
-        invalid_count = 0
-        healed_count = 0
-        incomplete_skipped = 0
-
-        for idx, q in enumerate(questions, 1):
-            # Check if question has all required fields
-            if not q.get("question") or not isinstance(q.get("choices"), list):
-                logger.warning(f"Question {idx} missing question text or choices - skipping")
-                invalid_count += 1
-                continue
+    batch: List[Tuple[str, Dict]] = []
+    answer_index = None
 
-            # Check if choices is not empty
-            if len(q["choices"]) == 0:
-                logger.warning(f"Question {idx} has empty choices array - skipping")
-                invalid_count += 1
-                continue
+    async def flush():
+        nonlocal batch, answer_index
+        if answer_index is None:
+            answer_index = build_answer_key_index("".join(document_parts))
+        questions = [q for _, q in batch]
+        stats["answer_key_applied"] += apply_answer_key(questions, answer_index)
 
-            # Check if correct_index is valid
-            if not isinstance(q.get("correct_index"), int):
-                logger.warning(f"Question {idx} missing or invalid correct_index - skipping")
-                invalid_count += 1
-                continue
+        success = await db.add_questions_to_pool(
+            pool_id=pool_id,
+            questions=questions,
+            source_file=source_filename,
+            batch_id=None
+        )
+        if success:
+            mark_inserted(job_id, [key for key, _ in batch])
+            stats["inserted"] += len(batch)
+            logger.info(f"Inserted batch of {len(batch)} questions ({stats['inserted']} so far)")
+        else:
+            stats["insert_failed"] += len(batch)
+            logger.error(f"❌ Failed to add batch of {len(batch)} questions to pool")
+        progress.update(f"Added {stats['inserted']} questions", force=True)
+        batch = []
+
+    while True:
+        item = await insert_queue.get()
+        if item is _END:
+            break
+        batch.append(item)
+        if len(batch) >= INSERT_BATCH_SIZE and text_complete.is_set():
+            await flush()
+
+    if batch:
+        await flush()
+
+
+async def _gather_stages(*stages):
+    """Run pipeline stages concurrently; if one fails, cancel the rest and re-raise"""
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
 
-            if q["correct_index"] < 0 or q["correct_index"] >= len(q["choices"]):
-                logger.warning(f"Question {idx} has correct_index {q['correct_index']} out of range for {len(q['choices'])} choices - skipping")
-                invalid_count += 1
-                continue
 
-            # Check for OCR corruption (malformed text)
-            question_text = q.get("question", "")
-            corruption_reason = detect_ocr_corruption(question_text)
+async def run_ocr_job(job_id: str):
+    """
+    Run (or resume) a background OCR import job.
 
-            if corruption_reason:
-                logger.warning(f"Question {idx}: OCR corruption detected - {corruption_reason}")
-                logger.warning(f"  Question text: {question_text[:100]}...")
-                logger.warning(f"  Skipping corrupted question")
-                invalid_count += 1
-                continue
+    Runs as a streaming pipeline so the AI works while pages are still being OCRed:
+    OCR pages -> assemble chunks (page order) -> concurrent AI extraction -> validation
+    -> batched DB insert. Each stage is connected by a queue and starts on the previous
+    stage's output as soon as it is available. OCR pages, chunk results and inserted
+    questions are checkpointed (see ocr_jobs), so a rerun continues where the last one died.
+    """
+    import httpx
 
-            # Check for incomplete questions (missing context)
-            incomplete_reason = detect_incomplete_question(question_text)
-
-            if incomplete_reason:
-                logger.info(f"Question {idx}: Detected incomplete - {incomplete_reason}")
-                logger.info(f"  Attempting to heal question...")
-
-                # Try to heal the question
-                success, healed_q = await attempt_heal_question(q, combined_text, idx)
-
-                if success and healed_q:
-                    # Use the healed question
-                    q = healed_q
-                    healed_count += 1
-                    logger.info(f"Question {idx}: ✅ Successfully healed")
-                else:
-                    # Could not heal - skip this question
-                    logger.warning(f"Question {idx}: ❌ Could not heal - skipping")
-                    incomplete_skipped += 1
-                    continue
+    from ai_scheduler import ai_scheduler
+    from background_task_status import complete_task, fail_task, start_task
+    from document_parser import DocumentParser
+    from ocr_engine import classify_pdf_pages
+    from ocr_jobs import finish_job, get_source_path, load_job, process_started_at, update_job
+
+    job = load_job(job_id)
+    if job is None:
+        logger.error(f"OCR job {job_id} not found")
+        return
+    pool_id = job["pool_id"]
+    pool_name = job["pool_name"]
+    source_filename = job["source_filename"]
+
+    logger.info(f"Starting background OCR processing for: {source_filename} (job {job_id})")
+    logger.info(f"Pool: {pool_name} (ID: {pool_id})")
+    update_job(
+        job_id,
+        status="running",
+        pid=os.getpid(),
+        pid_started_at=process_started_at(os.getpid()),
+        attempts=job.get("attempts", 0) + 1,
+    )
 
-            # Question is valid (or was successfully healed)
-            q["source_file"] = source_filename
-            valid_questions.append(q)
+    try:
+        # Initialize parser
+        parser = DocumentParser()
+        if not parser.has_ai_access():
+            raise RuntimeError("OpenRouter API key not configured - cannot extract questions")
+
+        # Only pages without a usable text layer are OCRed (no page limit in background)
+        page_layers = await asyncio.to_thread(classify_pdf_pages, get_source_path(job_id))
+        total_pages = len(page_layers)
+        ocr_count = sum(1 for layer in page_layers if layer["needs_ocr"])
+        logger.info(f"PDF has {total_pages} pages - {ocr_count} need OCR")
+        update_job(job_id, total_pages=total_pages)
+        start_task(
+            job_id,
+            "ocr_import",
+            f"OCR import: {source_filename}",
+            total_items=total_pages,
+            pool_id=pool_id,
+            pool_name=pool_name,
+        )
 
-        logger.info(f"Validation complete: {len(valid_questions)} valid, {invalid_count} invalid, {healed_count} healed, {incomplete_skipped} incomplete (skipped)")
+        page_queue: asyncio.Queue = asyncio.Queue(maxsize=PAGE_QUEUE_SIZE)
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=ai_scheduler.max_concurrency)
+        result_queue: asyncio.Queue = asyncio.Queue()
+        insert_queue: asyncio.Queue = asyncio.Queue()
+        text_complete = asyncio.Event()
+        document_parts: List[str] = []
+        stats = {
+            "pages_done": 0,
+            "failed_pages": 0,
+            "extracted": 0,
+            "already_inserted": 0,
+            "invalid": 0,
+            "healed": 0,
+            "incomplete_skipped": 0,
+            "inserted": 0,
+            "insert_failed": 0,
+            "answer_key_applied": 0,
+        }
+        progress = _JobProgress(job_id, stats)
+        workers = ai_scheduler.max_concurrency
+
+        async with httpx.AsyncClient(timeout=60.0) as client:
+
+            async def extraction():
+                await _gather_stages(
+                    *(
+                        _extract_stage(job_id, chunk_queue, result_queue, parser, client, progress)
+                        for _ in range(workers)
+                    )
+                )
+                await result_queue.put(_END)
+
+            # One failed stage cancels the others (they would wait on its queue forever)
+            await _gather_stages(
+                _ocr_stage(job_id, page_layers, page_queue, stats, progress),
+                _assemble_stage(
+                    job_id, page_queue, chunk_queue, parser, document_parts, text_complete, workers
+                ),
+                extraction(),
+                _validate_stage(
+                    job_id, result_queue, insert_queue, document_parts, source_filename, stats
+                ),
+                _insert_stage(
+                    job_id,
+                    insert_queue,
+                    document_parts,
+                    text_complete,
+                    pool_id,
+                    source_filename,
+                    stats,
+                    progress,
+                ),
+            )
+
+        combined_length = sum(len(part) for part in document_parts)
+        logger.info(f"OCR completed: {combined_length} characters extracted from {total_pages} pages")
+        logger.info(
+            f"Validation complete: {stats['extracted']} extracted, {stats['inserted']} added, "
+            f"{stats['already_inserted']} added by an earlier run, "
+            f"{stats['invalid']} invalid, {stats['healed']} healed, "
+            f"{stats['incomplete_skipped']} incomplete (skipped), "
+            f"{stats['answer_key_applied']} answers set from the answer key"
+        )
 
-        if not valid_questions:
-            logger.error("No valid questions after validation")
+        if stats["insert_failed"]:
+            # Keep the checkpoints so a resume only retries the failed inserts
+            message = f"{stats['insert_failed']} questions could not be added to the pool"
+            logger.error(f"❌ {message}")
+            finish_job(job_id, "failed", message)
+            fail_task(job_id, message)
             return
 
-        # Add questions to pool
-        logger.info(f"Adding {len(valid_questions)} valid questions to pool {pool_name}...")
-
-        success = await db.add_questions_to_pool(
-            pool_id=pool_id,
-            questions=valid_questions,
-            source_file=source_filename,
-            batch_id=None
-        )
-
-        if success:
-            logger.info(f"✅ Successfully added {len(valid_questions)} questions to pool {pool_name}")
+        if not stats["extracted"]:
+            logger.error("No questions could be extracted from OCR text")
+        elif stats["inserted"]:
+            logger.info(f"✅ Successfully added {stats['inserted']} questions to pool {pool_name}")
 
             # Trigger health check to catch any incomplete explanations
             try:
@@ -359,26 +695,75 @@ async def process_scanned_pdf(file_path: str, pool_id: str, pool_name: str, sour
                 await auto_check_and_restart_incomplete_pools()
             except Exception as e:
                 logger.error(f"Failed to run post-upload health check: {e}")
-        else:
-            logger.error(f"❌ Failed to add questions to pool")
-
-        # Clean up temporary file
-        try:
-            os.remove(file_path)
-            logger.info(f"Cleaned up temporary file: {file_path}")
-        except Exception as e:
-            logger.warning(f"Could not delete temporary file: {e}")
 
+        finish_job(job_id, "completed")
+        complete_task(
+            job_id,
+            processed=stats["pages_done"],
+            fixed=stats["inserted"] + stats["already_inserted"],
+            errors=stats["failed_pages"] + stats["invalid"],
+            message=f"{stats['inserted']} questions added",
+        )
         logger.info("Background OCR processing complete!")
 
     except Exception as e:
         logger.error(f"Fatal error in background OCR processing: {e}", exc_info=True)
+        finish_job(job_id, "failed", str(e))
+        fail_task(job_id, str(e))
+
+
+async def process_scanned_pdf(file_path: str, pool_id: str, pool_name: str, source_filename: str):
+    """
+    Process a scanned PDF with OCR in the background (creates or resumes its job)
+
+    Args:
+        file_path: Path to the saved PDF file
+        pool_id: ID of the pool to add questions to
+        pool_name: Name of the pool
+        source_filename: Original filename
+    """
+    from ocr_jobs import create_job
+
+    with open(file_path, 'rb') as f:
+        file_bytes = f.read()
+    logger.info(f"File loaded: {len(file_bytes)} bytes")
+
+    # The job keeps its own copy of the PDF
+    job_id = create_job(file_bytes, pool_id, pool_name, source_filename)
+    try:
+        os.remove(file_path)
+        logger.info(f"Cleaned up temporary file: {file_path}")
+    except Exception as e:
+        logger.warning(f"Could not delete temporary file: {e}")
+
+    await run_ocr_job(job_id)
 
 
 async def main():
-    """Main entry point for background OCR processor"""
+    """
+    Main entry point for background OCR processor
+
+    Usage:
+        background_ocr_processor.py --job <job_id>            run or resume a job
+        background_ocr_processor.py --resume-interrupted      resume every interrupted job
+        background_ocr_processor.py <file_path> <pool_id> <pool_name> <source_filename>
+    """
+    if len(sys.argv) == 3 and sys.argv[1] == "--job":
+        await run_ocr_job(sys.argv[2])
+        return
+
+    if len(sys.argv) == 2 and sys.argv[1] == "--resume-interrupted":
+        from ocr_jobs import list_resumable_jobs
+
+        jobs = list_resumable_jobs()
+        logger.info(f"Resuming {len(jobs)} interrupted OCR jobs")
+        for job in jobs:
+            await run_ocr_job(job["job_id"])
+        return
+
     if len(sys.argv) < 5:
         logger.error("Usage: python background_ocr_processor.py <file_path> <pool_id> <pool_name> <source_filename>")
+        logger.error("       python background_ocr_processor.py --job <job_id> | --resume-interrupted")
         sys.exit(1)
 
     file_path = sys.argv[1]
@@ -0,0 +1,346 @@
+"""
+Background Pool Deduplication
+Finds near-duplicate questions across a whole pool and marks all but one per cluster as
+duplicates (is_duplicate / duplicate_of), so they are left out of generated mocks.
+Cleans up duplicates that got in before AI detection existed or via skip_duplicates=False.
+
+1. Builds the MinHash/LSH similarity index over every question in the pool
+2. Links near-exact LSH candidate pairs (same numbers, see NEAR_DUPLICATE_SIMILARITY) and
+   borderline pairs the AI already judged duplicates in duplicate_cache; union-find groups
+   linked questions
+3. Keeps the best question of each group (real explanation, fewest open reports, oldest)
+   and marks only the questions linked to it directly - no transitive chains - then
+   repeats with the rest of the group
+
+No new AI calls are made, so large pools (50k questions) run in minutes on one machine.
+The admin page runs a dry run first and applies it after confirmation.
+
+    python background_pool_dedupe.py <pool_id> --dry-run    # report clusters only
+    python background_pool_dedupe.py <pool_id>
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from question_pool_manager import _pair_key, calculate_question_hash
+from similarity_index import (
+    BORDERLINE_SIMILARITY,
+    NEAR_DUPLICATE_SIMILARITY,
+    SimilarityIndex,
+    same_numbers,
+)
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.FileHandler("background_pool_dedupe.log"), logging.StreamHandler()],
+)
+logger = logging.getLogger(__name__)
+
+# Rows fetched per page when loading the pool and its reports
+PAGE_SIZE = 1000
+# Question ids per bulk update (kept well under URL length limits)
+UPDATE_BATCH_SIZE = 200
+
+PLACEHOLDER_EXPLANATION_PREFIX = "The correct answer is:"
+
+
+class UnionFind:
+    """Disjoint sets over 0..size-1 (path halving, union by size)"""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> bool:
+        """Merge the sets of a and b; False if they were already together"""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return True
+
+    def groups(self) -> List[List[int]]:
+        """Sets with more than one member"""
+        members: Dict[int, List[int]] = {}
+        for item in range(len(self.parent)):
+            members.setdefault(self.find(item), []).append(item)
+        return [group for group in members.values() if len(group) > 1]
+
+
+def _load_pool_questions(client, pool_id: str) -> List[Dict[str, Any]]:
+    """Every question of a pool (only the columns the job needs), paged"""
+    questions = []
+    start = 0
+    while True:
+        result = (
+            client.table("pool_questions")
+            .select(
+                "id, question_text, choices, explanation, content_hash, is_duplicate, "
+                "duplicate_of, created_at"
+            )
+            .eq("pool_id", pool_id)
+            .order("id")
+            .range(start, start + PAGE_SIZE - 1)
+            .execute()
+        )
+        rows = result.data or []
+        for row in rows:
+            if isinstance(row.get("choices"), str):
+                try:
+                    row["choices"] = json.loads(row["choices"])
+                except json.JSONDecodeError:
+                    row["choices"] = [row["choices"]]
+            row["question"] = row.get("question_text") or ""
+        questions.extend(rows)
+        if len(rows) < PAGE_SIZE:
+            return questions
+        start += PAGE_SIZE
+
+
+def _load_report_counts(client, question_ids: set) -> Dict[str, int]:
+    """Open (not dismissed) user reports per question of the pool"""
+    counts: Dict[str, int] = {}
+    start = 0
+    while True:
+        result = (
+            client.table("reported_questions")
+            .select("question_id")
+            .neq("status", "dismissed")
+            .order("id")
+            .range(start, start + PAGE_SIZE - 1)
+            .execute()
+        )
+        rows = result.data or []
+        for row in rows:
+            if row["question_id"] in question_ids:
+                counts[row["question_id"]] = counts.get(row["question_id"], 0) + 1
+        if len(rows) < PAGE_SIZE:
+            return counts
+        start += PAGE_SIZE
+
+
+def _canonical_rank(question: Dict[str, Any], report_count: int) -> Tuple:
+    """Sort key - the best question to keep in a cluster sorts first"""
+    explanation = (question.get("explanation") or "").strip()
+    has_explanation = bool(explanation) and not explanation.startswith(
+        PLACEHOLDER_EXPLANATION_PREFIX
+    )
+    return (
+        not has_explanation,
+        report_count,
+        -len(explanation),
+        question.get("created_at") or "",
+        question["id"],
+    )
+
+
+def find_candidate_pairs(
+    questions: List[Dict[str, Any]]
+) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """
+    Near-duplicate pairs among questions, from one similarity index over all of them
+
+    Returns:
+        (near-exact position pairs, borderline position pairs worth an AI verdict)
+    """
+    index = SimilarityIndex()
+    for position, question in enumerate(questions):
+        index.add(position, question)
+
+    near_duplicates = []
+    borderline = []
+    for a, b, similarity in index.candidate_pairs(BORDERLINE_SIMILARITY):
+        if similarity >= NEAR_DUPLICATE_SIMILARITY and same_numbers(questions[a], questions[b]):
+            near_duplicates.append((a, b))
+        else:
+            borderline.append((a, b))
+    return near_duplicates, borderline
+
+
+def _star_clusters(
+    groups: List[List[int]], links: Dict[int, Set[int]], rank
+) -> List[Tuple[int, List[int]]]:
+    """
+    Split linked groups into (canonical, duplicates) clusters where every duplicate is
+    linked to its canonical question directly: the best-ranked question keeps its direct
+    links, the rest of the group is split the same way
+    """
+    clusters = []
+    for group in groups:
+        remaining = sorted(group, key=rank)
+        while len(remaining) > 1:
+            canonical = remaining[0]
+            duplicates = [position for position in remaining[1:] if position in links[canonical]]
+            if duplicates:
+                clusters.append((canonical, duplicates))
+            taken = set(duplicates)
+            remaining = [position for position in remaining[1:] if position not in taken]
+    return clusters
+
+
+async def _mark_duplicates(client, duplicate_of: Dict[str, List[str]], canonical_ids: List[str]):
+    """Bulk-mark duplicates (one update per canonical question and id batch)"""
+    for canonical_id, duplicate_ids in duplicate_of.items():
+        for i in range(0, len(duplicate_ids), UPDATE_BATCH_SIZE):
+            client.table("pool_questions").update(
+                {"is_duplicate": True, "duplicate_of": canonical_id}
+            ).in_("id", duplicate_ids[i : i + UPDATE_BATCH_SIZE]).execute()
+
+    # Canonical questions marked as duplicates by an earlier run are now the kept copy
+    for i in range(0, len(canonical_ids), UPDATE_BATCH_SIZE):
+        client.table("pool_questions").update({"is_duplicate": False, "duplicate_of": None}).in_(
+            "id", canonical_ids[i : i + UPDATE_BATCH_SIZE]
+        ).execute()
+
+
+async def dedupe_pool(
+    pool_id: str, task_id: Optional[str] = None, dry_run: bool = False
+) -> Dict[str, int]:
+    """
+    Cluster a pool's near-duplicates and mark all but the canonical question of each
+    cluster as duplicates
+
+    Returns:
+        Counts: questions, clusters, duplicates (marked), updated (rows changed)
+    """
+    from background_task_status import complete_task, fail_task, start_task, update_task_progress
+    from db import db
+
+    stats = {"questions": 0, "clusters": 0, "duplicates": 0, "updated": 0}
+    try:
+        # Use admin_client to bypass RLS policies
+        client = db.admin_client if db.admin_client else db.client
+        started = time.perf_counter()
+
+        questions = _load_pool_questions(client, pool_id)
+        stats["questions"] = len(questions)
+        logger.info(f"Loaded {len(questions)} questions from pool {pool_id}")
+        if task_id:
+            start_task(
+                task_id=task_id,
+                task_type="pool_dedupe",
+                description="Finding duplicate questions" + (" (dry run)" if dry_run else ""),
+                total_items=len(questions),
+                pool_id=pool_id,
+            )
+        if len(questions) < 2:
+            if task_id:
+                complete_task(task_id, len(questions), 0, 0, "No duplicates found")
+            return stats
+
+        for question in questions:
+            if not question.get("content_hash"):
+                question["content_hash"] = calculate_question_hash(question)
+
+        near_duplicates, borderline = find_candidate_pairs(questions)
+        groups = UnionFind(len(questions))
+        links: Dict[int, Set[int]] = {}
+
+        def link(a: int, b: int):
+            groups.union(a, b)
+            links.setdefault(a, set()).add(b)
+            links.setdefault(b, set()).add(a)
+
+        for a, b in near_duplicates:
+            link(a, b)
+
+        # Borderline pairs are merged only if the AI already judged them duplicates
+        pair_keys = {
+            (a, b): _pair_key(questions[a]["content_hash"], questions[b]["content_hash"])
+            for a, b in borderline
+        }
+        verdicts = (
+            await db.get_duplicate_verdicts(list(set(pair_keys.values()))) if pair_keys else {}
+        )
+        for (a, b), pair in pair_keys.items():
+            if pair in verdicts and verdicts[pair]["is_duplicate"]:
+                link(a, b)
+
+        report_counts = _load_report_counts(client, {q["id"] for q in questions})
+        clusters = _star_clusters(
+            groups.groups(),
+            links,
+            lambda position: _canonical_rank(
+                questions[position], report_counts.get(questions[position]["id"], 0)
+            ),
+        )
+        logger.info(
+            f"Found {len(clusters)} duplicate clusters ({len(near_duplicates)} near-exact, "
+            f"{len(borderline)} borderline pairs) in {time.perf_counter() - started:.1f}s"
+        )
+        if task_id:
+            update_task_progress(
+                task_id, len(questions), 0, 0, f"{len(clusters)} duplicate clusters"
+            )
+
+        duplicate_of: Dict[str, List[str]] = {}
+        canonical_ids = []
+        for canonical_position, duplicate_positions in clusters:
+            canonical = questions[canonical_position]
+            if canonical.get("is_duplicate") or canonical.get("duplicate_of"):
+                canonical_ids.append(canonical["id"])
+            stats["duplicates"] += len(duplicate_positions)
+            for question in (questions[position] for position in duplicate_positions):
+                if question.get("is_duplicate") and question.get("duplicate_of") == canonical["id"]:
+                    continue
+                duplicate_of.setdefault(canonical["id"], []).append(question["id"])
+        stats["clusters"] = len(clusters)
+        stats["updated"] = sum(len(ids) for ids in duplicate_of.values()) + len(canonical_ids)
+
+        if dry_run:
+            logger.info(f"Dry run - would update {stats['updated']} questions")
+            message = (
+                f"Dry run: {stats['clusters']} clusters, {stats['duplicates']} questions "
+                f"would be marked duplicates ({stats['updated']} questions to update)"
+            )
+        else:
+            await _mark_duplicates(client, duplicate_of, canonical_ids)
+            message = (
+                f"{stats['clusters']} clusters, {stats['duplicates']} duplicates marked "
+                f"({stats['updated']} questions updated)"
+            )
+        logger.info(f"Pool dedupe complete in {time.perf_counter() - started:.1f}s: {message}")
+        if task_id:
+            complete_task(task_id, len(questions), stats["duplicates"], 0, message)
+        return stats
+
+    except Exception as e:
+        logger.error(f"Fatal error in pool dedupe: {e}", exc_info=True)
+        if task_id:
+            fail_task(task_id, str(e))
+        return stats
+
+
+async def main():
+    """Main entry point for background worker"""
+    parser = argparse.ArgumentParser(description="Mark near-duplicate questions in a pool")
+    parser.add_argument("pool_id")
+    parser.add_argument("--dry-run", action="store_true", help="report clusters only")
+    parser.add_argument("--task-id", help="background task status id (default: generated)")
+    args = parser.parse_args()
+
+    task_id = args.task_id or f"pool_dedupe_{uuid.uuid4().hex[:8]}"
+    logger.info(f"Background pool dedupe started (task {task_id}, pool {args.pool_id})")
+    await dedupe_pool(args.pool_id, task_id, args.dry_run)
+    logger.info("Background pool dedupe finished")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
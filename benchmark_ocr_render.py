@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark OCR page rendering: legacy RGB path vs zero-copy grayscale path.
+
+Builds a synthetic scanned PDF (text pages rasterised and slightly skewed), then renders
+every page with each variant in its own subprocess so peak RSS is measured per variant.
+
+    python benchmark_ocr_render.py --pages 20
+    python benchmark_ocr_render.py --pages 5 --ocr      # also run EasyOCR (slow)
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import fitz
+import numpy as np
+from PIL import Image
+
+VARIANTS = ["rgb", "gray", "gray_binarize", "gray_deskew", "gray_adaptive_all"]
+
+SAMPLE_LINE = (
+    "{n}. Which of the following statements about unit trusts is correct? "
+    "A. Units are priced daily  B. Fees are fixed  C. Returns are guaranteed"
+)
+
+
+def build_scanned_pdf(path: str, pages: int, skew_degrees: float = 1.5):
+    """Text pages rasterised to images (like a scanner would), alternating skew direction"""
+    source = fitz.open()
+    scanned = fitz.open()
+    for page_number in range(pages):
+        page = source.new_page()
+        y = 60
+        for line in range(35):
+            page.insert_text((40, y), SAMPLE_LINE.format(n=line + 1)[:95], fontsize=9)
+            y += 21
+        skew = skew_degrees if page_number % 2 == 0 else -skew_degrees
+        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2).prerotate(skew))
+        scanned_page = scanned.new_page()
+        scanned_page.insert_image(scanned_page.rect, pixmap=pix)
+    scanned.save(path)
+
+
+def _render_rgb(page, dpi: int):
+    """Rendering as done before: RGB pixmap -> PIL image -> NumPy copy"""
+    pix = page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72))
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    return pix, np.array(img)
+
+
+def run_variant(pdf_path: str, variant: str, dpi: int, run_ocr: bool) -> dict:
+    """Render (and optionally OCR) every page with one variant"""
+    import ocr_engine
+
+    options = {
+        "gray": {},
+        "gray_binarize": {"binarize_image": True},
+        "gray_deskew": {"deskew": True},
+        "gray_adaptive_all": {"adaptive_dpi": True, "binarize_image": True, "deskew": True},
+    }.get(variant)
+
+    doc = fitz.open(pdf_path)
+    start = time.perf_counter()
+    pixels = 0
+    for page in doc:
+        if variant == "rgb":
+            pix, array = _render_rgb(page, dpi)
+        else:
+            pix, array = ocr_engine._prepare_page_image(
+                page,
+                dpi,
+                options.get("adaptive_dpi", False),
+                options.get("binarize_image", False),
+                options.get("deskew", False),
+            )
+        pixels += array.size
+        if run_ocr:
+            ocr_engine.ocr_image(array, paragraph=False)
+        del array, pix
+    elapsed = time.perf_counter() - start
+
+    return {
+        "variant": variant,
+        "pages": len(doc),
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(len(doc) / elapsed, 2),
+        "mpixels": round(pixels / 1e6, 1),
+        # ru_maxrss is KB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR page rendering")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--ocr", action="store_true", help="also run EasyOCR on each page")
+    parser.add_argument("--variant", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--pdf", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        # Child process: one variant, result as JSON on stdout
+        print(json.dumps(run_variant(args.pdf, args.variant, args.dpi, args.ocr)))
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = os.path.join(temp_dir, "scanned.pdf")
+        build_scanned_pdf(pdf_path, args.pages)
+        print(f"Synthetic scanned PDF: {args.pages} pages, {args.dpi} DPI\n")
+        print(f"{'variant':<20}{'pages/s':>10}{'seconds':>10}{'Mpixels':>10}{'peak RSS MB':>14}")
+
+        for variant in VARIANTS:
+            command = [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--variant",
+                variant,
+                "--pdf",
+                pdf_path,
+                "--dpi",
+                str(args.dpi),
+            ]
+            if args.ocr:
+                command.append("--ocr")
+            output = subprocess.run(command, capture_output=True, text=True, check=True)
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            print(
+                f"{variant:<20}{result['pages_per_sec']:>10}{result['seconds']:>10}"
+                f"{result['mpixels']:>10}{result['peak_rss_mb']:>14}"
+            )
+
+
+if __name__ == "__main__":
+    main()
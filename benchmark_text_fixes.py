@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark question text auto-fixes: one re.sub per rule (as before) vs the compiled rules.
+
+Builds a synthetic corpus of exam questions, a share of them with the OCR errors the
+auto-fix rules target, checks both paths produce identical output and fixes, and prints
+the timings.
+
+    python benchmark_text_fixes.py                  # 10k questions
+    python benchmark_text_fixes.py --questions 50000 --dirty 0.3
+"""
+
+import argparse
+import random
+import re
+import time
+
+from question_text_validator import QuestionTextValidator
+
+CLEAN_SENTENCES = [
+    "Which of the following statements about unit trusts is correct?",
+    "An investor buys a bond at par and holds it to maturity.",
+    "The fund manager must disclose all fees in the prospectus.",
+    "What is the maximum sales charge for this investment product?",
+    "A customer wants to reduce the risk of his portfolio.",
+    "Under the Securities and Futures Act, which of these is an offence?",
+    "The representative is required to assess the client's needs.",
+    "How is the net asset value of the fund calculated?",
+]
+
+# Snippets the auto-fix rules are written for (and a few near misses)
+DIRTY_SNIPPETS = [
+    "Charli e is trading",
+    "the ma rket price",
+    "a fi nancial adviser",
+    "He suspect ed fraud",
+    "He suspect the broker",
+    "the o rder was placed",
+    "ir trading at a loss",
+    "the r strategy failed",
+    "custom duty applies",
+    "the custom account",
+    "CP F savings",
+    "needs t o be paid",
+    "profit.Then",
+    "really?!!",
+    "wait...",
+    "two  spaces   here",
+    "a* the close",
+]
+
+
+def build_corpus(size: int, dirty_share: float, seed: int = 7):
+    """Synthetic question texts; dirty_share of them contain OCR-style errors"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        sentences = rng.sample(CLEAN_SENTENCES, 3)
+        if rng.random() < dirty_share:
+            for _ in range(rng.randint(1, 3)):
+                sentences.insert(rng.randrange(len(sentences) + 1), rng.choice(DIRTY_SNIPPETS))
+        corpus.append(" ".join(sentences))
+    return corpus
+
+
+def legacy_fix(text: str):
+    """Auto-fixes as applied before: re.sub with each uncompiled pattern in turn"""
+    fixes_applied = []
+    for pattern, replacement, description in QuestionTextValidator.AUTO_FIX_PATTERNS:
+        new_text = re.sub(pattern, replacement, text)
+        if new_text != text:
+            fixes_applied.append(description)
+            text = new_text
+    return text, fixes_applied
+
+
+def time_pass(fix, corpus, repeat: int):
+    """Best wall time of repeat passes over the corpus, and the last pass's results"""
+    best = float("inf")
+    results = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [fix(text) for text in corpus]
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark question text auto-fixes")
+    parser.add_argument("--questions", type=int, default=10000)
+    parser.add_argument("--dirty", type=float, default=0.2, help="share of questions with errors")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.questions, args.dirty)
+    rules = QuestionTextValidator.compiled_fix_rules()
+
+    legacy_seconds, legacy_results = time_pass(legacy_fix, corpus, args.repeat)
+    compiled_seconds, compiled_results = time_pass(rules.apply, corpus, args.repeat)
+
+    mismatches = sum(1 for a, b in zip(legacy_results, compiled_results) if a != b)
+    fixed = sum(1 for _, fixes in compiled_results if fixes)
+
+    print(
+        f"{args.questions} questions ({fixed} fixed), "
+        f"{len(QuestionTextValidator.AUTO_FIX_PATTERNS)} rules\n"
+    )
+    print(f"{'engine':<12}{'ms':>10}{'us/question':>14}")
+    for name, seconds in (("re.sub", legacy_seconds), ("compiled", compiled_seconds)):
+        print(f"{name:<12}{seconds * 1000:>10.1f}{seconds / len(corpus) * 1e6:>14.2f}")
+    print(f"\nspeedup: {legacy_seconds / compiled_seconds:.1f}x, mismatches: {mismatches}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
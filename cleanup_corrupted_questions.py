@@ -5,6 +5,7 @@ import asyncio
 import logging
 from question_text_validator import QuestionTextValidator
 from db import db
+from question_pool_manager import stored_question_hash
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -59,7 +60,8 @@ async def cleanup_all_pools():
             if fixed_text != original_text:
                 # Update in database
                 update_result = db.admin_client.table('pool_questions').update({
-                    'question_text': fixed_text
+                    'question_text': fixed_text,
+                    'content_hash': stored_question_hash(fixed_text, q.get('choices'))
                 }).eq('id', question_id).execute()
 
                 if update_result.data:
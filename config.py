@@ -114,6 +114,25 @@ CREDIT_PACKS = {
 OPENROUTER_MODEL = "anthropic/claude-3-haiku"
 OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
 
+# AI request scheduling (concurrent document extraction)
+AI_MAX_CONCURRENT_REQUESTS = int(get_secret("AI_MAX_CONCURRENT_REQUESTS", "4"))
+AI_REQUESTS_PER_MINUTE = int(get_secret("AI_REQUESTS_PER_MINUTE", "60"))
+# Files parsed at once during a multi-file question pool upload
+UPLOAD_PARSE_CONCURRENCY = int(get_secret("UPLOAD_PARSE_CONCURRENCY", "4"))
+
+# OCR worker processes (one warmed EasyOCR reader each)
+OCR_MAX_WORKERS = int(get_secret("OCR_MAX_WORKERS", str(os.cpu_count() or 1)))
+# Memory one worker needs (EasyOCR models + torch + a rendered page); the pool is capped
+# so its workers fit in the available memory
+OCR_WORKER_MEMORY_MB = int(get_secret("OCR_WORKER_MEMORY_MB", "1500"))
+# Optional page preprocessing before OCR (adaptive DPI, Otsu binarization, deskew)
+OCR_ADAPTIVE_DPI = get_secret("OCR_ADAPTIVE_DPI", "false").lower() == "true"
+OCR_BINARIZE = get_secret("OCR_BINARIZE", "false").lower() == "true"
+OCR_DESKEW = get_secret("OCR_DESKEW", "false").lower() == "true"
+
+# Content-addressed cache for OCR pages, text chunks and AI-extracted questions
+ARTIFACT_CACHE_MAX_MB = int(get_secret("ARTIFACT_CACHE_MAX_MB", "1024"))
+
 # PDF Configuration
 PDF_TEMPLATE_DIR = "templates"
 PDF_OUTPUT_DIR = "temp_pdfs"
@@ -5,7 +5,7 @@ Database operations and Supabase integration for WantAMock
 import json
 import logging
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 
 import bcrypt
 
@@ -17,6 +17,13 @@ from openrouter_utils import generate_explanation
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Content hashes per IN (...) lookup when checking uploads for exact duplicates
+CONTENT_HASH_QUERY_BATCH_SIZE = 200
+# AI duplicate verdicts per upsert into duplicate_cache
+DUPLICATE_VERDICT_INSERT_BATCH_SIZE = 500
+# Rows per page when streaming a pool's questions
+POOL_QUESTION_PAGE_SIZE = 1000
+
 # Initialize Supabase client only if not in demo mode
 if config.DEMO_MODE:
     logger.info("Running in demo mode - database mocked")
@@ -2073,6 +2080,155 @@ class DatabaseManager:
             logger.error(f"Error getting pool questions: {e}")
             return []
 
+    async def iter_pool_questions(
+        self,
+        pool_id: str,
+        columns: str = "*",
+        source_files: Optional[List[str]] = None,
+        page_size: int = POOL_QUESTION_PAGE_SIZE,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Stream a pool's questions page by page, fetching only the given columns
+        (optionally only questions from the given source files).
+        Raises if a page cannot be fetched.
+        """
+        client = self.admin_client if self.admin_client else self.client
+        start = 0
+        while True:
+            try:
+                query = client.table("pool_questions").select(columns).eq("pool_id", pool_id)
+                if source_files:
+                    query = query.in_("source_file", source_files)
+                result = query.order("id").range(start, start + page_size - 1).execute()
+            except Exception as e:
+                # A partial stream would look like a smaller pool - fail the whole scan instead
+                logger.error(f"Error streaming pool questions (rows from {start}): {e}")
+                raise
+            rows = result.data or []
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            start += page_size
+
+    async def count_pool_questions(self, pool_id: str) -> int:
+        """Number of questions in a pool (without downloading them)"""
+        try:
+            client = self.admin_client if self.admin_client else self.client
+            result = (
+                client.table("pool_questions")
+                .select("id", count="exact")
+                .eq("pool_id", pool_id)
+                .limit(1)
+                .execute()
+            )
+            return result.count if hasattr(result, "count") and result.count else 0
+
+        except Exception as e:
+            logger.error(f"Error counting pool questions: {e}")
+            return 0
+
+    async def get_existing_content_hashes(
+        self, pool_id: str, content_hashes: List[str]
+    ) -> Set[str]:
+        """
+        Which of the given content hashes already exist in a pool
+        (indexed lookup on pool_id + content_hash; the pool itself is not downloaded)
+        """
+        try:
+            client = self.admin_client if self.admin_client else self.client
+            unique_hashes = sorted(set(content_hashes))
+            found: Set[str] = set()
+            # Keep each IN list short enough for the request URL
+            for start in range(0, len(unique_hashes), CONTENT_HASH_QUERY_BATCH_SIZE):
+                batch = unique_hashes[start : start + CONTENT_HASH_QUERY_BATCH_SIZE]
+                result = (
+                    client.table("pool_questions")
+                    .select("content_hash")
+                    .eq("pool_id", pool_id)
+                    .in_("content_hash", batch)
+                    .execute()
+                )
+                found.update(row["content_hash"] for row in result.data or [])
+            return found
+
+        except Exception as e:
+            logger.error(f"Error looking up pool content hashes: {e}")
+            raise
+
+    async def get_duplicate_verdicts(
+        self, pairs: List[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        Cached AI similarity verdicts from duplicate_cache
+
+        Args:
+            pairs: Ordered (question1_hash, question2_hash) content-hash pairs
+
+        Returns:
+            {(question1_hash, question2_hash): {"similarity_score": 0-100, "is_duplicate": bool}}
+            for the pairs that have a verdict
+        """
+        verdicts: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        wanted = set(pairs)
+        if not wanted:
+            return verdicts
+
+        try:
+            client = self.admin_client if self.admin_client else self.client
+            first_hashes = sorted({pair[0] for pair in wanted})
+            for start in range(0, len(first_hashes), CONTENT_HASH_QUERY_BATCH_SIZE):
+                batch = first_hashes[start : start + CONTENT_HASH_QUERY_BATCH_SIZE]
+                result = (
+                    client.table("duplicate_cache")
+                    .select("question1_hash, question2_hash, similarity_score, is_duplicate")
+                    .in_("question1_hash", batch)
+                    .execute()
+                )
+                for row in result.data or []:
+                    pair = (row["question1_hash"], row["question2_hash"])
+                    if pair in wanted:
+                        verdicts[pair] = {
+                            "similarity_score": float(row["similarity_score"]),
+                            "is_duplicate": row["is_duplicate"],
+                        }
+            return verdicts
+
+        except Exception as e:
+            logger.warning(f"Error reading duplicate cache: {e}")
+            return verdicts
+
+    async def store_duplicate_verdicts(self, verdicts: List[Dict[str, Any]]) -> int:
+        """
+        Save AI similarity verdicts to duplicate_cache (upsert on the content-hash pair)
+
+        Args:
+            verdicts: Rows with question1_hash, question2_hash (ordered), similarity_score
+                (0-100), is_duplicate and optionally ai_reasoning
+
+        Returns:
+            Number of verdicts saved
+        """
+        if not verdicts:
+            return 0
+
+        try:
+            client = self.admin_client if self.admin_client else self.client
+            checked_at = datetime.now(timezone.utc).isoformat()
+            rows = [{**verdict, "checked_at": checked_at} for verdict in verdicts]
+            saved = 0
+            for start in range(0, len(rows), DUPLICATE_VERDICT_INSERT_BATCH_SIZE):
+                batch = rows[start : start + DUPLICATE_VERDICT_INSERT_BATCH_SIZE]
+                client.table("duplicate_cache").upsert(
+                    batch, on_conflict="question1_hash,question2_hash"
+                ).execute()
+                saved += len(batch)
+            return saved
+
+        except Exception as e:
+            logger.warning(f"Error saving duplicate verdicts: {e}")
+            return 0
+
     async def get_random_pool_questions(self, pool_id: str, count: int) -> List[Dict[str, Any]]:
         """Get N random questions from a pool (excluding duplicates)"""
         try:
@@ -2183,10 +2339,15 @@ class DatabaseManager:
             return None
 
     async def add_questions_to_pool(
-        self, pool_id: str, questions: List[Dict[str, Any]], source_file: str, batch_id: str
+        self,
+        pool_id: str,
+        questions: List[Dict[str, Any]],
+        source_file: str,
+        batch_id: str,
     ) -> bool:
         """Add questions to pool immediately with document explanations or placeholders.
-        AI explanations are generated in background separately."""
+        AI explanations are generated in background separately.
+        Requires the content_hash column (migrations/add_pool_questions_content_hash.sql)."""
         try:
             if self.demo_mode:
                 # Demo mode - just return success
@@ -2215,6 +2376,8 @@ class DatabaseManager:
                 logger.error("No valid questions to upload after validation!")
                 return False
 
+            from question_pool_manager import calculate_question_hash
+
             # Prepare questions for insertion
             questions_to_insert = []
             questions_with_doc_explanations = 0
@@ -2242,6 +2405,7 @@ class DatabaseManager:
                     "choices": json.dumps(q["choices"]),
                     "correct_answer": q["correct_index"],
                     "explanation": explanation,
+                    "content_hash": calculate_question_hash(q),
                     "source_file": source_file,
                     "upload_batch_id": batch_id,
                     "is_duplicate": q.get("is_duplicate", False),
@@ -5,9 +5,9 @@ Detect and remove questions with OCR text corruption (spelling errors, malformed
 
 import asyncio
 import logging
-import re
 from typing import List, Dict, Tuple
 from db import db
+from ocr_corruption import scan_pool
 
 # Configure logging
 logging.basicConfig(
@@ -17,75 +17,28 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-# Common OCR corruption patterns
-OCR_CORRUPTION_PATTERNS = [
-    # Letter 'o' or 'O' instead of number '0' in prices
-    (r'\$[oO]\.', 'Dollar sign followed by letter o/O instead of zero (e.g., $o.00)'),
-
-    # Common word corruptions (m/n confusion)
-    (r'\bordinai-y\b', 'ordinai-y instead of ordinary'),
-    (r'\bordinan/\b', 'ordinan/ instead of ordinary'),
-    (r'\bstmctures\b', 'stmctures instead of structures'),
-    (r'\binvestrnent\b', 'investrnent instead of investment'),
-    (r'\bgovernrnent\b', 'governrnent instead of government'),
-    (r'\bmanagernent\b', 'managernent instead of management'),
-    (r'\bperforrnance\b', 'performrnance instead of performance'),
-    (r'\brnake\b', 'rnake instead of make'),
-    (r'\brnay\b', 'rnay instead of may'),
-    (r'\brnust\b', 'rnust instead of must'),
-    (r'\brnore\b', 'rnore instead of more'),
-
-    # Number/letter confusion in percentages
-    (r'\b[Il]00\%', 'Letter I or l instead of 1 in 100%'),
-
-    # Multiple consecutive spaces (likely OCR artifact)
-    (r'\s{4,}', 'Four or more consecutive spaces'),
-
-    # Obvious text bleeding/corruption
-    (r'determined by the\s*Choices', 'Question text bleeding into choices'),
-    (r'\.{3,}Choices', 'Question ending with ... directly into Choices'),
-]
-
-
-def detect_ocr_corruption(question_text: str) -> List[Tuple[str, str]]:
-    """
-    Detect OCR corruption in question text.
-
-    Returns list of (pattern, description) tuples for matched corruptions
-    """
-    corruptions = []
-
-    for pattern, description in OCR_CORRUPTION_PATTERNS:
-        if re.search(pattern, question_text, re.IGNORECASE):
-            corruptions.append((pattern, description))
-
-    return corruptions
-
-
 async def analyze_pool_questions(pool_id: str, pool_name: str, verbose: bool = False):
     """Analyze questions in a pool for OCR corruption"""
 
     logger.info(f"Analyzing questions in pool: {pool_name} ({pool_id})")
 
-    # Get all questions from the pool
-    result = db.admin_client.table("pool_questions").select("*").eq("pool_id", pool_id).execute()
+    # Stream the pool and scan it in worker processes
+    scanned, flagged = await scan_pool(
+        pool_id, ("ocr", "bleeding"), columns="id, question_text, choices, source_file"
+    )
 
-    if not result.data:
+    if not scanned:
         logger.warning(f"No questions found in pool {pool_name}")
         return
 
-    questions = result.data
-    logger.info(f"Found {len(questions)} questions in pool")
+    logger.info(f"Scanned {scanned} questions in pool")
 
-    # Detect corrupted questions
+    # Corrupted questions (question text only, as before)
     corrupted = []
-
-    for q in questions:
-        question_text = q.get('question_text', '').strip()
-        corruptions = detect_ocr_corruption(question_text)
-
-        if corruptions:
-            corrupted.append((q, corruptions))
+    for result in flagged:
+        if result["question_hits"]:
+            corruptions = [(pattern, description) for pattern, description, _ in result["question_hits"]]
+            corrupted.append((result["question"], corruptions))
 
     if not corrupted:
         logger.info("✅ No OCR-corrupted questions detected!")
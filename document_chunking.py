@@ -0,0 +1,672 @@
+"""
+Document Chunking for AI Question Extraction
+Plans chunk sizes from token budgets instead of a fixed character count, and splits
+documents at question boundaries so questions and their scenarios stay together
+"""
+
+import json
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Rough token estimate for English exam text (OpenRouter models average ~4 chars/token)
+CHARS_PER_TOKEN = 4
+
+# Used when a model has no entry under "model_limits" in models_config.json
+DEFAULT_MODEL_LIMITS = {"context_tokens": 16000, "max_output_tokens": 4000}
+
+# JSON keys, quoting and choice list per extracted question, on top of the restated text
+QUESTION_OVERHEAD_TOKENS = 40
+
+# Extracted JSON re-states the source text (OCR fixes, escaping)
+OUTPUT_EXPANSION = 1.1
+
+# Only plan to use this share of the output limit (leaves room for estimate error)
+OUTPUT_HEADROOM = 0.8
+
+# Bump when splitting changes so cached chunk lists (artifact cache) are not reused
+CHUNKER_VERSION = "chunker-1"
+
+MIN_CHUNK_CHARS = 1500
+MAX_CHUNK_CHARS = 40000
+
+# Adaptive scale applied to planned chunk size after truncated / clean responses
+TRUNCATION_SHRINK = 0.75
+CLEAN_RESPONSE_GROWTH = 0.05
+MIN_SCALE = 0.4
+
+# Numbered question starts: "12.", "12)", "Q12.", "Question 12:"
+QUESTION_START_PATTERN = re.compile(
+    r"^[ \t]*(?:Q(?:uestion)?[ \t]*)?\d{1,3}[ \t]*[\.\):][ \t]*\S", re.IGNORECASE | re.MULTILINE
+)
+
+# Same, capturing the question number
+QUESTION_NUMBER_PATTERN = re.compile(
+    r"^[ \t]*(?:Q(?:uestion)?[ \t]*)?(\d{1,3})[ \t]*[\.\):][ \t]*\S", re.IGNORECASE
+)
+
+# The "12." / "Q12:" prefix itself
+QUESTION_NUMBER_PREFIX_PATTERN = re.compile(
+    r"^\s*(?:Q(?:uestion)?[ \t]*)?\d{1,3}[ \t]*[\.\):][ \t]*", re.IGNORECASE
+)
+
+# Term sheets / case studies / shared context that precede a group of questions
+SCENARIO_START_PATTERN = re.compile(
+    r"^[ \t]*(?:(?:case[ \t]+study|scenario|(?:product[ \t]+)?term[ \t]+sheet|illustration)\b"
+    r"|(?:use|refer[ \t]+to|read)[ \t]+the[ \t]+(?:following|information)"
+    r"|questions?[ \t]+\d{1,3}[ \t]*(?:to|-|–|and)[ \t]*\d{1,3}[ \t]+(?:relate|refer|are[ \t]+based))",
+    re.IGNORECASE,
+)
+SCENARIO_RANGE_PATTERN = re.compile(
+    r"questions?[ \t]+(\d{1,3})[ \t]*(?:to|-|–|and)[ \t]*(\d{1,3})", re.IGNORECASE
+)
+# Without an explicit "Questions 5 to 8" range, a scenario covers at most this many questions
+SCENARIO_MAX_QUESTIONS = 8
+
+# Answer key section header and its "12. B" / "12 (b)" entries
+ANSWER_KEY_HEADER_PATTERN = re.compile(
+    r"^[ \t]*(?:answer[ \t]*(?:key|sheet)s?|answers|suggested[ \t]+answers|solutions?)[ \t]*:?[ \t]*$",
+    re.IGNORECASE,
+)
+ANSWER_ENTRY_PATTERN = re.compile(r"\b(\d{1,3})[ \t]*[\.\):\-]?[ \t]*\(?([A-Ea-e])\)?(?![A-Za-z])")
+
+# Any line that can start a block (question or scenario), for scanning appended text
+BLOCK_START_PATTERN = re.compile(
+    f"{QUESTION_START_PATTERN.pattern}|{SCENARIO_START_PATTERN.pattern}",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Share of each chunk that may repeat the end of the previous chunk
+OVERLAP_RATIO = 0.1
+MAX_OVERLAP_CHARS = 1500
+
+# Leading questions of a chunk compared against the previous chunk's trailing ones
+STITCH_WINDOW = 3
+
+# Learned per-model state, shared by all planners in this process
+_planner_state: Dict[str, Dict[str, float]] = {}
+_planner_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a piece of text"""
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+
+def count_question_starts(text: str) -> int:
+    """Count numbered question starts in extracted document text"""
+    return len(QUESTION_START_PATTERN.findall(text or ""))
+
+
+def load_model_limits(model: str) -> Dict[str, int]:
+    """Context and output token limits for a model from models_config.json"""
+    limits = dict(DEFAULT_MODEL_LIMITS)
+    try:
+        with open("models_config.json", "r") as f:
+            model_limits = json.load(f).get("model_limits", {})
+        configured = model_limits.get(model) or model_limits.get(model.split(":", 1)[0]) or {}
+        for key in limits:
+            if configured.get(key):
+                limits[key] = int(configured[key])
+        if not configured:
+            logger.warning(f"No model_limits entry for {model}, using defaults {limits}")
+    except FileNotFoundError:
+        logger.warning("models_config.json not found, using default model limits")
+    except Exception as e:
+        logger.error(f"Error loading model limits from models_config.json: {e}")
+    return limits
+
+
+class ChunkPlanner:
+    """
+    Picks extraction chunk sizes that fit a model's input AND output budgets.
+
+    Input budget: context window minus prompt overhead minus the reserved output.
+    Output budget: the model's output limit, estimated from question density
+    (dense pages produce more JSON per input character than sparse ones).
+    Truncated responses shrink future chunks for the model; clean ones let them grow back.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        limits = load_model_limits(model)
+        self.context_tokens = limits["context_tokens"]
+        self.max_output_tokens = limits["max_output_tokens"]
+
+    def _get_state(self) -> Dict[str, float]:
+        """Learned state for this model (caller holds _planner_lock when mutating)"""
+        # output_correction: observed / estimated output tokens (e.g. scenarios repeated
+        # on every question push it above 1.0)
+        return _planner_state.setdefault(self.model, {"scale": 1.0, "output_correction": 1.0})
+
+    def estimate_output_tokens(self, text: str) -> int:
+        """Estimate the output tokens needed to extract every question in text"""
+        state = self._get_state()
+        estimate = (
+            estimate_tokens(text) * OUTPUT_EXPANSION
+            + count_question_starts(text) * QUESTION_OVERHEAD_TOKENS
+        )
+        return int(estimate * state["output_correction"])
+
+    def plan_chunk_chars(self, text: str, prompt_overhead_chars: int = 0) -> int:
+        """
+        Chunk size (characters) for this document.
+
+        Args:
+            text: Full document text (used for question density)
+            prompt_overhead_chars: Size of the extraction prompt without document text
+        """
+        state = self._get_state()
+
+        prompt_overhead_tokens = prompt_overhead_chars // CHARS_PER_TOKEN + 1
+        input_budget = self.context_tokens - prompt_overhead_tokens - self.max_output_tokens
+        chars_by_input = max(0, input_budget) * CHARS_PER_TOKEN
+
+        # Output tokens generated per input character at this document's question density
+        output_per_char = self.estimate_output_tokens(text) / max(1, len(text))
+        chars_by_output = self.max_output_tokens * OUTPUT_HEADROOM / max(output_per_char, 1e-6)
+
+        chunk_chars = int(min(chars_by_input, chars_by_output) * state["scale"])
+        chunk_chars = max(MIN_CHUNK_CHARS, min(MAX_CHUNK_CHARS, chunk_chars))
+
+        logger.info(
+            f"Chunk plan for {self.model}: {chunk_chars} chars "
+            f"(input limit {chars_by_input}, output limit {int(chars_by_output)}, "
+            f"scale {state['scale']:.2f}, output correction {state['output_correction']:.2f})"
+        )
+        return chunk_chars
+
+    def record_response(
+        self, expected_output_tokens: int, response_chars: int, truncated: bool
+    ) -> Dict[str, float]:
+        """
+        Feed back one extraction response so later chunks adapt.
+
+        Args:
+            expected_output_tokens: estimate_output_tokens() of the chunk that was sent
+            response_chars: Length of the model's response
+            truncated: Whether the response was cut off
+        """
+        with _planner_lock:
+            state = self._get_state()
+
+            if expected_output_tokens > 0:
+                observed = (response_chars / CHARS_PER_TOKEN) / (
+                    expected_output_tokens / state["output_correction"]
+                )
+                # A truncated response is only a lower bound on what the chunk needed
+                if not truncated or observed > state["output_correction"]:
+                    # Exponential moving average so one odd chunk doesn't swing the plan
+                    state["output_correction"] = 0.7 * state["output_correction"] + 0.3 * observed
+
+            if truncated:
+                state["scale"] = max(MIN_SCALE, state["scale"] * TRUNCATION_SHRINK)
+                logger.info(
+                    f"Extraction truncated on {self.model}, chunk scale -> {state['scale']:.2f}"
+                )
+            else:
+                state["scale"] = min(1.0, state["scale"] + CLEAN_RESPONSE_GROWTH)
+
+            return dict(state)
+
+
+def _new_block(kind: str, number: Optional[int] = None, start: int = 0) -> Dict[str, Any]:
+    return {"kind": kind, "lines": [], "number": number, "scenario": None, "start": start}
+
+
+def parse_document_blocks(text: str) -> Dict[str, Any]:
+    """
+    Single pass over the lines of a document.
+
+    Returns:
+        {
+            'blocks': list of {'kind': 'text'|'scenario'|'question', 'lines', 'number',
+                               'scenario': index of the scenario block it belongs to,
+                               'start': offset of the block's first line in text},
+            'answer_key': {question_number: letter} from answer-key sections
+        }
+    """
+    blocks: List[Dict[str, Any]] = [_new_block("text")]
+    answer_key: Dict[int, str] = {}
+    answer_key_lines: List[str] = []
+    answer_key_conflict = False
+    in_answer_key = False
+
+    active_scenario: Optional[int] = None
+    scenario_range: Optional[tuple] = None
+    scenario_remaining = 0
+
+    offset = 0
+    for line in text.split("\n"):
+        line_start = offset
+        offset += len(line) + 1
+
+        if ANSWER_KEY_HEADER_PATTERN.match(line):
+            in_answer_key = True
+            answer_key_lines.append(line)
+            continue
+
+        question_match = QUESTION_NUMBER_PATTERN.match(line)
+        scenario_match = SCENARIO_START_PATTERN.match(line)
+
+        if in_answer_key:
+            entries = ANSWER_ENTRY_PATTERN.findall(line)
+            # Answer keys are short "1. B  2. C" lines; a long numbered line is a new question
+            is_entry_line = entries and len(line.strip()) <= max(40, 12 * len(entries))
+            if is_entry_line or not line.strip():
+                answer_key_lines.append(line)
+                for number, letter in entries:
+                    number = int(number)
+                    if answer_key.get(number, letter.upper()) != letter.upper():
+                        answer_key_conflict = True
+                    answer_key[number] = letter.upper()
+                continue
+            in_answer_key = False
+
+        if scenario_match:
+            blocks.append(_new_block("scenario", start=line_start))
+            active_scenario = len(blocks) - 1
+            range_match = SCENARIO_RANGE_PATTERN.search(line)
+            scenario_range = (
+                (int(range_match.group(1)), int(range_match.group(2))) if range_match else None
+            )
+            scenario_remaining = SCENARIO_MAX_QUESTIONS
+        elif question_match:
+            number = int(question_match.group(1))
+            block = _new_block("question", number, line_start)
+            if active_scenario is not None:
+                if scenario_range:
+                    if scenario_range[0] <= number <= scenario_range[1]:
+                        block["scenario"] = active_scenario
+                    elif number > scenario_range[1]:
+                        active_scenario = None
+                elif scenario_remaining > 0:
+                    block["scenario"] = active_scenario
+                    scenario_remaining -= 1
+            blocks.append(block)
+
+        blocks[-1]["lines"].append(line)
+
+    # Only trust the answer key if it maps unambiguously onto unique question numbers
+    numbers = [b["number"] for b in blocks if b["kind"] == "question"]
+    if answer_key_conflict or len(numbers) != len(set(numbers)):
+        if answer_key_lines:
+            # Keep the section as plain text so the model can still read it
+            blocks.append(
+                {
+                    "kind": "text",
+                    "lines": answer_key_lines,
+                    "number": None,
+                    "scenario": None,
+                    "start": None,
+                }
+            )
+        answer_key = {}
+
+    for block in blocks:
+        block["text"] = "\n".join(block["lines"]) + "\n"
+    return {"blocks": blocks, "answer_key": answer_key}
+
+
+def _format_answer_key(answer_key: Dict[int, str], numbers: Set[int]) -> str:
+    entries = [f"{n}. {answer_key[n]}" for n in sorted(numbers) if n in answer_key]
+    if not entries:
+        return ""
+    return "\nANSWER KEY (from the answer section of this document):\n" + "\n".join(entries) + "\n"
+
+
+def _hard_split(text: str, chunk_size: int) -> List[str]:
+    """Split an oversized block at line boundaries"""
+    pieces: List[str] = []
+    current: List[str] = []
+    current_len = 0
+    for line in text.split("\n"):
+        if current and current_len + len(line) + 1 > chunk_size:
+            pieces.append("\n".join(current) + "\n")
+            current, current_len = [], 0
+        current.append(line)
+        current_len += len(line) + 1
+    if any(part.strip() for part in current):
+        pieces.append("\n".join(current) + "\n")
+    return pieces
+
+
+def split_text_into_chunks(text: str, chunk_size: int) -> List[str]:
+    """
+    Split document text into extraction chunks at question boundaries (linear time).
+
+    - Questions are never split unless a single question exceeds chunk_size
+    - A scenario/term sheet is repeated at the top of every chunk holding one of its questions
+    - Each chunk starts with the last question of the previous chunk when it fits the overlap
+      budget (duplicates are removed afterwards by stitch_chunk_questions)
+    - Answer-key entries are attached to the chunk that holds the matching questions instead
+      of being sent as a separate chunk
+    """
+    parsed = parse_document_blocks(text)
+    blocks = parsed["blocks"]
+    answer_key = parsed["answer_key"]
+    overlap_chars = min(MAX_OVERLAP_CHARS, int(chunk_size * OVERLAP_RATIO))
+
+    chunks: List[str] = []
+    pieces: List[str] = []
+    size = 0
+    included_scenarios: Set[int] = set()
+    numbers: Set[int] = set()
+    last_question: Optional[Dict[str, Any]] = None
+
+    def flush():
+        nonlocal pieces, size, included_scenarios, numbers
+        if any(piece.strip() for piece in pieces):
+            chunks.append("".join(pieces) + _format_answer_key(answer_key, numbers))
+        pieces, size, included_scenarios, numbers = [], 0, set(), set()
+
+    def add(block: Dict[str, Any]):
+        nonlocal size
+        pieces.append(block["text"])
+        size += len(block["text"])
+        if block["number"] is not None:
+            numbers.add(block["number"])
+
+    for index, block in enumerate(blocks):
+        if not block["text"].strip():
+            continue
+        if block["kind"] == "scenario":
+            # Emitted together with its first question (or on its own if it has none)
+            next_block = blocks[index + 1] if index + 1 < len(blocks) else None
+            if next_block is not None and next_block.get("scenario") == index:
+                continue
+
+        scenario_index = block.get("scenario")
+        needs_scenario = scenario_index is not None and scenario_index not in included_scenarios
+        scenario_text = blocks[scenario_index]["text"] if needs_scenario else ""
+
+        if len(scenario_text) + len(block["text"]) > chunk_size:
+            # Oversized block (usually OCR text without question numbers)
+            flush()
+            oversized = _hard_split(scenario_text + block["text"], chunk_size)
+            chunks.extend(oversized[:-1])
+            pieces, size = [oversized[-1]], len(oversized[-1])
+            if needs_scenario:
+                included_scenarios.add(scenario_index)
+            if block["number"] is not None:
+                numbers.add(block["number"])
+            last_question = None
+            continue
+
+        block_size = len(block["text"]) + len(scenario_text) + 8 * (block["number"] is not None)
+        if pieces and size + block_size > chunk_size:
+            flush()
+            # The new chunk needs the scenario again even if the previous one had it
+            needs_scenario = scenario_index is not None
+            scenario_text = blocks[scenario_index]["text"] if needs_scenario else ""
+            # Overlap: repeat the previous chunk's last question if it is small enough
+            if last_question is not None and len(last_question["text"]) <= overlap_chars:
+                previous_scenario = last_question.get("scenario")
+                if previous_scenario is not None and previous_scenario == scenario_index:
+                    pieces.append(scenario_text)
+                    size += len(scenario_text)
+                    included_scenarios.add(scenario_index)
+                    needs_scenario = False
+                add(last_question)
+
+        if needs_scenario:
+            pieces.append(scenario_text)
+            size += len(scenario_text)
+            included_scenarios.add(scenario_index)
+        elif block["kind"] == "scenario":
+            included_scenarios.add(index)
+
+        add(block)
+        last_question = block if block["kind"] == "question" else None
+
+    flush()
+    logger.info(
+        f"Split {len(text)} chars into {len(chunks)} chunks "
+        f"({sum(1 for b in blocks if b['kind'] == 'question')} numbered questions, "
+        f"{sum(1 for b in blocks if b['kind'] == 'scenario')} scenarios, "
+        f"{len(answer_key)} answer-key entries)"
+    )
+    return chunks
+
+
+def _stitch_key(question: Dict[str, Any]) -> str:
+    """
+    Question identity for stitching: leading alphanumerics of the question text plus the
+    sorted choices, so two questions with the same generic stem ("Which of the following
+    statements is correct?") are not merged
+    """
+    stem = re.sub(r"[^a-z0-9]", "", str(question.get("question") or "").lower())[:150]
+    if not stem:
+        return ""
+    choices = sorted(
+        re.sub(r"[^a-z0-9]", "", str(c or "").lower()) for c in question.get("choices") or []
+    )
+    return "|".join([stem, *choices])
+
+
+def _more_complete(first: Dict[str, Any], second: Dict[str, Any]) -> Dict[str, Any]:
+    """Pick the more complete extraction of the same question"""
+
+    def completeness(q: Dict[str, Any]):
+        return (
+            len(q.get("choices") or []),
+            q.get("correct_index") is not None,
+            bool(q.get("scenario")),
+            len(str(q.get("question") or "")),
+        )
+
+    return second if completeness(second) > completeness(first) else first
+
+
+def stitch_chunk_questions(chunk_results: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Merge per-chunk extraction results in document order, dropping questions that were
+    extracted twice because they sit in the overlap between adjacent chunks.
+    Only a chunk's first STITCH_WINDOW questions are compared with the previous chunk's last
+    STITCH_WINDOW, so repeated questions elsewhere in a document are left alone.
+    """
+    merged: List[Dict[str, Any]] = []
+    stitched = 0
+
+    for questions in chunk_results:
+        tail = {
+            _stitch_key(merged[i]): i
+            for i in range(max(0, len(merged) - STITCH_WINDOW), len(merged))
+        }
+        for position, question in enumerate(questions or []):
+            key = _stitch_key(question)
+            if key and position < STITCH_WINDOW and key in tail:
+                merged[tail[key]] = _more_complete(merged[tail[key]], question)
+                stitched += 1
+                continue
+            merged.append(question)
+
+    if stitched:
+        logger.info(f"Stitched {stitched} questions duplicated across chunk boundaries")
+    return merged
+
+
+class ChunkStitcher:
+    """
+    Incremental stitch_chunk_questions for chunks that arrive one at a time (in order).
+    The last STITCH_WINDOW questions are held back until the next chunk has been compared
+    with them, so the result is the same as stitching all chunks at once.
+    """
+
+    def __init__(self):
+        self._tail: List[Dict[str, Any]] = []
+
+    def add(self, questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add the next chunk's questions; returns the questions that are now final"""
+        merged = stitch_chunk_questions([self._tail, questions])
+        self._tail = merged[-STITCH_WINDOW:]
+        return merged[:-STITCH_WINDOW]
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Release the held-back questions after the last chunk"""
+        tail, self._tail = self._tail, []
+        return tail
+
+
+class StreamingChunker:
+    """
+    Cuts extraction chunks from text that arrives incrementally (e.g. OCR pages in page
+    order), so extraction can start before the whole document is available.
+
+    Text is only cut at the start of a question or scenario block, never inside a
+    scenario's group of questions, and the trailing block is always held back because the
+    next page may continue it. Each cut-off prefix is split with split_text_into_chunks.
+    Answer-key sections at the end of a document only reach the chunks cut after them;
+    use build_answer_key_index / apply_answer_key on the full text to fill in the rest.
+    """
+
+    def __init__(self, chunk_size: int):
+        self.chunk_size = chunk_size
+        self._buffer = ""
+        # Start of the first line not yet checked for a block start since the last parse
+        # found no cut (the last line is checked again, it may still grow)
+        self._scanned = 0
+
+    def feed(self, text: str) -> List[str]:
+        """Add text; returns the chunks that can be extracted now"""
+        self._buffer += text
+        if len(self._buffer) <= self.chunk_size:
+            return []
+
+        # Cuts are only made at block starts, so a buffer that failed to cut can only cut
+        # once a new block starts - scan the new tail instead of re-parsing everything
+        has_new_block = BLOCK_START_PATTERN.search(self._buffer, self._scanned) is not None
+        self._scanned = self._buffer.rfind("\n") + 1
+        if not has_new_block:
+            return []
+
+        cut = self._find_cut(parse_document_blocks(self._buffer)["blocks"])
+        if cut is None:
+            return []
+        prefix, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        self._scanned = 0
+        return split_text_into_chunks(prefix, self.chunk_size)
+
+    def finish(self) -> List[str]:
+        """Chunks for the remaining text once no more text will arrive"""
+        remainder, self._buffer = self._buffer, ""
+        self._scanned = 0
+        if not remainder.strip():
+            return []
+        return split_text_into_chunks(remainder, self.chunk_size)
+
+    def _find_cut(self, blocks: List[Dict[str, Any]]) -> Optional[int]:
+        """Offset of the latest safe cut at or beyond chunk_size (None if there is none)"""
+        # The trailing block may continue on the next page (blocks without a start, such
+        # as an untrusted answer key section, are not part of the text order)
+        last = max(i for i, block in enumerate(blocks) if block.get("start") is not None)
+        # Lowest scenario index referenced by any block from position i onwards
+        lowest_scenario = len(blocks)
+        for i in range(len(blocks) - 1, 0, -1):
+            scenario = blocks[i].get("scenario")
+            if scenario is not None:
+                lowest_scenario = min(lowest_scenario, scenario)
+
+            start = blocks[i].get("start")
+            if start is None or start < self.chunk_size or i >= last:
+                continue
+            if blocks[i]["kind"] == "text" or lowest_scenario < i:
+                # Would cut inside a block run or separate questions from their scenario
+                continue
+            return start
+        return None
+
+
+def pack_texts(texts: List[str], chunk_size: int, separator: str = "\n\n") -> List[List[int]]:
+    """
+    Group consecutive texts into as few chunks as fit chunk_size (a text larger than
+    chunk_size gets a chunk of its own). Returns the text indexes of each chunk.
+    """
+    groups: List[List[int]] = []
+    size = 0
+    for index, text in enumerate(texts):
+        if groups and size + len(separator) + len(text) <= chunk_size:
+            groups[-1].append(index)
+            size += len(separator) + len(text)
+        else:
+            groups.append([index])
+            size = len(text)
+    return groups
+
+
+def match_question_sources(questions: List[Dict[str, Any]], texts: List[str]) -> List[int]:
+    """
+    Index of the text each question was extracted from, for questions extracted from
+    texts joined in order. Stems are matched in document order; a question whose stem
+    is not found (reworded by the model) stays with the previous question's text.
+    """
+    normalized = [re.sub(r"[^a-z0-9]", "", text.lower()) for text in texts]
+    sources: List[int] = []
+    current = 0
+    for question in questions:
+        stem = QUESTION_NUMBER_PREFIX_PATTERN.sub("", str(question.get("question") or ""), count=1)
+        key = _answer_match_key(stem)
+        if len(key) >= MIN_SOURCE_MATCH_CHARS:
+            for index in range(current, len(texts)):
+                if key in normalized[index]:
+                    current = index
+                    break
+        sources.append(current)
+    return sources
+
+
+# Leading characters of a question stem used to match it to an answer-key number
+ANSWER_MATCH_CHARS = 30
+
+
+# Shortest stem prefix trusted to identify which packed text a question came from
+MIN_SOURCE_MATCH_CHARS = 12
+
+
+def _answer_match_key(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", text.lower())[:ANSWER_MATCH_CHARS]
+
+
+def build_answer_key_index(text: str) -> Dict[str, str]:
+    """
+    Map question stems to answer-key letters for a complete document
+    (empty if the document has no usable answer key)
+    """
+    parsed = parse_document_blocks(text)
+    answer_key = parsed["answer_key"]
+    if not answer_key:
+        return {}
+
+    index: Dict[str, str] = {}
+    for block in parsed["blocks"]:
+        if block["kind"] != "question" or block["number"] not in answer_key:
+            continue
+        key = _answer_match_key(QUESTION_NUMBER_PREFIX_PATTERN.sub("", block["text"], count=1))
+        if len(key) == ANSWER_MATCH_CHARS:
+            index[key] = answer_key[block["number"]]
+    return index
+
+
+def apply_answer_key(questions: List[Dict[str, Any]], answer_index: Dict[str, str]) -> int:
+    """
+    Set correct_index from the document's answer key for questions extracted before the
+    key was seen (matched by question stem). Returns the number of questions updated.
+    """
+    if not answer_index:
+        return 0
+
+    updated = 0
+    for question in questions:
+        letter = answer_index.get(_answer_match_key(str(question.get("question") or "")))
+        if not letter:
+            continue
+        index = ord(letter) - ord("A")
+        if 0 <= index < len(question.get("choices") or []):
+            if question.get("correct_index") != index:
+                updated += 1
+            question["correct_index"] = index
+            question["correct_answer"] = index
+    return updated
@@ -3,34 +3,42 @@ Document Parser for Mock Exam Questions
 Extracts questions from PDF and Word documents using AI
 """
 
+import asyncio
 import io
 import json
 import re
 import logging
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import httpx
 import PyPDF2
 import streamlit as st
-from docx import Document
 
 import config
+from ai_scheduler import ai_scheduler
+from artifact_cache import get_artifact, hash_bytes, make_artifact_key, store_artifact
+from auth_utils import run_async
+from document_chunking import (
+    CHUNKER_VERSION,
+    ChunkPlanner,
+    match_question_sources,
+    pack_texts,
+    split_text_into_chunks,
+    stitch_chunk_questions,
+)
+from docx_stream import DocxContent, read_docx
+from ocr_corruption import get_detector
+from ocr_engine import OCR_AVAILABLE, classify_pdf_pages, get_reader, ocr_pdf_pages
+from pdf_text_parser import parse_structured_text
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
-# OCR support flag
-OCR_AVAILABLE = False
-try:
-    import easyocr
+if OCR_AVAILABLE:
     import fitz  # PyMuPDF
     import numpy as np
     from PIL import Image
 
-    OCR_AVAILABLE = True
-except ImportError:
-    pass
-
 
 class DocumentParser:
     """Parse PDF/Word documents and extract mock exam questions using AI"""
@@ -66,43 +74,6 @@ class DocumentParser:
         r"^With a (more|less|longer|shorter)",  # "With a longer investment tenure..."
     ]
 
-    # OCR corruption patterns
-    OCR_CORRUPTION_PATTERNS = [
-        (r"\$[oO]\.", "Dollar sign followed by letter o/O instead of zero"),
-        (r"\bordinai-y\b", "ordinai-y instead of ordinary"),
-        (r"\bordinan/\b", "ordinan/ instead of ordinary"),
-        (r"\bstmctures\b", "stmctures instead of structures"),
-        (r"\binvestrnent\b", "investrnent instead of investment"),
-        (r"\bgovernrnent\b", "governrnent instead of government"),
-        (r"\bmanagernent\b", "managernent instead of management"),
-        (r"\bperforrnance\b", "performrnance instead of performance"),
-        (r"\brnake\b", "rnake instead of make"),
-        (r"\brnay\b", "rnay instead of may"),
-        (r"\brnust\b", "rnust instead of must"),
-        (r"\brnore\b", "rnore instead of more"),
-        (r"\b[Il]00\%", "Letter I or l instead of 1 in 100%"),
-        (r"\s{4,}", "Four or more consecutive spaces"),
-        (r"determined by the\s*Choices", "Question text bleeding into choices"),
-    ]
-
-    # Common spacing/typo patterns (UAT only - not production)
-    # These catch typos that AI parsing or OCR missed
-    TYPO_PATTERNS = [
-        (r"\bajoint\b", "ajoint should be 'a joint'"),
-        (r"\btobe\b", "tobe should be 'to be'"),
-        (r"\bofthe\b", "ofthe should be 'of the'"),
-        (r"\binthe\b", "inthe should be 'in the'"),
-        (r"\bonthe\b", "onthe should be 'on the'"),
-        (r"\batthe\b", "atthe should be 'at the'"),
-        (r"\bforthe\b", "forthe should be 'for the'"),
-        (r"\bwiththe\b", "withthe should be 'with the'"),
-        (r"\bfromthe\b", "fromthe should be 'from the'"),
-        (r"\bthat\s+the\s+the\b", "duplicate 'the the'"),
-        (r"\ba\s+a\b", "duplicate 'a a'"),
-        (r"\bwill\s+will\b", "duplicate 'will will'"),
-        (r"\bis\s+is\b", "duplicate 'is is'"),
-    ]
-
     # Multi-answer question patterns (questions requiring more than one correct answer)
     # These are NOT SUPPORTED and should be rejected during upload
     MULTI_ANSWER_PATTERNS = [
@@ -122,10 +93,18 @@ class DocumentParser:
         r"identify all (the\s+)?(correct|true)",
     ]
 
+    # Follow-up requests allowed when an extraction response is cut off mid-array
+    MAX_CONTINUATIONS = 3
+
+    # Bump when response parsing changes so cached extraction results are not reused
+    EXTRACTION_CACHE_VERSION = "extraction-1"
+
     def __init__(self):
         self.api_key = config.OPENROUTER_API_KEY
         self.model = config.OPENROUTER_MODEL
         self.base_url = config.OPENROUTER_BASE_URL
+        # Token-budget chunk sizing for the extraction model (limits from models_config.json)
+        self.chunk_planner = ChunkPlanner(self.model)
 
     def _detect_incomplete_question(self, question_text: str, scenario: Optional[str] = None) -> Optional[str]:
         """
@@ -169,15 +148,13 @@ class DocumentParser:
         Returns the first corruption found, None if clean.
         """
         # Always check OCR corruption patterns
-        for pattern, description in self.OCR_CORRUPTION_PATTERNS:
-            if re.search(pattern, question_text, re.IGNORECASE):
-                return description
+        corruption = get_detector("ocr").first(question_text)
+        if corruption:
+            return corruption
 
         # Check typo patterns only in non-production environments
         if config.ENVIRONMENT != "production":
-            for pattern, description in self.TYPO_PATTERNS:
-                if re.search(pattern, question_text, re.IGNORECASE):
-                    return description
+            return get_detector("typos").first(question_text)
 
         return None
 
@@ -220,10 +197,11 @@ class DocumentParser:
             file_extension = uploaded_file.name.split(".")[-1].lower()
 
             # For Word documents, check if it contains JSON first
+            word_content = None
             if file_extension in ["docx", "doc"]:
-                # Extract text to check for JSON
-                text = self._extract_text_from_word(uploaded_file)
-                text_stripped = text.strip()
+                # One pass over the document feeds the JSON check, structured parser and AI
+                word_content = self._read_word_document(uploaded_file)
+                text_stripped = word_content.text
 
                 # Check if document contains pure JSON array
                 if text_stripped.startswith('[') and text_stripped.endswith(']'):
@@ -263,8 +241,7 @@ class DocumentParser:
 
                 # Not JSON or JSON parsing failed - try structured parsing
                 st.info("🔍 Attempting structured parsing (faster and more accurate)...")
-                uploaded_file.seek(0)  # Reset file pointer
-                structured_questions = self._parse_word_structured(uploaded_file)
+                structured_questions = self._parse_word_structured(word_content)
 
                 if structured_questions:
                     st.success(
@@ -286,7 +263,7 @@ class DocumentParser:
             if file_extension == "pdf":
                 text = self._extract_text_from_pdf(uploaded_file, pool_id, pool_name)
             elif file_extension in ["docx", "doc"]:
-                text = self._extract_text_from_word(uploaded_file)
+                text = word_content.text
             else:
                 return False, [], f"Unsupported file type: {file_extension}"
 
@@ -299,9 +276,9 @@ class DocumentParser:
                 return False, [], "Could not extract sufficient text from document"
 
             # Note: For Word documents, JSON is already checked above. This fallback is for PDFs.
-            # Use AI to parse questions from text
-            st.info("🤖 Using AI to extract questions from document...")
-            questions = self._parse_questions_with_ai(text)
+            # Structured fast path first; only low-confidence regions go to the AI
+            st.info("🔍 Extracting questions from document...")
+            questions = self._parse_questions_from_text(text)
 
             if not questions:
                 return False, [], "No questions could be extracted from the document"
@@ -318,51 +295,69 @@ class DocumentParser:
             return False, [], f"Error parsing document: {str(e)}"
 
     def _extract_text_from_pdf(self, uploaded_file, pool_id=None, pool_name=None) -> str:
-        """Extract text from PDF file, with OCR fallback for scanned documents"""
+        """
+        Extract text from PDF file, with OCR fallback for scanned documents.
+        Pages are classified individually, so in a mixed PDF only the pages without a
+        usable text layer are OCRed and merged back with the native text in page order.
+        """
         try:
             # Reset file pointer
             uploaded_file.seek(0)
 
             # Read PDF
             pdf_reader = PyPDF2.PdfReader(uploaded_file)
-            text = ""
             num_pages = len(pdf_reader.pages)
 
             # Extract text from all pages
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n\n"
-
-            # Check if we got meaningful text
-            clean_text = text.strip()
-            if len(clean_text) > 100:
-                return clean_text
-
-            # Text extraction failed or minimal text - this is a scanned PDF
-            st.info(
-                f"📄 PDF appears to be scanned ({num_pages} pages). Checking if background processing is needed..."
-            )
+            page_texts = [page.extract_text() or "" for page in pdf_reader.pages]
+            clean_text = "\n\n".join(text for text in page_texts if text).strip()
 
             if not OCR_AVAILABLE:
+                if len(clean_text) > 100:
+                    return clean_text
+                st.info(f"📄 PDF appears to be scanned ({num_pages} pages).")
                 st.warning(
                     "⚠️ OCR libraries not available. Install easyocr and pymupdf for scanned PDF support."
                 )
                 return clean_text
 
-            # If document is large (>25 pages), use background processing
-            if num_pages > 25 and pool_id and pool_name:
-                return self._trigger_background_ocr(uploaded_file, pool_id, pool_name, num_pages)
-
-            # For smaller documents, process inline with OCR
-            st.info(f"📄 Processing {num_pages} pages with OCR (this may take a few minutes)...")
+            # Find the pages that lack a usable text layer
             uploaded_file.seek(0)
             file_bytes = uploaded_file.read()
-            ocr_text = self._ocr_pdf(file_bytes)
+            page_layers = classify_pdf_pages(file_bytes)
+            ocr_pages = [layer["page_index"] for layer in page_layers if layer["needs_ocr"]]
+
+            if not ocr_pages:
+                return clean_text
+
+            if len(ocr_pages) == num_pages:
+                st.info(
+                    f"📄 PDF appears to be scanned ({num_pages} pages). Checking if background processing is needed..."
+                )
+            else:
+                st.info(
+                    f"📄 {len(ocr_pages)} of {num_pages} pages have no usable text layer - OCR will run on those pages only"
+                )
+
+            # If many pages need OCR (>25), use background processing
+            if len(ocr_pages) > 25 and pool_id and pool_name:
+                return self._trigger_background_ocr(uploaded_file, pool_id, pool_name, num_pages)
 
-            if ocr_text and len(ocr_text.strip()) > 100:
-                st.success(f"✅ OCR extracted {len(ocr_text)} characters from scanned PDF")
-                return ocr_text
+            # Otherwise OCR the pages inline
+            ocr_texts = self._ocr_pdf_pages(file_bytes, ocr_pages)
+
+            # Merge OCR and native text in page order
+            merged_pages = [ocr_texts.get(index) or page_texts[index] for index in range(num_pages)]
+            merged_text = "\n\n".join(text for text in merged_pages if text).strip()
+
+            ocr_chars = sum(len(text) for text in ocr_texts.values())
+            if ocr_chars and len(merged_text) > 100:
+                st.success(
+                    f"✅ OCR extracted {ocr_chars} characters from {len(ocr_texts)} scanned pages"
+                )
+                return merged_text
+            elif len(merged_text) > 100:
+                return merged_text
             else:
                 st.warning("⚠️ OCR could not extract sufficient text")
                 return clean_text
@@ -376,47 +371,36 @@ class DocumentParser:
 
         Returns a special marker that indicates background processing was started
         """
-        import os
-        import subprocess
-        import sys
-        import tempfile
+        import time
 
-        try:
-            # Save PDF to temporary file
-            temp_dir = tempfile.gettempdir()
-            temp_filename = f"ocr_pending_{pool_id}_{uploaded_file.name}"
-            temp_path = os.path.join(temp_dir, temp_filename)
+        from ocr_jobs import create_job, get_saved_pages, is_job_running, launch_job, load_job
 
+        try:
+            # Durable job: the PDF and per-page/per-chunk checkpoints live in the job directory,
+            # so a re-upload of the same file resumes an interrupted import
             uploaded_file.seek(0)
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.read())
-
-            # Trigger background OCR processor
-            python_path = sys.executable
-            script_path = os.path.join(os.getcwd(), "background_ocr_processor.py")
+            job_id = create_job(uploaded_file.read(), pool_id, pool_name, uploaded_file.name)
+            job = load_job(job_id) or {}
 
-            # Log to file instead of suppressing output
-            import time
-            log_file_path = os.path.join(os.getcwd(), "background_ocr_processor.log")
-            log_file = open(log_file_path, "a")
-
-            try:
-                process = subprocess.Popen(
-                    [python_path, script_path, temp_path, pool_id, pool_name, uploaded_file.name],
-                    stdout=log_file,
-                    stderr=subprocess.STDOUT,  # Merge stderr into stdout
-                    start_new_session=True,
+            if is_job_running(job):
+                st.info(
+                    f"📤 This PDF is already being processed in the background "
+                    f"({len(get_saved_pages(job_id))}/{job.get('total_pages') or num_pages} pages OCRed)"
                 )
+                return "__BACKGROUND_PROCESSING__"
+
+            pages_done = len(get_saved_pages(job_id))
+            if pages_done:
+                st.info(f"♻️ Resuming earlier import: {pages_done} pages already OCRed")
 
-                # Verify process started successfully
-                time.sleep(0.5)  # Give it a moment to start
-                if process.poll() is not None:
-                    # Process already died
-                    raise Exception(f"Background OCR process failed to start (exit code: {process.returncode})")
+            # Trigger background OCR processor (output goes to background_ocr_processor.log)
+            process = launch_job(job_id)
 
-            finally:
-                # Always close log file handle
-                log_file.close()
+            # Verify process started successfully
+            time.sleep(0.5)  # Give it a moment to start
+            if process.poll() is not None:
+                # Process already died
+                raise Exception(f"Background OCR process failed to start (exit code: {process.returncode})")
 
             # Create database status record for tracking
             try:
@@ -461,157 +445,282 @@ class DocumentParser:
             max_pages: Maximum number of pages to process (to avoid timeouts)
         """
         try:
-            # Open PDF with PyMuPDF
-            pdf_doc = fitz.open(stream=file_bytes, filetype="pdf")
-            total_pages = len(pdf_doc)
+            with fitz.open(stream=file_bytes, filetype="pdf") as pdf_doc:
+                total_pages = len(pdf_doc)
 
-            # Limit pages to avoid timeout
-            pages_to_process = min(total_pages, max_pages)
+            ocr_texts = self._ocr_pdf_pages(file_bytes, list(range(total_pages)), max_pages)
+            combined_text = "\n\n".join(ocr_texts[index] for index in sorted(ocr_texts))
 
-            if total_pages > max_pages:
-                st.warning(
-                    f"⚠️ PDF has {total_pages} pages. Processing first {max_pages} pages to avoid timeout. "
-                    f"For full document processing, please split into smaller files."
+            if combined_text:
+                st.success(
+                    f"✅ OCR completed: {len(combined_text)} characters extracted from {min(total_pages, max_pages)} pages"
                 )
-            else:
-                st.info(f"📄 Processing {total_pages} pages with OCR...")
-
-            # Initialize EasyOCR reader (lazy load)
-            reader = easyocr.Reader(["en"], gpu=False, verbose=False)
 
-            all_text = []
-            progress_bar = st.progress(0)
+            return combined_text
 
-            for i in range(pages_to_process):
-                page = pdf_doc[i]
+        except Exception as e:
+            st.error(f"❌ OCR failed: {str(e)}")
+            return ""
 
-                # Update progress
-                progress_bar.progress(
-                    (i + 1) / pages_to_process,
-                    text=f"🔍 OCR processing page {i+1}/{pages_to_process}...",
-                )
+    def _ocr_pdf_pages(
+        self, file_bytes: bytes, page_indexes: List[int], max_pages: int = 25
+    ) -> Dict[int, str]:
+        """
+        OCR selected PDF pages
 
-                # Render page to image (150 DPI - faster than 200, still good quality)
-                mat = fitz.Matrix(150 / 72, 150 / 72)
-                pix = page.get_pixmap(matrix=mat)
+        Args:
+            file_bytes: PDF file content
+            page_indexes: Zero-based pages to OCR, in page order
+            max_pages: Maximum number of pages to process (to avoid timeouts)
 
-                # Convert to PIL Image then numpy array
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                img_array = np.array(img)
+        Returns:
+            Dict mapping page index to OCR text (pages where OCR failed are left out)
+        """
+        pages_to_process = page_indexes[:max_pages]
 
-                # Run OCR with optimized settings
-                try:
-                    results = reader.readtext(
-                        img_array,
-                        paragraph=True,  # Group text into paragraphs (faster)
-                        batch_size=4,  # Process in small batches
-                    )
-                    # Extract text from results
-                    page_text = "\n".join([result[1] for result in results])
-                    all_text.append(page_text)
-                except Exception as e:
-                    st.warning(f"⚠️ OCR failed on page {i+1}: {str(e)}")
-                    continue
+        if len(page_indexes) > max_pages:
+            st.warning(
+                f"⚠️ PDF has {len(page_indexes)} pages that need OCR. Processing first {max_pages} pages to avoid timeout. "
+                f"For full document processing, please split into smaller files."
+            )
+        else:
+            st.info(f"📄 Processing {len(pages_to_process)} pages with OCR...")
 
-            pdf_doc.close()
-            progress_bar.empty()
+        progress_bar = st.progress(0)
 
-            combined_text = "\n\n".join(all_text)
+        def report_progress(completed: int, total: int, page_index: int, page_text):
+            progress_bar.progress(
+                completed / total,
+                text=f"🔍 OCR processed {completed}/{total} pages (page {page_index + 1} done)...",
+            )
+            if page_text is None:
+                st.warning(f"⚠️ OCR failed on page {page_index + 1}")
 
-            if combined_text:
-                st.success(
-                    f"✅ OCR completed: {len(combined_text)} characters extracted from {pages_to_process} pages"
-                )
+        # Pages are OCRed in parallel by warmed worker processes, returned in page order
+        page_texts = ocr_pdf_pages(
+            file_bytes, pages_to_process, dpi=150, on_progress=report_progress
+        )
+        progress_bar.empty()
 
-            return combined_text
+        return {
+            page_index: page_text
+            for page_index, page_text in zip(pages_to_process, page_texts)
+            if page_text is not None
+        }
 
+    def _read_word_document(self, uploaded_file) -> DocxContent:
+        """Read a Word document in one streaming pass (text, tables and images in document order)"""
+        try:
+            return read_docx(uploaded_file)
         except Exception as e:
-            st.error(f"❌ OCR failed: {str(e)}")
-            return ""
+            raise Exception(f"Error reading Word document: {str(e)}")
 
     def _extract_text_from_word(self, uploaded_file) -> str:
-        """Extract text from Word document"""
-        try:
-            # Reset file pointer
-            uploaded_file.seek(0)
+        """Extract text from Word document (paragraphs and table cells in document order)"""
+        return self._read_word_document(uploaded_file).text
 
-            # Read Word document
-            doc = Document(uploaded_file)
-            text = ""
+    def _parse_questions_from_text(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Parse questions from extracted text, using the deterministic structured parser where
+        it is confident and the AI only for low-confidence regions (merged in document order)
+        """
+        structured = parse_structured_text(text)
+        questions = structured["questions"]
+        regions = structured["regions"]
 
-            # Extract text from paragraphs
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text += paragraph.text + "\n"
+        if not questions:
+            # Layout not recognised - the whole document goes to the AI
+            st.info("🤖 Using AI to extract questions from document...")
+            return self._parse_questions_with_ai(text)
 
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            text += cell.text + "\n"
+        st.success(f"⚡ Structured parser extracted {len(questions)} questions without AI")
 
-            return text.strip()
+        if regions:
+            st.info(f"🤖 Sending {len(regions)} low-confidence region(s) to AI...")
+            try:
+                region_results = run_async(self._parse_regions_with_ai(regions))
+            except Exception as e:
+                st.error(f"AI parsing error: {str(e)}")
+                region_results = [[] for _ in regions]
+
+            for region, region_questions in zip(regions, region_results):
+                for offset, question in enumerate(region_questions):
+                    # Keep AI questions at their region's place in the document
+                    question["position"] = region["position"] + offset / (len(region_questions) + 1)
+                    questions.append(question)
+
+        questions.sort(key=lambda q: q["position"])
+        for question in questions:
+            question.pop("position", None)
+            question.pop("confidence", None)
+        return questions
+
+    async def _parse_regions_with_ai(
+        self, regions: List[Dict[str, Any]]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Extract questions from the low-confidence regions, packing neighbouring regions into
+        planned chunks so small regions share one AI call (chunks run concurrently).
+        Returns the questions of each region, in region order.
+        """
+        texts = [region["text"] for region in regions]
+        chunk_size = self.chunk_planner.plan_chunk_chars(
+            "\n\n".join(texts), len(self._create_extraction_prompt(""))
+        )
+        groups = pack_texts(texts, chunk_size)
+        logger.info(f"Packed {len(regions)} low-confidence region(s) into {len(groups)} AI call(s)")
+
+        results = await asyncio.gather(
+            *(
+                self._parse_questions_with_ai_async("\n\n".join(texts[i] for i in group))
+                for group in groups
+            ),
+            return_exceptions=True,
+        )
+        region_results: List[List[Dict[str, Any]]] = [[] for _ in regions]
+        for group, result in zip(groups, results):
+            if isinstance(result, Exception):
+                positions = ", ".join(str(regions[i]["position"]) for i in group)
+                logger.error(f"AI extraction failed for regions at blocks {positions}: {result}")
+                continue
+            questions = result or []
+            sources = match_question_sources(questions, [texts[i] for i in group])
+            for question, source in zip(questions, sources):
+                region_results[group[source]].append(question)
+        return region_results
+
+    def _parse_questions_with_ai(
+        self,
+        text: str,
+        on_progress: Optional[Callable[[int, int, int, List[Dict[str, Any]]], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Use AI to parse questions from extracted text (chunks are extracted concurrently)"""
+        try:
+            return run_async(self._parse_questions_with_ai_async(text, on_progress))
         except Exception as e:
-            raise Exception(f"Error reading Word document: {str(e)}")
+            st.error(f"AI parsing error: {str(e)}")
+            return []
 
-    def _parse_questions_with_ai(self, text: str) -> List[Dict[str, Any]]:
-        """Use AI to parse questions from extracted text"""
-        try:
-            # If text is large, process in chunks
-            chunk_size = 8000
-            all_questions = []
+    async def _parse_questions_with_ai_async(
+        self,
+        text: str,
+        on_progress: Optional[Callable[[int, int, int, List[Dict[str, Any]]], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Extract questions from all chunks concurrently (bounded by the shared AI scheduler)
+        and merge them back in document order.
+
+        Args:
+            text: Extracted document text
+            on_progress: Optional callback(completed, total, chunk_index, chunk_questions)
+                called as each chunk finishes (in completion order, not document order)
+        """
+        # Check if API key is configured (allow AI parsing even in DEMO_MODE)
+        if not self.has_ai_access():
+            # No valid API key configured
+            st.warning(
+                "⚠️ OpenRouter API key not configured. Using basic pattern matching fallback."
+            )
+            st.info(
+                "💡 To enable AI-powered document parsing, add your OPENROUTER_API_KEY to .streamlit/secrets.toml"
+            )
+            return self._demo_parse_fallback()
+
+        # Re-uploads reuse the earlier chunk boundaries, so their chunk results are cache hits
+        # (the planned chunk size adapts over time and would otherwise shift them)
+        prompt_template = self._create_extraction_prompt("")
+        chunks_key = make_artifact_key(CHUNKER_VERSION, self.model, hash_bytes(text))
+        chunks = get_artifact("text_chunks", chunks_key)
+
+        if not chunks:
+            # Chunk size from the model's input/output token budgets and question density
+            chunk_size = self.chunk_planner.plan_chunk_chars(text, len(prompt_template))
 
             if len(text) <= chunk_size:
                 # Small document - process all at once
-                prompt = self._create_extraction_prompt(text)
-                questions = self._call_ai_api(prompt)
-                return questions
+                chunks = [text]
             else:
-                # Large document - process in chunks
-                st.info(f"📄 Document is large ({len(text)} chars). Processing in chunks...")
-
                 # Split text into chunks (try to split at question boundaries)
                 chunks = self._split_text_into_chunks(text, chunk_size)
+            store_artifact("text_chunks", chunks_key, chunks)
 
-                for i, chunk in enumerate(chunks, 1):
-                    st.info(f"🔄 Processing chunk {i}/{len(chunks)}...")
-                    prompt = self._create_extraction_prompt(chunk)
-                    chunk_questions = self._call_ai_api(prompt)
+        if len(chunks) > 1:
+            # Large document - process in chunks
+            st.info(f"📄 Document is large ({len(text)} chars). Processing in chunks...")
+            st.info(
+                f"🚀 Extracting {len(chunks)} chunks with up to "
+                f"{ai_scheduler.max_concurrency} concurrent requests..."
+            )
 
-                    if chunk_questions:
-                        all_questions.extend(chunk_questions)
-                        st.success(f"✅ Extracted {len(chunk_questions)} questions from chunk {i}")
+        def report_progress(completed: int, total: int, index: int, chunk_questions):
+            if on_progress:
+                on_progress(completed, total, index, chunk_questions or [])
+            elif total > 1:
+                st.info(
+                    f"✅ Chunk {index + 1}/{total}: {len(chunk_questions or [])} questions "
+                    f"({completed}/{total} chunks done)"
+                )
 
-                st.success(f"🎉 Total extracted: {len(all_questions)} questions from all chunks")
-                return all_questions
+        async with httpx.AsyncClient(timeout=60.0) as client:
 
-        except Exception as e:
-            st.error(f"AI parsing error: {str(e)}")
-            return []
+            async def extract_chunk(index: int, chunk: str) -> List[Dict[str, Any]]:
+                return await self._extract_chunk(client, chunk, f"Chunk {index + 1}/{len(chunks)}")
 
-    def _split_text_into_chunks(self, text: str, chunk_size: int) -> List[str]:
-        """Split text into chunks, trying to keep questions together"""
-        chunks = []
-        current_chunk = ""
-
-        # Split by common question delimiters
-        lines = text.split("\n")
-
-        for line in lines:
-            # Check if adding this line would exceed chunk size
-            if len(current_chunk) + len(line) > chunk_size and current_chunk:
-                # Save current chunk and start new one
-                chunks.append(current_chunk)
-                current_chunk = line + "\n"
-            else:
-                current_chunk += line + "\n"
+            results = await ai_scheduler.map_ordered(chunks, extract_chunk, report_progress)
 
-        # Add last chunk
-        if current_chunk.strip():
-            chunks.append(current_chunk)
+        # Merge in document order, dropping questions extracted twice from chunk overlaps
+        chunk_results = []
+        failed_chunks = []
+        for i, (chunk_questions, error) in enumerate(results, 1):
+            if error is not None:
+                failed_chunks.append(i)
+                continue
+            chunk_results.append(chunk_questions or [])
+        all_questions = stitch_chunk_questions(chunk_results)
 
-        return chunks
+        if failed_chunks:
+            st.warning(
+                f"⚠️ {len(failed_chunks)} chunk(s) could not be extracted: "
+                f"{', '.join(str(i) for i in failed_chunks)}"
+            )
+        if len(chunks) > 1:
+            st.success(f"🎉 Total extracted: {len(all_questions)} questions from all chunks")
+        return all_questions
+
+    def has_ai_access(self) -> bool:
+        """Whether a usable OpenRouter API key is configured"""
+        return self.api_key not in (None, "", "demo", "your_openrouter_api_key")
+
+    async def _extract_chunk(
+        self, client: httpx.AsyncClient, chunk: str, label: str = "Chunk"
+    ) -> List[Dict[str, Any]]:
+        """Extract the questions of one chunk (artifact cache first, then the AI)"""
+        extraction_version = make_artifact_key(
+            self.EXTRACTION_CACHE_VERSION,
+            self.model,
+            hash_bytes(self._create_extraction_prompt("")),
+        )
+        cache_key = make_artifact_key(extraction_version, hash_bytes(chunk))
+        cached = get_artifact("ai_questions", cache_key)
+        if cached is not None:
+            logger.info(f"{label}: {len(cached)} questions cached")
+            return cached
+
+        expected_output = self.chunk_planner.estimate_output_tokens(chunk)
+        logger.info(f"{label}: {len(chunk)} chars, ~{expected_output} output tokens estimated")
+        prompt = self._create_extraction_prompt(chunk)
+        questions, complete = await self._call_ai_api(
+            client, prompt, expected_output_tokens=expected_output
+        )
+        # Empty results may be a failed request and truncated ones would stay partial on every
+        # re-upload - only cache complete extractions
+        if questions and complete:
+            store_artifact("ai_questions", cache_key, questions)
+        return questions
+
+    def _split_text_into_chunks(self, text: str, chunk_size: int) -> List[str]:
+        """Split text into chunks at question boundaries, keeping scenarios with their questions"""
+        return split_text_into_chunks(text, chunk_size)
 
     def _create_extraction_prompt(self, text: str) -> str:
         """Create prompt for AI to extract questions"""
@@ -702,26 +811,82 @@ CRITICAL RULES:
 - DO NOT generate or hallucinate questions - extract only what exists in the document
 - Return ONLY the JSON array, no other text
 - correct_index must be 0-based (0, 1, 2, 3...)
+- If the text ends with an ANSWER KEY, use it for correct_index (letter A = index 0)
 - Include at least 2 choices per question
 - If you cannot find clear questions in the document, return an empty array: []
 
 Extract all questions now:"""
 
-    def _call_ai_api(self, prompt: str, max_retries: int = 2) -> List[Dict[str, Any]]:
-        """Call OpenRouter API to extract questions with retry logic"""
+    async def _call_ai_api(
+        self,
+        client: httpx.AsyncClient,
+        prompt: str,
+        max_retries: int = 2,
+        expected_output_tokens: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Call OpenRouter API to extract questions with retry logic.
+        If the response is cut off (max_tokens reached or unterminated JSON), every complete
+        question is salvaged and continuation requests resume after the last salvaged one.
 
-        # Check if API key is configured (allow AI parsing even in DEMO_MODE)
-        if not self.api_key or self.api_key == "demo" or self.api_key == "your_openrouter_api_key":
-            # No valid API key configured
-            st.warning(
-                "⚠️ OpenRouter API key not configured. Using basic pattern matching fallback."
+        expected_output_tokens (the chunk planner's estimate) lets later chunks adapt.
+
+        Returns:
+            (questions, complete) - complete is False if a request failed or the extraction
+            was still cut off when the continuations stopped
+        """
+        completion = await self._request_completion(client, prompt, max_retries)
+        if completion is None:
+            return [], False
+
+        content, finish_reason = completion
+        questions, complete = self._parse_json_array_incremental(content)
+        truncated = finish_reason == "length" or not complete
+
+        # Let later chunks adapt to this response's size and truncation
+        self.chunk_planner.record_response(expected_output_tokens, len(content), truncated)
+
+        continuations = 0
+        while truncated and questions and continuations < self.MAX_CONTINUATIONS:
+            continuations += 1
+            logger.info(
+                f"Extraction response truncated after {len(questions)} questions, "
+                f"requesting continuation {continuations}/{self.MAX_CONTINUATIONS}"
             )
             st.info(
-                "💡 To enable AI-powered document parsing, add your OPENROUTER_API_KEY to .streamlit/secrets.toml"
+                f"✂️ Response was cut off after {len(questions)} questions - "
+                f"continuing from there (request {continuations}/{self.MAX_CONTINUATIONS})..."
             )
-            return self._demo_parse_fallback()
+            completion = await self._request_completion(
+                client, self._create_continuation_prompt(prompt, questions[-1]), max_retries
+            )
+            if completion is None:
+                break
 
-        import time
+            content, finish_reason = completion
+            more_questions, complete = self._parse_json_array_incremental(content)
+            truncated = finish_reason == "length" or not complete
+
+            # The model sometimes repeats the question it was told to resume after
+            seen = {self._question_identity(q) for q in questions}
+            more_questions = [q for q in more_questions if self._question_identity(q) not in seen]
+            if not more_questions:
+                break
+
+            questions.extend(more_questions)
+
+        return questions, not truncated
+
+    async def _request_completion(
+        self, client: httpx.AsyncClient, prompt: str, max_retries: int = 2
+    ) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Send one extraction prompt with retry logic.
+        Each attempt holds an AI scheduler slot (bounded concurrency + shared rate limit).
+
+        Returns:
+            (content, finish_reason), or None if every attempt failed
+        """
         last_error = None
 
         for attempt in range(max_retries + 1):
@@ -729,7 +894,7 @@ Extract all questions now:"""
                 if attempt > 0:
                     wait_time = 2 ** attempt  # Exponential backoff: 2s, 4s
                     st.info(f"🔄 Retrying API call (attempt {attempt + 1}/{max_retries + 1}) after {wait_time}s...")
-                    time.sleep(wait_time)
+                    await asyncio.sleep(wait_time)
 
                 headers = {
                     "Authorization": f"Bearer {self.api_key}",
@@ -742,15 +907,21 @@ Extract all questions now:"""
                     "model": self.model,
                     "messages": [{"role": "user", "content": prompt}],
                     "temperature": 0.1,  # Low temperature for consistent extraction
-                    "max_tokens": 4000,
+                    "max_tokens": self.chunk_planner.max_output_tokens,
                 }
 
-                # Make synchronous request
-                with httpx.Client(timeout=60.0) as client:
-                    response = client.post(
+                async with ai_scheduler.slot():
+                    response = await client.post(
                         f"{self.base_url}/chat/completions", headers=headers, json=payload
                     )
 
+                if response.status_code == 429:
+                    # Provider rate limit - pause every extraction request, not just this one
+                    retry_after = response.headers.get("retry-after", "")
+                    ai_scheduler.rate_limiter.back_off(
+                        float(retry_after) if retry_after.isdigit() else 2 ** (attempt + 1)
+                    )
+
                 if response.status_code != 200:
                     raise Exception(f"API returned status {response.status_code}: {response.text}")
 
@@ -770,13 +941,11 @@ Extract all questions now:"""
                 if "content" not in result["choices"][0]["message"]:
                     raise Exception("API response missing 'content' field in message")
 
-                content = result["choices"][0]["message"]["content"]
-
-                # Extract JSON from response
-                questions = self._extract_json_from_response(content)
+                content = result["choices"][0]["message"]["content"] or ""
+                finish_reason = result["choices"][0].get("finish_reason")
 
-                # Success - return questions
-                return questions
+                # Success - return raw content for incremental parsing
+                return content, finish_reason
 
             except Exception as e:
                 last_error = e
@@ -786,28 +955,111 @@ Extract all questions now:"""
                 if attempt == max_retries:
                     st.error(f"AI API call failed after {max_retries + 1} attempts: {str(last_error)}")
                     logger.error(f"AI API error details: {str(last_error)}", exc_info=True)
-                    return []
+                    return None
                 # Otherwise, continue to next retry
 
         # This should never be reached, but just in case
-        return []
+        return None
+
+    def _create_continuation_prompt(self, prompt: str, last_question: Dict[str, Any]) -> str:
+        """Ask the model to resume extraction after the last question it completed"""
+        last_text = " ".join(str(last_question.get("question") or "").split())
+        if len(last_text) > 300:
+            last_text = last_text[:300] + "..."
+
+        return f"""{prompt}
+
+CONTINUATION: Your previous answer to this request was cut off. The LAST question you extracted completely was:
+"{last_text}"
+
+Continue with the questions that come AFTER that one in the document text. Do NOT repeat any question up to and including it.
+Return ONLY a JSON array of the remaining questions (or [] if there are none)."""
+
+    def _question_identity(self, question: Dict[str, Any]) -> str:
+        """Whitespace/case-insensitive question text, for dropping repeats across continuations"""
+        return " ".join(str(question.get("question") or "").lower().split())
 
     def _extract_json_from_response(self, content: str) -> List[Dict[str, Any]]:
-        """Extract JSON array from AI response"""
+        """Extract JSON array from AI response (salvages complete items from truncated output)"""
+        questions, _ = self._parse_json_array_incremental(content)
+        return questions
+
+    def _parse_json_array_incremental(self, content: str) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Incrementally parse a JSON array of question objects, one element at a time.
+
+        Every complete object is kept even if the array is cut off mid-element or an element
+        is malformed (the parser skips ahead to the next object). Markdown code fences and
+        text around the array are ignored.
+
+        Returns:
+            (questions, complete) - complete is False if the array was never closed
+        """
+        if not content:
+            return [], False
+
+        # Fast path: well-formed response
+        stripped = re.sub(r"^```(?:json)?\s*|\s*```$", "", content.strip())
         try:
-            # Try to parse directly
-            questions = json.loads(content)
-            return questions if isinstance(questions, list) else []
+            parsed = json.loads(stripped)
+            if isinstance(parsed, list):
+                return [q for q in parsed if isinstance(q, dict)], True
+            if isinstance(parsed, dict):
+                # A single question object (its "choices" list is not a wrapped array)
+                if "question" in parsed or "choices" in parsed:
+                    return [parsed], True
+                # Some models wrap the array: {"questions": [...]}
+                for value in parsed.values():
+                    if isinstance(value, list):
+                        return [q for q in value if isinstance(q, dict)], True
+                # Anything else ({"error": ...}, {"status": ...}) is not an extraction
+                return [], False
         except json.JSONDecodeError:
-            # Try to find JSON array in the content
-            json_match = re.search(r"\[[\s\S]*\]", content)
-            if json_match:
-                try:
-                    questions = json.loads(json_match.group(0))
-                    return questions if isinstance(questions, list) else []
-                except json.JSONDecodeError:
-                    pass
-            return []
+            pass
+
+        decoder = json.JSONDecoder()
+        array_start = stripped.find("[")
+        object_start = stripped.find("{")
+        if object_start < 0:
+            return [], array_start >= 0 and stripped.rstrip().endswith("]")
+
+        # Start at the array if there is one before the first object
+        pos = array_start + 1 if 0 <= array_start < object_start else object_start
+        length = len(stripped)
+        questions: List[Dict[str, Any]] = []
+
+        while pos < length:
+            char = stripped[pos]
+            if char in " \t\r\n,":
+                pos += 1
+                continue
+            if char == "]":
+                return questions, True
+            if char != "{":
+                # Noise between elements - skip to the next object
+                next_object = stripped.find("{", pos)
+                if next_object < 0:
+                    break
+                pos = next_object
+                continue
+
+            try:
+                item, end = decoder.raw_decode(stripped, pos)
+            except json.JSONDecodeError:
+                # Truncated or malformed element - resume at the next object, if any
+                next_object = stripped.find("{", pos + 1)
+                if next_object < 0:
+                    break
+                pos = next_object
+                continue
+
+            if isinstance(item, dict):
+                questions.append(item)
+            pos = end
+
+        if questions:
+            logger.info(f"Salvaged {len(questions)} complete questions from an unterminated response")
+        return questions, False
 
     def _demo_parse_fallback(self) -> List[Dict[str, Any]]:
         """Fallback parser for demo mode - extracts questions using regex patterns"""
@@ -1212,45 +1464,43 @@ Explanation: Paris is the capital and largest city of France.
 The AI will intelligently extract and structure all questions automatically!
 """
 
-    def _extract_answer_key_from_images(self, doc) -> Dict[int, Dict[str, str]]:
+    def _extract_answer_key_from_images(self, images) -> Dict[int, Dict[str, str]]:
         """
         Extract answer key from images embedded in Word document using OCR
+        (images: embedded image bytes in document order)
         Returns dict mapping question number to {answer, explanation}
         """
         answer_key = {}
 
         try:
-            # Initialize EasyOCR reader (lazy load)
-            reader = easyocr.Reader(["en"], gpu=False, verbose=False)
+            # Shared EasyOCR reader (models loaded once per process)
+            reader = get_reader()
 
             # Extract images from document
             images_extracted = 0
-            for rel in doc.part.rels.values():
-                if "image" in rel.target_ref:
-                    try:
-                        # Get image data
-                        image_data = rel.target_part.blob
-                        image = Image.open(io.BytesIO(image_data))
+            for image_data in images:
+                try:
+                    image = Image.open(io.BytesIO(image_data))
 
-                        # Convert to numpy array for easyocr
-                        img_array = np.array(image)
+                    # Convert to numpy array for easyocr
+                    img_array = np.array(image)
 
-                        # Perform OCR
-                        result = reader.readtext(img_array, detail=0)
-                        ocr_text = " ".join(result)
+                    # Perform OCR
+                    result = reader.readtext(img_array, detail=0)
+                    ocr_text = " ".join(result)
 
-                        # Parse answer sheet patterns
-                        parsed_answers = self._parse_answer_sheet_text(ocr_text)
-                        answer_key.update(parsed_answers)
+                    # Parse answer sheet patterns
+                    parsed_answers = self._parse_answer_sheet_text(ocr_text)
+                    answer_key.update(parsed_answers)
 
-                        images_extracted += 1
+                    images_extracted += 1
 
-                        # Only process first few images (answer sheets usually at start)
-                        if images_extracted >= 3:
-                            break
+                    # Only process first few images (answer sheets usually at start)
+                    if images_extracted >= 3:
+                        break
 
-                    except Exception:
-                        continue
+                except Exception:
+                    continue
 
         except Exception:
             # Silently fail if OCR not available or error
@@ -1297,23 +1547,22 @@ The AI will intelligently extract and structure all questions automatically!
 
         return answers
 
-    def _parse_word_structured(self, uploaded_file) -> List[Dict[str, Any]]:
+    def _parse_word_structured(self, word_content: DocxContent) -> List[Dict[str, Any]]:
         """
         Parse Word document using structured approach (faster and more accurate than AI)
         Looks for questions numbered like "1. Question text?" followed by choices A, B, C, D
+        (in paragraphs or question tables, in document order)
         Also extracts answer key table if present
         """
         try:
-            # Reset file pointer
-            uploaded_file.seek(0)
-
-            doc = Document(uploaded_file)
             questions = []
             answer_key = {}
 
             # First, try to extract answer key from images (OCR)
             if OCR_AVAILABLE:
-                image_answer_key = self._extract_answer_key_from_images(doc)
+                image_answer_key = self._extract_answer_key_from_images(
+                    word_content.iter_images()
+                )
                 answer_key.update(image_answer_key)
                 if image_answer_key:
                     st.success(
@@ -1321,11 +1570,12 @@ The AI will intelligently extract and structure all questions automatically!
                     )
 
             # Next, try to find answer key table (text-based)
-            for table in doc.tables:
-                for i, row in enumerate(table.rows):
+            answer_key_tables = set()
+            for table_index, rows in enumerate(word_content.tables):
+                for i, row in enumerate(rows):
                     if i == 0:  # Skip header row
                         continue
-                    cells = [cell.text.strip() for cell in row.cells]
+                    cells = [cell.strip() for cell in row]
                     if len(cells) >= 2:
                         try:
                             q_num = cells[0].strip()
@@ -1336,15 +1586,22 @@ The AI will intelligently extract and structure all questions automatically!
                                 answer = cells[1].strip()
                                 explanation = cells[2].strip() if len(cells) > 2 else ""
                                 answer_key[q_num] = {"answer": answer, "explanation": explanation}
+                                answer_key_tables.add(table_index)
                         except (ValueError, IndexError):
                             continue
 
-            # Extract questions from paragraphs
+            # Extract questions from paragraphs and non-answer-key tables in document order
             current_question = None
             current_choices = []
 
-            for para in doc.paragraphs:
-                text = para.text.strip()
+            lines = (
+                line
+                for _, item_text, table_index in word_content.items
+                if table_index not in answer_key_tables
+                for line in item_text.split("\n")
+            )
+            for line in lines:
+                text = line.strip()
                 if not text:
                     continue
 
@@ -0,0 +1,203 @@
+"""
+Streaming DOCX Reader for MockExamify
+Reads word/document.xml in one pass, in document order, so paragraphs, table cells and
+images come out in the order they appear on the page (questions laid out in tables stay
+between the paragraphs around them).
+
+Events:
+    {"type": "paragraph", "text": str}
+    {"type": "cell", "text": str, "table": int, "row": int, "col": int}
+    {"type": "image", "rel_id": str}
+"""
+
+import io
+import logging
+import posixpath
+import xml.etree.ElementTree as ET
+import zipfile
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_PART = "word/document.xml"
+DOCUMENT_RELS_PART = "word/_rels/document.xml.rels"
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+A_BLIP = "{http://schemas.openxmlformats.org/drawingml/2006/main}blip"
+V_IMAGEDATA = "{urn:schemas-microsoft-com:vml}imagedata"
+MC_FALLBACK = "{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+W_P = W_NS + "p"
+W_R = W_NS + "r"
+W_T = W_NS + "t"
+W_TAB = W_NS + "tab"
+W_BR = W_NS + "br"
+W_CR = W_NS + "cr"
+W_TBL = W_NS + "tbl"
+W_TR = W_NS + "tr"
+W_TC = W_NS + "tc"
+
+
+def iter_docx_events(zip_file: zipfile.ZipFile) -> Iterator[Dict[str, Any]]:
+    """
+    Yield paragraph / table cell / image events from the document body in document order.
+    Elements are cleared as they are consumed, so memory does not grow with the document.
+    """
+    paragraph_stack: List[List[str]] = []  # text parts of the open paragraphs
+    cell_stack: List[Dict[str, Any]] = []  # open table cells (nested tables)
+    table_stack: List[Dict[str, int]] = []
+    table_count = 0
+    run_depth = 0
+    fallback_depth = 0  # mc:Fallback repeats the mc:Choice content - skip it
+
+    with zip_file.open(DOCUMENT_PART) as document_xml:
+        for event, elem in ET.iterparse(document_xml, events=("start", "end")):
+            tag = elem.tag
+            if tag == MC_FALLBACK:
+                fallback_depth += 1 if event == "start" else -1
+                if event == "end":
+                    elem.clear()
+                continue
+            if fallback_depth:
+                continue
+
+            if event == "start":
+                if tag == W_P:
+                    paragraph_stack.append([])
+                elif tag == W_R:
+                    run_depth += 1
+                elif tag == W_TBL:
+                    table_stack.append({"index": table_count, "row": -1, "col": -1})
+                    table_count += 1
+                elif tag == W_TR and table_stack:
+                    table_stack[-1]["row"] += 1
+                    table_stack[-1]["col"] = -1
+                elif tag == W_TC and table_stack:
+                    table_stack[-1]["col"] += 1
+                    cell_stack.append({**table_stack[-1], "paragraphs": []})
+                elif tag == A_BLIP or tag == V_IMAGEDATA:
+                    rel_id = elem.get(R_NS + "embed") or elem.get(R_NS + "id")
+                    if rel_id:
+                        yield {"type": "image", "rel_id": rel_id}
+                continue
+
+            # end events
+            if tag == W_T:
+                if paragraph_stack and elem.text:
+                    paragraph_stack[-1].append(elem.text)
+            elif tag == W_TAB and run_depth:
+                # w:tab outside a run is a tab stop definition, not text
+                if paragraph_stack:
+                    paragraph_stack[-1].append("\t")
+            elif (tag == W_BR or tag == W_CR) and run_depth:
+                if paragraph_stack:
+                    paragraph_stack[-1].append("\n")
+            elif tag == W_R:
+                run_depth -= 1
+            elif tag == W_P:
+                text = "".join(paragraph_stack.pop()) if paragraph_stack else ""
+                if cell_stack:
+                    cell_stack[-1]["paragraphs"].append(text)
+                else:
+                    yield {"type": "paragraph", "text": text}
+                elem.clear()
+            elif tag == W_TC and cell_stack:
+                cell = cell_stack.pop()
+                yield {
+                    "type": "cell",
+                    "text": "\n".join(cell["paragraphs"]),
+                    "table": cell["index"],
+                    "row": cell["row"],
+                    "col": cell["col"],
+                }
+                elem.clear()
+            elif tag == W_TBL and table_stack:
+                table_stack.pop()
+                elem.clear()
+
+
+def _read_image_targets(zip_file: zipfile.ZipFile) -> Dict[str, str]:
+    """Relationship id -> zip path of the document's embedded images"""
+    try:
+        rels_xml = zip_file.read(DOCUMENT_RELS_PART)
+    except KeyError:
+        return {}
+    targets = {}
+    for rel in ET.fromstring(rels_xml).iter(PKG_REL_NS + "Relationship"):
+        if rel.get("TargetMode") == "External" or "image" not in rel.get("Type", ""):
+            continue
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            path = target.lstrip("/")
+        else:
+            path = posixpath.normpath(posixpath.join("word", target))
+        targets[rel.get("Id")] = path
+    return targets
+
+
+class DocxContent:
+    """Everything the Word import needs from one pass over a DOCX file"""
+
+    def __init__(self, file_bytes: bytes):
+        self.file_bytes = file_bytes
+        # (kind, text, table index) in document order; kind is "paragraph" or "cell"
+        self.items: List[Tuple[str, str, Optional[int]]] = []
+        # table index -> rows of cell text
+        self.tables: List[List[List[str]]] = []
+        # image relationship ids in document order
+        self.image_rel_ids: List[str] = []
+
+    @property
+    def paragraphs(self) -> List[str]:
+        """Body paragraph text (outside tables)"""
+        return [text for kind, text, _ in self.items if kind == "paragraph"]
+
+    @property
+    def text(self) -> str:
+        """Non-blank paragraphs and table cells, one per line, in document order"""
+        return "\n".join(text for _, text, _ in self.items if text.strip()).strip()
+
+    def iter_images(self) -> Iterator[bytes]:
+        """Embedded image bytes in document order (read lazily from the archive)"""
+        if not self.image_rel_ids:
+            return
+        with zipfile.ZipFile(io.BytesIO(self.file_bytes)) as zip_file:
+            targets = _read_image_targets(zip_file)
+            seen = set()
+            for rel_id in self.image_rel_ids:
+                path = targets.get(rel_id)
+                if not path or path in seen:
+                    continue
+                seen.add(path)
+                try:
+                    yield zip_file.read(path)
+                except KeyError:
+                    logger.warning(f"DOCX image {path} missing from archive")
+
+
+def read_docx(source: Union[bytes, BinaryIO]) -> DocxContent:
+    """Read a DOCX file (bytes or file object) in one streaming pass"""
+    if not isinstance(source, (bytes, bytearray)):
+        source.seek(0)
+        source = source.read()
+    content = DocxContent(bytes(source))
+
+    with zipfile.ZipFile(io.BytesIO(content.file_bytes)) as zip_file:
+        for event in iter_docx_events(zip_file):
+            if event["type"] == "paragraph":
+                content.items.append(("paragraph", event["text"], None))
+            elif event["type"] == "cell":
+                table_index = event["table"]
+                while len(content.tables) <= table_index:
+                    content.tables.append([])
+                rows = content.tables[table_index]
+                while len(rows) <= event["row"]:
+                    rows.append([])
+                rows[event["row"]].append(event["text"])
+                content.items.append(("cell", event["text"], table_index))
+            elif event["type"] == "image":
+                content.image_rel_ids.append(event["rel_id"])
+
+    return content
@@ -6,6 +6,7 @@ import json
 import re
 import PyPDF2
 from db import db
+from question_pool_manager import stored_question_hash
 from openrouter_utils import openrouter_manager
 
 
@@ -94,7 +95,8 @@ async def update_question_in_db(pool_id: str, search_text: str, fixed_data: dict
             updated_data = {
                 'question_text': fixed_data['question_text'],
                 'choices': json.dumps(fixed_data['choices']),
-                'correct_answer': fixed_data['correct_index']
+                'correct_answer': fixed_data['correct_index'],
+                'content_hash': stored_question_hash(fixed_data['question_text'], fixed_data['choices'])
             }
 
             # Update directly with Supabase
@@ -6,6 +6,7 @@ import asyncio
 import re
 import json
 from db import db
+from question_pool_manager import stored_question_hash
 
 async def fix_question():
     """Fix the corrupted choices"""
@@ -55,7 +56,8 @@ async def fix_question():
     # Update in database with correct JSON encoding
     try:
         update_data = {
-            'choices': json.dumps(fixed_choices)
+            'choices': json.dumps(fixed_choices),
+            'content_hash': stored_question_hash(question['question_text'], fixed_choices)
         }
 
         result = db.admin_client.table("pool_questions").update(update_data).eq("id", question_id).execute()
@@ -12,6 +12,7 @@ import httpx
 
 import config
 from db import db
+from question_pool_manager import stored_question_hash
 
 
 def fix_ocr_text(text: str) -> str:
@@ -207,6 +208,9 @@ async def fix_all_questions():
                             {
                                 "question_text": fixed["question"],
                                 "choices": json.dumps(fixed["choices"]),
+                                "content_hash": stored_question_hash(
+                                    fixed["question"], fixed["choices"]
+                                ),
                             }
                         )
                         .eq("id", question_id)
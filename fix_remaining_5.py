@@ -4,6 +4,7 @@ import json
 import re
 import PyPDF2
 from db import db
+from question_pool_manager import stored_question_hash
 from openrouter_utils import openrouter_manager
 
 
@@ -79,7 +80,8 @@ Return ONLY the JSON."""
             updated_data = {
                 'question_text': result['question_text'],
                 'choices': json.dumps(result['choices']),
-                'correct_answer': result['correct_index']
+                'correct_answer': result['correct_index'],
+                'content_hash': stored_question_hash(result['question_text'], result['choices'])
             }
 
             db_result = db.admin_client.table("pool_questions").update(updated_data).eq("id", question_id).execute()
@@ -3,6 +3,7 @@ Document ingestion and parsing system for MockExamify
 Handles PDF, DOCX, CSV, and JSON file processing
 """
 
+import asyncio
 import csv
 import io
 import json
@@ -19,15 +20,12 @@ from models import ParsedQuestion, ParseResult, QuestionChoice
 logger = logging.getLogger(__name__)
 
 # OCR support flag
-OCR_AVAILABLE = False
-try:
-    import easyocr
-    import fitz  # PyMuPDF - no external dependencies needed
+from ocr_engine import OCR_AVAILABLE, classify_pdf_pages, ocr_pdf_pages
 
-    OCR_AVAILABLE = True
+if OCR_AVAILABLE:
     logger.info("OCR support enabled (EasyOCR + PyMuPDF)")
-except ImportError as e:
-    logger.warning(f"OCR not available: {e}. Install easyocr and pymupdf for scanned PDF support.")
+else:
+    logger.warning("OCR not available. Install easyocr and pymupdf for scanned PDF support.")
 
 
 class DocumentParser:
@@ -75,15 +73,16 @@ class DocumentParser:
         try:
             # First try standard text extraction
             pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-            text = ""
-
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
+            page_texts = [page.extract_text() or "" for page in pdf_reader.pages]
+            text = "".join(page_text + "\n" for page_text in page_texts if page_text)
 
             # Check if we got meaningful text
             clean_text = text.strip()
+            if len(clean_text) > 100 and OCR_AVAILABLE:
+                # Mixed PDF: OCR only the pages without a usable text layer
+                merged_text = await self._ocr_pdf(file_content, file_name, page_texts)
+                if merged_text:
+                    text = merged_text
             if len(clean_text) > 100:  # Got reasonable amount of text
                 logger.info(
                     f"PDF {file_name}: Extracted {len(clean_text)} chars via standard method"
@@ -130,41 +129,38 @@ class DocumentParser:
                 confidence_score=0.0,
             )
 
-    async def _ocr_pdf(self, file_content: bytes, file_name: str) -> str:
-        """Extract text from scanned PDF using OCR"""
+    async def _ocr_pdf(
+        self, file_content: bytes, file_name: str, native_page_texts: Optional[List[str]] = None
+    ) -> str:
+        """
+        Extract text from scanned PDF using OCR.
+        With native_page_texts, only pages lacking a usable text layer are OCRed and the
+        result is merged with the native text in page order ("" if no page needs OCR).
+        """
         try:
-            import numpy as np
-            from PIL import Image
+            ocr_pages = None
+            if native_page_texts is not None:
+                page_layers = await asyncio.to_thread(classify_pdf_pages, file_content)
+                ocr_pages = [layer["page_index"] for layer in page_layers if layer["needs_ocr"]]
+                if not ocr_pages:
+                    return ""
 
             logger.info(f"Starting OCR for {file_name}...")
 
-            # Open PDF with PyMuPDF
-            pdf_doc = fitz.open(stream=file_content, filetype="pdf")
-            num_pages = len(pdf_doc)
-            logger.info(f"PDF has {num_pages} pages")
-
-            # Initialize EasyOCR reader (lazy load to save memory)
-            reader = easyocr.Reader(["en"], gpu=False, verbose=False)
-
-            all_text = []
-            for i, page in enumerate(pdf_doc):
-                logger.info(f"Processing page {i+1}/{num_pages} with OCR...")
-
-                # Render page to image (200 DPI)
-                mat = fitz.Matrix(200 / 72, 200 / 72)  # 200 DPI
-                pix = page.get_pixmap(matrix=mat)
-
-                # Convert to PIL Image then numpy array
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                img_array = np.array(img)
-
-                # Run OCR
-                results = reader.readtext(img_array)
-                # Extract text from results
-                page_text = "\n".join([result[1] for result in results])
-                all_text.append(page_text)
+            # Pages are OCRed in parallel by warmed worker processes (200 DPI, line-level),
+            # off the event loop so other ingest work keeps running
+            page_texts = await asyncio.to_thread(
+                ocr_pdf_pages, file_content, ocr_pages, dpi=200, paragraph=False
+            )
 
-            pdf_doc.close()
+            if native_page_texts is not None:
+                ocr_by_page = dict(zip(ocr_pages, page_texts))
+                page_texts = [
+                    ocr_by_page.get(index) or native_text
+                    for index, native_text in enumerate(native_page_texts)
+                ]
+            num_pages = len(page_texts)
+            all_text = [page_text for page_text in page_texts if page_text]
 
             combined_text = "\n\n".join(all_text)
             logger.info(
@@ -0,0 +1,20 @@
+-- Key duplicate_cache verdicts by question content hash
+-- AI similarity verdicts are looked up before and stored after each duplicate check,
+-- so the same pair of questions is never sent to the AI twice. New questions have no
+-- pool_questions id yet when they are checked, so pairs are keyed by content hash
+-- (see migrations/add_pool_questions_content_hash.sql).
+
+ALTER TABLE duplicate_cache
+ADD COLUMN IF NOT EXISTS question1_hash VARCHAR(32);
+
+ALTER TABLE duplicate_cache
+ADD COLUMN IF NOT EXISTS question2_hash VARCHAR(32);
+
+-- Pairs are stored ordered (question1_hash < question2_hash); verdict upserts conflict here
+CREATE UNIQUE INDEX IF NOT EXISTS uq_duplicate_cache_hash_pair
+ON duplicate_cache(question1_hash, question2_hash);
+
+CREATE INDEX IF NOT EXISTS idx_duplicate_cache_q2_hash ON duplicate_cache(question2_hash);
+
+COMMENT ON COLUMN duplicate_cache.question1_hash IS 'Content hash of the first question (the smaller of the pair)';
+COMMENT ON COLUMN duplicate_cache.question2_hash IS 'Content hash of the second question';
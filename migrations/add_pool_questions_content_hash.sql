@@ -0,0 +1,17 @@
+-- Add a normalized content hash to pool_questions for exact duplicate detection
+-- REQUIRED: uploads (db.add_questions_to_pool) always write content_hash.
+-- Uploads look up only the new batch's hashes instead of downloading the whole pool.
+-- After running this migration, fill in existing rows with:
+--     python backfill_content_hashes.py
+
+-- MD5 of the normalized question text and sorted choices
+-- (same as question_pool_manager.calculate_question_hash)
+ALTER TABLE pool_questions
+ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32);
+
+-- Exact-duplicate lookups: WHERE pool_id = ? AND content_hash IN (...)
+CREATE INDEX IF NOT EXISTS idx_pool_questions_pool_content_hash
+ON pool_questions(pool_id, content_hash);
+
+COMMENT ON COLUMN pool_questions.content_hash IS 'MD5 of normalized question text + sorted choices (exact duplicate detection)';
+
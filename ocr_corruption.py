@@ -0,0 +1,248 @@
+"""
+Shared OCR Corruption Detector for MockExamify
+One set of corruption rules for the upload parser, the background OCR processor and the
+pool scanning scripts.
+
+- Rules are compiled once; a rule only runs on text that contains the literal part every
+  match of it needs (checked on one lowercase copy of the text), so clean text costs a
+  few substring checks instead of a case-insensitive search per rule
+- scan_pool streams a pool page by page and scans the pages in worker processes
+
+Rule sets:
+    "ocr"          OCR misreads and malformed text (checked on every upload)
+    "bleeding"     question text running into the choices
+    "typos"        missing spaces / doubled words (checked outside production)
+    "split_words"  spaces in the middle of recognizable words
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from question_text_validator import required_literal
+
+logger = logging.getLogger(__name__)
+
+# (pattern, description) - matched case-insensitively
+OCR_CORRUPTION_RULES = [
+    # Letter 'o' or 'O' instead of number '0' in prices
+    (r"\$[oO]\.", "Dollar sign followed by letter o/O instead of zero"),
+    # Common word corruptions (m/n confusion)
+    (r"\bordinai-y\b", "ordinai-y instead of ordinary"),
+    (r"\bordinan/\b", "ordinan/ instead of ordinary"),
+    (r"\bstmctures\b", "stmctures instead of structures"),
+    (r"\binvestrnent\b", "investrnent instead of investment"),
+    (r"\bgovernrnent\b", "governrnent instead of government"),
+    (r"\bmanagernent\b", "managernent instead of management"),
+    (r"\bperforrnance\b", "performrnance instead of performance"),
+    (r"\brnake\b", "rnake instead of make"),
+    (r"\brnay\b", "rnay instead of may"),
+    (r"\brnust\b", "rnust instead of must"),
+    (r"\brnore\b", "rnore instead of more"),
+    # Number/letter confusion in percentages
+    (r"\b[Il]00\%", "Letter I or l instead of 1 in 100%"),
+    # Multiple consecutive spaces (likely OCR artifact)
+    (r"\s{4,}", "Four or more consecutive spaces"),
+    # Obvious text bleeding/corruption
+    (r"determined by the\s*Choices", "Question text bleeding into choices"),
+]
+
+BLEEDING_RULES = [
+    (r"\.{3,}Choices", "Question ending with ... directly into Choices"),
+]
+
+# Common spacing/typo patterns that AI parsing or OCR missed
+TYPO_RULES = [
+    (r"\bajoint\b", "ajoint should be 'a joint'"),
+    (r"\btobe\b", "tobe should be 'to be'"),
+    (r"\bofthe\b", "ofthe should be 'of the'"),
+    (r"\binthe\b", "inthe should be 'in the'"),
+    (r"\bonthe\b", "onthe should be 'on the'"),
+    (r"\batthe\b", "atthe should be 'at the'"),
+    (r"\bforthe\b", "forthe should be 'for the'"),
+    (r"\bwiththe\b", "withthe should be 'with the'"),
+    (r"\bfromthe\b", "fromthe should be 'from the'"),
+    (r"\bthat\s+the\s+the\b", "duplicate 'the the'"),
+    (r"\ba\s+a\b", "duplicate 'a a'"),
+    (r"\bwill\s+will\b", "duplicate 'will will'"),
+    (r"\bis\s+is\b", "duplicate 'is is'"),
+]
+
+# Real corruption: a space in the middle of a recognizable word (not "a TR" and the like)
+SPLIT_WORD_PATTERNS = [
+    r"\bCharli\s+e\b", r"\bpa\s+rt\b", r"\bma\s+rket\b", r"\btrou\s+ble\b",
+    r"\bsuspicion\s+s\b", r"\bordinar\s+y\b", r"\bfi\s+nancial\b",
+    r"\bgo\s+od\b", r"\bvar\s+ious\b", r"\bn\s+ot\b", r"\borde\s+r\b",
+    r"\bdoe\s+s\b", r"\ballo\s+we\s+d\b", r"\bbasi\s+s\b", r"\brea\s+lized\b",
+    r"\bprofi\s+t\b", r"\bi\s+nvestment\b", r"\bopen\s+a\s+CPF\b",
+    r"\bfo\s+r\b", r"\btha\s+t\b", r"\brequ\s+ires\s+a\b", r"\boffenc\s+e\b",
+    r"\bMembe\s+r\s+w\b", r"\bcor\s+p\s+orate\b", r"\bar\s+e\s+covered\b",
+    r"\bdifferen\s+c\s+e\b", r"\binfor\s+m\s+a\b", r"\brefe\s+r\s+ence\b",
+    r"\bdea\s+ling\b", r"\bdetecte\s+d\b", r"\bsuspect\s+ed\b",
+]  # fmt: skip
+SPLIT_WORD_RULES = [(pattern, "Space in the middle of a word") for pattern in SPLIT_WORD_PATTERNS]
+
+RULE_SETS = {
+    "ocr": OCR_CORRUPTION_RULES,
+    "bleeding": BLEEDING_RULES,
+    "typos": TYPO_RULES,
+    "split_words": SPLIT_WORD_RULES,
+}
+
+# (pattern, description, matched text)
+RuleHit = Tuple[str, str, str]
+
+# Questions per worker task when scanning a pool
+SCAN_PAGE_SIZE = 1000
+
+
+class CorruptionDetector:
+    """Compiled corruption rules; clean text is ruled out without running every regex"""
+
+    def __init__(self, rules: Sequence[Tuple[str, str]]):
+        # (pattern, description, compiled, lowercase text every match contains or "")
+        self.rules = [
+            (
+                pattern,
+                description,
+                re.compile(pattern, re.IGNORECASE),
+                required_literal(pattern).lower(),
+            )
+            for pattern, description in rules
+        ]
+        # Matches iff at least one rule matches
+        self._combined = re.compile(
+            "|".join(f"(?:{pattern})" for pattern, _ in rules) or r"(?!)", re.IGNORECASE
+        )
+
+    def _candidates(self, text: str) -> List[Tuple[str, str, re.Pattern, str]]:
+        """Rules that can match the text"""
+        if not text:
+            return []
+        if text.isascii():
+            # One lowercase copy, then a substring check per rule; for ASCII text this is
+            # exactly what a case-insensitive match needs
+            lowered = text.lower()
+            return [rule for rule in self.rules if rule[3] in lowered]
+        # Unicode case folding is wider than str.lower() - one combined pass instead
+        return self.rules if self._combined.search(text) else []
+
+    def first(self, text: str) -> Optional[str]:
+        """Description of the first rule (in rule order) the text matches, None if clean"""
+        for _, description, compiled, _ in self._candidates(text):
+            if compiled.search(text):
+                return description
+        return None
+
+    def hits(self, text: str) -> List[RuleHit]:
+        """Every rule the text matches, with the matched text"""
+        found = []
+        for pattern, description, compiled, _ in self._candidates(text):
+            match = compiled.search(text)
+            if match:
+                found.append((pattern, description, match.group()))
+        return found
+
+    def scan_question(self, question: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Rule hits in a question's text and choices
+
+        Returns:
+            {"id", "question" (the question itself), "question_hits": [RuleHit],
+            "choice_hits": {choice index: [RuleHit]}}, or None if the question is clean
+        """
+        question_hits = self.hits(question.get("question_text") or question.get("question") or "")
+        choice_hits = {}
+        choices = question.get("choices")
+        if isinstance(choices, str):
+            try:
+                choices = json.loads(choices)
+            except json.JSONDecodeError:
+                choices = [choices]
+        if isinstance(choices, list):
+            for index, choice in enumerate(choices):
+                if isinstance(choice, str):
+                    found = self.hits(choice)
+                    if found:
+                        choice_hits[index] = found
+        if not question_hits and not choice_hits:
+            return None
+        return {
+            "id": question.get("id"),
+            "question": question,
+            "question_hits": question_hits,
+            "choice_hits": choice_hits,
+        }
+
+
+_detectors: Dict[Tuple[str, ...], CorruptionDetector] = {}
+
+
+def get_detector(*rule_sets: str) -> CorruptionDetector:
+    """Detector for one or more rule sets, compiled once per process"""
+    if rule_sets not in _detectors:
+        rules = [rule for name in rule_sets for rule in RULE_SETS[name]]
+        _detectors[rule_sets] = CorruptionDetector(rules)
+    return _detectors[rule_sets]
+
+
+def detect_ocr_corruption(question_text: str) -> Optional[str]:
+    """
+    Detect OCR corruption in question text (spelling errors, malformed text).
+    Returns the first corruption found, None if clean.
+    """
+    return get_detector("ocr").first(question_text)
+
+
+def scan_questions(
+    questions: List[Dict[str, Any]], rule_sets: Tuple[str, ...] = ("ocr",)
+) -> List[Dict[str, Any]]:
+    """Per-question rule hits (see CorruptionDetector.scan_question) for corrupted questions"""
+    detector = get_detector(*rule_sets)
+    results = []
+    for question in questions:
+        result = detector.scan_question(question)
+        if result:
+            results.append(result)
+    return results
+
+
+async def scan_pool(
+    pool_id: str,
+    rule_sets: Tuple[str, ...] = ("ocr",),
+    workers: Optional[int] = None,
+    source_files: Optional[List[str]] = None,
+    columns: str = "id, question_text, choices",
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Scan a whole pool for corruption; pages are streamed from the database and scanned in
+    worker processes while the next pages download
+
+    Returns:
+        (questions scanned, per-question rule hits of the corrupted questions in pool order)
+    """
+    from db import db
+
+    workers = workers or os.cpu_count() or 1
+    loop = asyncio.get_running_loop()
+    pending = []
+    scanned = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        async for page in db.iter_pool_questions(
+            pool_id,
+            columns,
+            source_files=source_files,
+            page_size=SCAN_PAGE_SIZE,
+        ):
+            scanned += len(page)
+            pending.append(loop.run_in_executor(executor, scan_questions, page, rule_sets))
+        pages = await asyncio.gather(*pending)
+
+    results = [result for page in pages for result in page]
+    logger.info(f"Corruption scan: {len(results)} of {scanned} questions flagged")
+    return scanned, results
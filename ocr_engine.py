@@ -0,0 +1,516 @@
+"""
+OCR Engine for MockExamify
+One warmed EasyOCR reader per process, with scanned PDF pages fanned out across a
+process pool and returned in page order.
+"""
+
+import atexit
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import psutil
+
+from artifact_cache import get_artifact, hash_bytes, make_artifact_key, store_artifact
+
+logger = logging.getLogger(__name__)
+
+# Page rendering and classification only need PyMuPDF and NumPy
+RENDER_AVAILABLE = False
+try:
+    import fitz  # PyMuPDF
+    import numpy as np
+
+    RENDER_AVAILABLE = True
+except ImportError:
+    pass
+
+# OCR support flag
+OCR_AVAILABLE = False
+try:
+    import easyocr
+
+    OCR_AVAILABLE = RENDER_AVAILABLE
+except ImportError:
+    pass
+
+# Bump when rendering/OCR changes so cached page text is not reused
+OCR_CACHE_VERSION = "easyocr-en-2"
+
+# Page rendering / preprocessing
+DEFAULT_OCR_DPI = 150
+PROBE_DPI = 72  # low-resolution render used to measure text size for adaptive DPI
+TARGET_LINE_HEIGHT_PX = 20  # text line height adaptive DPI aims for
+MIN_OCR_DPI = 100
+MAX_OCR_DPI = 300
+MAX_DESKEW_DEGREES = 5.0
+DESKEW_STEP_DEGREES = 0.25
+MIN_DESKEW_DEGREES = 0.5  # smaller skews do not affect recognition
+DESKEW_SAMPLE_PIXELS = 50000
+
+# Below this many pages the process pool start-up costs more than it saves
+MIN_PAGES_FOR_POOL = 3
+
+# Per-page text-layer classification (mixed text/scanned PDFs); pages without images
+# always use their text layer
+MIN_TEXT_LAYER_CHARS = 80  # fewer non-whitespace chars than this: no usable text layer
+MIN_ALNUM_RATIO = 0.5  # below this the text layer is mostly broken glyph mappings
+SCANNED_IMAGE_COVERAGE = 0.5  # page area covered by images above which it looks scanned
+MIN_TEXT_WITH_IMAGE_CHARS = 400  # ...unless the page also carries this much text (OCRed scan)
+
+# Process-local state: the reader in this process (main or worker) and the open document
+_reader = None
+_reader_lock = threading.Lock()
+_open_document = None  # (file digest, fitz.Document) in worker processes
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def get_reader():
+    """EasyOCR reader for the current process (models are loaded once, then reused)"""
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                logger.info(f"Loading EasyOCR models (pid {os.getpid()})...")
+                _reader = easyocr.Reader(["en"], gpu=False, verbose=False)
+    return _reader
+
+
+def _init_worker():
+    """Process pool initializer: one torch thread per worker, reader warmed before work"""
+    try:
+        import torch
+
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    get_reader()
+
+
+def get_ocr_max_workers() -> int:
+    """
+    Worker count for the OCR pool: OCR_MAX_WORKERS (default: CPU count), capped so every
+    worker's OCR_WORKER_MEMORY_MB fits in the memory available now
+    """
+    import config
+
+    workers = max(1, config.OCR_MAX_WORKERS)
+    available_mb = psutil.virtual_memory().available // (1024 * 1024)
+    memory_cap = max(1, available_mb // max(1, config.OCR_WORKER_MEMORY_MB))
+    if memory_cap < workers:
+        logger.warning(
+            f"OCR pool limited to {memory_cap} workers by memory "
+            f"({available_mb} MB available, {config.OCR_WORKER_MEMORY_MB} MB per worker)"
+        )
+    return min(workers, memory_cap)
+
+
+def get_ocr_pool() -> ProcessPoolExecutor:
+    """Shared OCR process pool, kept alive so warmed readers are reused across documents"""
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None:
+            import multiprocessing
+
+            _pool_size = get_ocr_max_workers()
+            # spawn: torch/easyocr are not fork-safe once threads exist (e.g. under Streamlit)
+            _pool = ProcessPoolExecutor(
+                max_workers=_pool_size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            logger.info(f"Started OCR process pool with {_pool_size} workers")
+        return _pool
+
+
+def shutdown_ocr_pool():
+    """Stop the OCR process pool (also registered to run at interpreter exit)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(shutdown_ocr_pool)
+
+
+def _get_document(pdf_path: str, file_digest: str):
+    """
+    Open (or reuse) the PDF in this process. The file is read into memory so no handle
+    stays open on it (the caller deletes temporary files, which fails on Windows while a
+    worker holds them open).
+    """
+    global _open_document
+    if _open_document is None or _open_document[0] != file_digest:
+        if _open_document is not None:
+            _open_document[1].close()
+        with open(pdf_path, "rb") as f:
+            _open_document = (file_digest, fitz.open(stream=f.read(), filetype="pdf"))
+    return _open_document[1]
+
+
+def ocr_image(img_array, paragraph: bool = True) -> str:
+    """OCR one image (numpy array) with this process's reader"""
+    if paragraph:
+        results = get_reader().readtext(img_array, paragraph=True, batch_size=4)
+    else:
+        results = get_reader().readtext(img_array)
+    return "\n".join([result[1] for result in results])
+
+
+def render_page_gray(page, dpi: int, rotate: float = 0.0):
+    """
+    Render a page as an 8-bit grayscale image.
+
+    Returns:
+        (pixmap, array) - the array is a zero-copy NumPy view over the pixmap's samples,
+        so keep the pixmap alive for as long as the array is used
+    """
+    matrix = fitz.Matrix(dpi / 72, dpi / 72)
+    if rotate:
+        matrix = matrix.prerotate(rotate)
+    pix = page.get_pixmap(matrix=matrix, colorspace=fitz.csGRAY, alpha=False)
+    samples = pix.samples_mv if hasattr(pix, "samples_mv") else pix.samples
+    array = np.frombuffer(samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    if pix.stride != pix.width:
+        array = array[:, : pix.width]
+    return pix, array
+
+
+def estimate_line_height(gray) -> Optional[float]:
+    """Median height (px) of text lines from the row darkness profile, None if no text"""
+    dark_rows = (gray < 128).sum(axis=1) > max(2, gray.shape[1] // 200)
+    if not dark_rows.any():
+        return None
+    # Run lengths of consecutive dark rows
+    edges = np.diff(np.concatenate(([0], dark_rows.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    heights = ends - starts
+    heights = heights[heights >= 2]
+    if heights.size == 0:
+        return None
+    return float(np.median(heights))
+
+
+def choose_dpi(probe) -> int:
+    """
+    Adaptive DPI: measure the text line height on a PROBE_DPI render and pick the DPI that
+    brings lines to TARGET_LINE_HEIGHT_PX (large fonts -> lower DPI, small print -> higher)
+    """
+    line_height = estimate_line_height(probe)
+    if not line_height:
+        return DEFAULT_OCR_DPI
+    dpi = PROBE_DPI * TARGET_LINE_HEIGHT_PX / line_height
+    return int(min(MAX_OCR_DPI, max(MIN_OCR_DPI, round(dpi / 10) * 10)))
+
+
+def otsu_threshold(gray) -> int:
+    """Otsu's global threshold from the image histogram (vectorised over all 256 levels)"""
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    weight_background = np.cumsum(histogram)
+    weight_foreground = weight_background[-1] - weight_background
+    cumulative_mean = np.cumsum(histogram * levels)
+    mean_background = cumulative_mean / np.maximum(weight_background, 1)
+    mean_foreground = (cumulative_mean[-1] - cumulative_mean) / np.maximum(weight_foreground, 1)
+    between_variance = (
+        weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+    )
+    return int(np.argmax(between_variance))
+
+
+def binarize(gray):
+    """Black text on white background using Otsu's threshold"""
+    return np.where(gray > otsu_threshold(gray), 255, 0).astype(np.uint8)
+
+
+def estimate_skew(gray) -> float:
+    """
+    Skew angle (degrees) from the projection profile of dark pixels: text rows give the
+    sharpest row histogram when projected at the page's true angle.
+    """
+    ys, xs = np.nonzero(gray < otsu_threshold(gray))
+    if ys.size < 100:
+        return 0.0
+    if ys.size > DESKEW_SAMPLE_PIXELS:
+        step = ys.size // DESKEW_SAMPLE_PIXELS
+        ys, xs = ys[::step], xs[::step]
+
+    angles = np.arange(-MAX_DESKEW_DEGREES, MAX_DESKEW_DEGREES + 1e-9, DESKEW_STEP_DEGREES)
+    radians = np.deg2rad(angles)
+    # Projected row of every sampled pixel for every candidate angle: (angles, pixels)
+    rows = np.rint(ys[None, :] * np.cos(radians)[:, None] - xs[None, :] * np.sin(radians)[:, None])
+    rows = (rows - rows.min(axis=1, keepdims=True)).astype(np.int64)
+    # Row histograms of all angles at once: offset each angle into its own bin range
+    width = int(rows.max()) + 1
+    offsets = (np.arange(len(angles)) * width)[:, None]
+    counts = np.bincount((rows + offsets).ravel(), minlength=width * len(angles))
+    scores = (counts.reshape(len(angles), width).astype(np.float64) ** 2).sum(axis=1)
+    return float(angles[int(np.argmax(scores))])
+
+
+def _prepare_page_image(page, dpi: int, adaptive_dpi: bool, binarize_image: bool, deskew: bool):
+    """
+    Render a page for OCR with the optional preprocessing. Skew and text size are measured
+    on a low-resolution probe so the page is rendered at full resolution only once.
+    Returns (pixmap, array).
+    """
+    angle = 0.0
+    if adaptive_dpi or deskew:
+        probe_pix, probe = render_page_gray(page, PROBE_DPI)
+        if deskew:
+            angle = estimate_skew(probe)
+            if abs(angle) < MIN_DESKEW_DEGREES:
+                angle = 0.0
+            elif adaptive_dpi:
+                # Skewed lines blur the row profile - measure text size on the straightened page
+                probe_pix, probe = render_page_gray(page, PROBE_DPI, rotate=-angle)
+        if adaptive_dpi:
+            dpi = choose_dpi(probe)
+        del probe, probe_pix
+
+    # Straightened by MuPDF while rendering rather than by resampling the bitmap
+    pix, gray = render_page_gray(page, dpi, rotate=-angle)
+    if binarize_image:
+        gray = binarize(gray)
+    return pix, gray
+
+
+def _ocr_page(
+    page,
+    dpi: int,
+    paragraph: bool,
+    adaptive_dpi: bool = False,
+    binarize_image: bool = False,
+    deskew: bool = False,
+) -> str:
+    """Render one PyMuPDF page (grayscale, no intermediate copies) and OCR it"""
+    pix, img_array = _prepare_page_image(page, dpi, adaptive_dpi, binarize_image, deskew)
+    try:
+        return ocr_image(img_array, paragraph=paragraph)
+    finally:
+        del img_array, pix
+
+
+def _ocr_page_task(
+    pdf_path: str,
+    file_digest: str,
+    page_index: int,
+    dpi: int,
+    paragraph: bool,
+    preprocess: Dict[str, bool],
+) -> str:
+    """Worker task: OCR one page of a PDF on disk"""
+    document = _get_document(pdf_path, file_digest)
+    return _ocr_page(document[page_index], dpi, paragraph, **preprocess)
+
+
+def get_ocr_preprocess_options() -> Dict[str, bool]:
+    """Optional page preprocessing (OCR_ADAPTIVE_DPI, OCR_BINARIZE, OCR_DESKEW)"""
+    import config
+
+    return {
+        "adaptive_dpi": config.OCR_ADAPTIVE_DPI,
+        "binarize_image": config.OCR_BINARIZE,
+        "deskew": config.OCR_DESKEW,
+    }
+
+
+def _image_coverage(page) -> float:
+    """Fraction of the page area covered by embedded images"""
+    page_rect = page.rect
+    page_area = page_rect.width * page_rect.height
+    if page_area <= 0:
+        return 0.0
+    covered = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"]) & page_rect
+        if not bbox.is_empty:
+            covered += bbox.width * bbox.height
+    return min(1.0, covered / page_area)
+
+
+def classify_pdf_pages(pdf_source: Union[str, bytes]) -> List[Dict[str, Any]]:
+    """
+    Decide per page whether the PDF's text layer is usable or the page must be OCRed.
+
+    Returns:
+        One dict per page: {'page_index', 'text', 'text_chars', 'image_coverage', 'needs_ocr'}
+    """
+    if isinstance(pdf_source, (bytes, bytearray)):
+        pdf_doc = fitz.open(stream=pdf_source, filetype="pdf")
+    else:
+        pdf_doc = fitz.open(pdf_source)
+
+    pages = []
+    with pdf_doc:
+        for page_index, page in enumerate(pdf_doc):
+            text = page.get_text()
+            visible = "".join(text.split())
+            text_chars = len(visible)
+            alnum_ratio = sum(ch.isalnum() for ch in visible) / text_chars if text_chars else 0.0
+            coverage = _image_coverage(page)
+
+            # Only images hold text the layer can miss - blank and short text-only pages
+            # (separators, "END OF PAPER") are taken as they are
+            needs_ocr = coverage > 0 and (
+                text_chars < MIN_TEXT_LAYER_CHARS
+                or alnum_ratio < MIN_ALNUM_RATIO
+                or (coverage >= SCANNED_IMAGE_COVERAGE and text_chars < MIN_TEXT_WITH_IMAGE_CHARS)
+            )
+            pages.append(
+                {
+                    "page_index": page_index,
+                    "text": text,
+                    "text_chars": text_chars,
+                    "image_coverage": round(coverage, 2),
+                    "needs_ocr": needs_ocr,
+                }
+            )
+
+    ocr_count = sum(1 for page in pages if page["needs_ocr"])
+    logger.info(f"PDF page classification: {ocr_count}/{len(pages)} pages need OCR")
+    return pages
+
+
+def ocr_pdf_pages(
+    pdf_source: Union[str, bytes],
+    page_indexes: Optional[Sequence[int]] = None,
+    dpi: int = 150,
+    paragraph: bool = True,
+    on_progress: Optional[Callable[[int, int, int, Optional[str]], None]] = None,
+    use_cache: bool = True,
+    preprocess: Optional[Dict[str, bool]] = None,
+) -> List[Optional[str]]:
+    """
+    OCR PDF pages in parallel, one warmed reader per worker process.
+
+    Args:
+        pdf_source: Path to the PDF or its bytes
+        page_indexes: Zero-based pages to OCR (default: all pages)
+        dpi: Render resolution (the default when adaptive DPI is enabled and a page has no
+            measurable text)
+        paragraph: Group text into paragraphs (faster) instead of line-level results
+        on_progress: Optional callback(completed, total, page_index, text_or_None), called in
+            the calling thread as each page finishes
+        use_cache: Reuse page text OCRed earlier from the same file (artifact cache)
+        preprocess: {'adaptive_dpi', 'binarize_image', 'deskew'} flags
+            (default: get_ocr_preprocess_options(), i.e. the OCR_* settings)
+
+    Returns:
+        Page texts in the order of page_indexes (None for pages where OCR failed)
+    """
+    if not OCR_AVAILABLE:
+        raise RuntimeError("OCR libraries not available. Install easyocr and pymupdf.")
+    if preprocess is None:
+        preprocess = get_ocr_preprocess_options()
+
+    temp_path = None
+    if isinstance(pdf_source, (bytes, bytearray)):
+        file_digest = hash_bytes(bytes(pdf_source))
+        # Workers open the PDF from disk instead of receiving its bytes with every page
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
+            temp_file.write(pdf_source)
+            temp_path = temp_file.name
+        pdf_path = temp_path
+    else:
+        pdf_path = pdf_source
+        with open(pdf_path, "rb") as f:
+            file_digest = hash_bytes(f.read())
+
+    try:
+        if page_indexes is None:
+            with fitz.open(pdf_path) as pdf_doc:
+                page_indexes = list(range(len(pdf_doc)))
+        page_indexes = list(page_indexes)
+        total = len(page_indexes)
+        results: List[Optional[str]] = [None] * total
+        completed = 0
+
+        def page_key(page_index: int) -> str:
+            return make_artifact_key(
+                OCR_CACHE_VERSION, file_digest, page_index, dpi, paragraph, preprocess
+            )
+
+        def finish(position: int, text: Optional[str], from_cache: bool = False):
+            nonlocal completed
+            results[position] = text
+            if text is not None and not from_cache:
+                store_artifact("ocr_page", page_key(page_indexes[position]), text)
+            completed += 1
+            if on_progress:
+                on_progress(completed, total, page_indexes[position], text)
+
+        # Pages already OCRed in an earlier upload of the same file
+        pending = []
+        for position, page_index in enumerate(page_indexes):
+            cached = get_artifact("ocr_page", page_key(page_index)) if use_cache else None
+            if cached is not None:
+                finish(position, cached, from_cache=True)
+            else:
+                pending.append(position)
+        if len(pending) < total:
+            logger.info(f"OCR cache: {total - len(pending)}/{total} pages already available")
+
+        if len(pending) < MIN_PAGES_FOR_POOL:
+            # Small job - OCR in this process with its own warmed reader
+            if pending:
+                with fitz.open(pdf_path) as pdf_doc:
+                    for position in pending:
+                        page_index = page_indexes[position]
+                        text = None
+                        try:
+                            text = _ocr_page(pdf_doc[page_index], dpi, paragraph, **preprocess)
+                        except Exception as e:
+                            logger.error(f"OCR failed on page {page_index + 1}: {e}")
+                        finish(position, text)
+            return results
+
+        pool = get_ocr_pool()
+        logger.info(f"OCR of {len(pending)} pages across {_pool_size} worker processes")
+        futures = {
+            pool.submit(
+                _ocr_page_task,
+                pdf_path,
+                file_digest,
+                page_indexes[position],
+                dpi,
+                paragraph,
+                preprocess,
+            ): position
+            for position in pending
+        }
+        pool_broken = False
+        for future in as_completed(futures):
+            position = futures[future]
+            page_index = page_indexes[position]
+            text = None
+            try:
+                text = future.result()
+            except BrokenProcessPool as e:
+                pool_broken = True
+                logger.error(f"OCR worker died on page {page_index + 1}: {e}")
+            except Exception as e:
+                logger.error(f"OCR failed on page {page_index + 1}: {e}")
+            finish(position, text)
+
+        if pool_broken:
+            # A worker was killed (e.g. out of memory) - start a fresh pool next time
+            shutdown_ocr_pool()
+        return results
+
+    finally:
+        if temp_path:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
@@ -0,0 +1,292 @@
+"""
+Resumable OCR Import Jobs for MockExamify
+Durable job records for background scanned-PDF imports. OCR text is checkpointed per
+page, extraction results per chunk and inserted questions by key, so a job that dies part
+way through resumes from its last checkpoint instead of starting over.
+
+Layout:
+    .cache/ocr_jobs/<job_id>/job.json           job record (pool, file, status, pid, ...)
+    .cache/ocr_jobs/<job_id>/source.pdf         the uploaded PDF
+    .cache/ocr_jobs/<job_id>/pages/<n>.txt      OCR text of page n
+    .cache/ocr_jobs/<job_id>/chunks/<n>.json    extraction result of chunk n
+    .cache/ocr_jobs/<job_id>/inserted.txt       keys of questions already in the pool
+
+Job progress is mirrored to background_task_status (task_id = job_id).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = os.path.join(".cache", "ocr_jobs")
+
+# Serialises job.json read-modify-write between threads (OCR callbacks run in a thread)
+_job_lock = threading.Lock()
+
+
+def _get_jobs_root() -> str:
+    """Get the OCR jobs directory"""
+    return os.path.join(os.getcwd(), JOBS_DIR)
+
+
+def _job_dir(job_id: str) -> str:
+    return os.path.join(_get_jobs_root(), job_id)
+
+
+def _write_json(path: str, data: Any):
+    """Atomic JSON write"""
+    temp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(temp_file, path)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def make_job_id(file_bytes: bytes, pool_id: str) -> str:
+    """Same file into the same pool -> same job, so a re-upload resumes the earlier job"""
+    digest = hashlib.sha256(file_bytes).hexdigest()
+    return f"ocr_{str(pool_id)[:8]}_{digest[:16]}"
+
+
+def create_job(file_bytes: bytes, pool_id: str, pool_name: str, source_filename: str) -> str:
+    """Create a job (or reuse the unfinished job for the same file and pool)"""
+    job_id = make_job_id(file_bytes, pool_id)
+    existing = load_job(job_id)
+    if existing and existing.get("status") != "completed":
+        logger.info(f"Reusing unfinished OCR job {job_id} ({existing.get('status')})")
+        return job_id
+
+    job_dir = _job_dir(job_id)
+    if existing:
+        shutil.rmtree(job_dir, ignore_errors=True)
+    os.makedirs(os.path.join(job_dir, "pages"), exist_ok=True)
+    os.makedirs(os.path.join(job_dir, "chunks"), exist_ok=True)
+
+    with open(get_source_path(job_id), "wb") as f:
+        f.write(file_bytes)
+    _write_json(
+        os.path.join(job_dir, "job.json"),
+        {
+            "job_id": job_id,
+            "pool_id": pool_id,
+            "pool_name": pool_name,
+            "source_filename": source_filename,
+            "status": "pending",
+            "created_at": _now(),
+            "updated_at": _now(),
+            "attempts": 0,
+            "pid": None,
+            "pid_started_at": None,
+            "total_pages": None,
+            "chunk_size": None,
+            "error_message": None,
+        },
+    )
+    logger.info(f"Created OCR job {job_id} for {source_filename}")
+    return job_id
+
+
+def load_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Job record, or None if the job does not exist"""
+    try:
+        with open(os.path.join(_job_dir(job_id), "job.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Error reading OCR job {job_id}: {e}")
+        return None
+
+
+def update_job(job_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+    """Update fields of a job record"""
+    with _job_lock:
+        job = load_job(job_id)
+        if job is None:
+            return None
+        job.update(fields)
+        job["updated_at"] = _now()
+        _write_json(os.path.join(_job_dir(job_id), "job.json"), job)
+        return job
+
+
+def get_source_path(job_id: str) -> str:
+    """Path of the job's PDF"""
+    return os.path.join(_job_dir(job_id), "source.pdf")
+
+
+def save_page(job_id: str, page_index: int, text: str):
+    """Checkpoint the OCR text of one page"""
+    path = os.path.join(_job_dir(job_id), "pages", f"{page_index}.txt")
+    temp_file = f"{path}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_file, path)
+
+
+def get_saved_pages(job_id: str) -> Dict[int, str]:
+    """OCR text of every checkpointed page"""
+    pages_dir = os.path.join(_job_dir(job_id), "pages")
+    pages: Dict[int, str] = {}
+    if not os.path.isdir(pages_dir):
+        return pages
+    for filename in os.listdir(pages_dir):
+        if not filename.endswith(".txt"):
+            continue
+        try:
+            with open(os.path.join(pages_dir, filename), "r", encoding="utf-8") as f:
+                pages[int(filename[:-4])] = f.read()
+        except (ValueError, OSError) as e:
+            logger.warning(f"Ignoring unreadable page checkpoint {filename}: {e}")
+    return pages
+
+
+def _chunk_path(job_id: str, chunk_index: int) -> str:
+    return os.path.join(_job_dir(job_id), "chunks", f"{chunk_index}.json")
+
+
+def save_chunk(job_id: str, chunk_index: int, chunk_text: str, questions: List[Dict[str, Any]]):
+    """Checkpoint the extraction result of one chunk"""
+    _write_json(
+        _chunk_path(job_id, chunk_index),
+        {
+            "chunk_hash": hashlib.sha256(chunk_text.encode("utf-8")).hexdigest(),
+            "questions": questions,
+        },
+    )
+
+
+def get_saved_chunk(
+    job_id: str, chunk_index: int, chunk_text: str
+) -> Optional[List[Dict[str, Any]]]:
+    """Checkpointed questions of a chunk (None if missing or the chunk text differs)"""
+    try:
+        with open(_chunk_path(job_id, chunk_index), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable chunk checkpoint {chunk_index}: {e}")
+        return None
+    if entry.get("chunk_hash") != hashlib.sha256(chunk_text.encode("utf-8")).hexdigest():
+        return None
+    return entry.get("questions")
+
+
+def question_key(question: Dict[str, Any]) -> str:
+    """Identity of an extracted question (before healing) for insert bookkeeping"""
+    payload = json.dumps(
+        [question.get("question"), question.get("choices")], ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def mark_inserted(job_id: str, keys: List[str]):
+    """Record questions that are now in the pool (so a resumed job does not insert them twice)"""
+    with _job_lock:
+        with open(os.path.join(_job_dir(job_id), "inserted.txt"), "a", encoding="utf-8") as f:
+            f.write("".join(f"{key}\n" for key in keys))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def get_inserted_keys(job_id: str) -> Set[str]:
+    """Keys of questions already inserted by this job"""
+    try:
+        with open(os.path.join(_job_dir(job_id), "inserted.txt"), "r", encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def finish_job(job_id: str, status: str, error_message: Optional[str] = None):
+    """
+    Mark a job completed or failed. Completed jobs drop their checkpoints and PDF
+    (job.json is kept so the same upload is recognised); failed jobs keep everything
+    for a resume.
+    """
+    update_job(job_id, status=status, pid=None, pid_started_at=None, error_message=error_message)
+    if status == "completed":
+        job_dir = _job_dir(job_id)
+        for name in ("pages", "chunks"):
+            shutil.rmtree(os.path.join(job_dir, name), ignore_errors=True)
+        for name in ("source.pdf", "inserted.txt"):
+            try:
+                os.remove(os.path.join(job_dir, name))
+            except OSError:
+                pass
+
+
+def process_started_at(pid: int) -> Optional[float]:
+    """Creation time of a process (tells a reused pid apart), None if it is gone"""
+    try:
+        return psutil.Process(pid).create_time()
+    except psutil.Error:
+        return None
+
+
+def _pid_alive(pid: Optional[int], started_at: Optional[float] = None) -> bool:
+    # psutil instead of os.kill(pid, 0) - on Windows signal 0 is CTRL_C_EVENT
+    if not pid or not psutil.pid_exists(pid):
+        return False
+    if started_at is None:
+        return True
+    created = process_started_at(pid)
+    # A different creation time means the pid now belongs to another process
+    return created is not None and abs(created - started_at) < 1.0
+
+
+def is_job_running(job: Dict[str, Any]) -> bool:
+    """Whether the job's worker process is still alive"""
+    return job.get("status") == "running" and _pid_alive(job.get("pid"), job.get("pid_started_at"))
+
+
+def list_resumable_jobs() -> List[Dict[str, Any]]:
+    """Jobs that failed or whose worker died part way (their checkpoints are kept)"""
+    root = _get_jobs_root()
+    if not os.path.isdir(root):
+        return []
+    jobs = []
+    for job_id in sorted(os.listdir(root)):
+        job = load_job(job_id)
+        if not job or job.get("status") == "completed" or is_job_running(job):
+            continue
+        if not os.path.exists(get_source_path(job_id)):
+            continue
+        job["pages_done"] = len(get_saved_pages(job_id))
+        jobs.append(job)
+    return jobs
+
+
+def launch_job(job_id: str) -> subprocess.Popen:
+    """Start (or resume) a job in a detached background_ocr_processor process"""
+    script_path = os.path.join(os.getcwd(), "background_ocr_processor.py")
+    log_file_path = os.path.join(os.getcwd(), "background_ocr_processor.log")
+    with open(log_file_path, "a") as log_file:
+        process = subprocess.Popen(
+            [sys.executable, script_path, "--job", job_id],
+            stdout=log_file,
+            stderr=subprocess.STDOUT,  # Merge stderr into stdout
+            start_new_session=True,
+        )
+    update_job(
+        job_id,
+        status="running",
+        pid=process.pid,
+        pid_started_at=process_started_at(process.pid),
+    )
+    return process
@@ -8,12 +8,15 @@ import hashlib
 import json
 import logging
 import re
+import time
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
 
 import config
+import verdict_cache
 from models import DifficultyLevel, Question
 
 logger = logging.getLogger(__name__)
@@ -24,6 +27,19 @@ _generation_cache = {}
 _cache_expiry = {}
 CACHE_DURATION_HOURS = 24
 
+DEFAULT_SYSTEM_PROMPT = (
+    "You are an expert educational content creator and exam specialist. "
+    "Provide clear, accurate, and helpful responses."
+)
+
+# Per-model health tracking shared by all manager instances (used for request hedging)
+LATENCY_SAMPLE_SIZE = 50
+UNHEALTHY_FAILURE_THRESHOLD = 3
+HEDGE_RATE_WINDOW = 100
+_model_latencies: Dict[str, deque] = {}
+_model_failures: Dict[str, int] = {}
+_hedge_windows: Dict[str, deque] = {}
+
 
 class OpenRouterManager:
     """Enhanced manager for OpenRouter API interactions with advanced AI features"""
@@ -32,8 +48,10 @@ class OpenRouterManager:
         self.api_key = config.OPENROUTER_API_KEY
         self.base_url = "https://openrouter.ai/api/v1"
 
-        # Load model cascade from models_config.json
+        # Load model cascade and hedging policy from models_config.json
         self.models = self._load_model_cascade()
+        self.hedging = self._load_hedging_config()
+        self.routes = self._load_task_routes()
         self.model = self.models[0] if self.models else "openai/gpt-4o-mini"
         self.fallback_model = self.models[1] if len(self.models) > 1 else "openai/gpt-4o-mini"
         self.budget_model = self.models[-1] if self.models else "openai/gpt-4o-mini"
@@ -51,18 +69,22 @@ class OpenRouterManager:
         self.max_retries = len(self.models)  # Try all models in cascade
         self.batch_size = 5  # For bulk operations
 
+    def _read_models_config(self) -> Dict[str, Any]:
+        """Read models_config.json (raises on missing/invalid file)"""
+        with open("models_config.json", "r") as f:
+            return json.load(f)
+
     def _load_model_cascade(self) -> List[str]:
         """Load model priority list from models_config.json"""
         try:
-            with open("models_config.json", "r") as f:
-                config_data = json.load(f)
-                models = config_data.get("models", [])
-                if models:
-                    logger.info(f"Loaded {len(models)} models from models_config.json")
-                    return models
-                else:
-                    logger.warning("No models found in models_config.json, using defaults")
-                    return ["openai/gpt-4o-mini"]
+            config_data = self._read_models_config()
+            models = config_data.get("models", [])
+            if models:
+                logger.info(f"Loaded {len(models)} models from models_config.json")
+                return models
+            else:
+                logger.warning("No models found in models_config.json, using defaults")
+                return ["openai/gpt-4o-mini"]
         except FileNotFoundError:
             logger.warning("models_config.json not found, using default model")
             return ["openai/gpt-4o-mini"]
@@ -70,6 +92,64 @@ class OpenRouterManager:
             logger.error(f"Error loading models_config.json: {e}")
             return ["openai/gpt-4o-mini"]
 
+    def _load_hedging_config(self) -> Dict[str, Any]:
+        """
+        Load request hedging policy from models_config.json.
+
+        Hedging is opt-in per feature; a missing or invalid "hedging" section disables it.
+        """
+        try:
+            hedging = self._read_models_config().get("hedging", {})
+            return hedging if isinstance(hedging, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Error loading hedging config from models_config.json: {e}")
+            return {}
+
+    def _load_task_routes(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Load the task routing table from models_config.json.
+
+        Each route maps a task class (e.g. "micro_classification") to its own model
+        cascade, max_tokens ceiling and system prompt. Unknown tasks use the default cascade.
+        """
+        try:
+            routes = self._read_models_config().get("routes", {})
+            if not isinstance(routes, dict):
+                return {}
+            logger.info(f"Loaded task routes: {', '.join(routes) or 'none'}")
+            return routes
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Error loading task routes from models_config.json: {e}")
+            return {}
+
+    def _get_route(self, task: Optional[str]) -> Dict[str, Any]:
+        """Get the routing entry for a task class (empty dict = default cascade)"""
+        if not task:
+            return {}
+        route = self.routes.get(task)
+        if not isinstance(route, dict):
+            logger.warning(f"No route configured for task '{task}', using default cascade")
+            return {}
+        return route
+
+    def _get_route_models(self, task: Optional[str]) -> List[str]:
+        """Model cascade for a task class"""
+        return self._get_route(task).get("models") or self.models
+
+    def _apply_route_limits(self, task: Optional[str], max_tokens: int) -> int:
+        """Cap max_tokens at the task route's ceiling"""
+        route_max = self._get_route(task).get("max_tokens")
+        return min(max_tokens, int(route_max)) if route_max else max_tokens
+
+    def _get_model_family(self, task: Optional[str] = None) -> str:
+        """Family of the model that answers first for a task (part of verdict cache keys)"""
+        models = self._get_route_models(task)
+        return verdict_cache.get_model_family(models[0] if models else self.model)
+
     async def generate_explanation(
         self,
         question: str,
@@ -96,7 +176,9 @@ class OpenRouterManager:
                 question, choices, correct_index, scenario, explanation_seed
             )
 
-            explanation = await self._generate_text_with_retry(prompt)
+            explanation = await self._generate_text_hedged(
+                prompt, "generate_explanation", task="short_generation"
+            )
 
             # Cache the result
             self._cache_explanation(cache_key, explanation)
@@ -176,7 +258,9 @@ class OpenRouterManager:
                 topic, difficulty, num_questions, include_scenarios
             )
 
-            response = await self._generate_text_with_retry(prompt, max_tokens=4000)
+            response = await self._generate_text_with_retry(
+                prompt, max_tokens=4000, task="long_extraction"
+            )
             questions = self._parse_mock_questions(response)
 
             # Validate questions
@@ -350,6 +434,21 @@ class OpenRouterManager:
                 - suggested_correct_answer: AI's suggested correct answer index (if different)
                 - answer_changed: Boolean indicating if answer was corrected
         """
+        # Unchanged questions return the persisted verdict without any LLM calls
+        cache_key = verdict_cache.make_verdict_key(
+            question_text,
+            choices,
+            correct_answer,
+            self._get_model_family(),
+            validate_answer=validate_answer,
+            scenario=scenario,
+            explanation=explanation or "",
+        )
+        cached = verdict_cache.get_verdict("fix_question_errors", question_text, cache_key)
+        if cached is not None:
+            logger.info("Using cached AI fix verdict (question unchanged)")
+            return cached
+
         try:
             # Step 0: Pre-detect common typos (don't modify originals yet!)
             typo_fixes = self._detect_and_fix_typos(question_text, choices)
@@ -359,6 +458,8 @@ class OpenRouterManager:
             response = await self._generate_text_with_retry(
                 prompt, max_tokens=3000, temperature=0.3  # Low temperature for conservative fixes
             )
+            # Don't persist verdicts built from a failed AI call
+            cacheable = not response.startswith("Error:")
 
             # Parse the AI response (using ORIGINAL text)
             fix_result = self._parse_fix_errors_response(response, question_text, choices)
@@ -522,6 +623,16 @@ class OpenRouterManager:
                         "Existing explanation retained (it was correct; stored answer index was wrong)"
                     )
 
+            answer_validation = fix_result.get("answer_validation") or {}
+            if answer_validation.get("validation_stage") == "error":
+                cacheable = False
+            if fix_result.get("answer_changed") and fix_result.get("new_explanation") is None:
+                cacheable = False  # explanation regeneration failed, retry next time
+            if cacheable:
+                verdict_cache.store_verdict(
+                    "fix_question_errors", question_text, cache_key, fix_result
+                )
+
             return fix_result
 
         except Exception as e:
@@ -795,6 +906,18 @@ class OpenRouterManager:
                 - confidence: 0.0-1.0 confidence in the assessment
                 - reasoning: Brief explanation
         """
+        cache_key = verdict_cache.make_verdict_key(
+            question_text,
+            None,
+            None,
+            self._get_model_family("micro_classification"),
+            claimed_answer=claimed_answer,
+            scenario=scenario,
+        )
+        cached = verdict_cache.get_verdict("quick_validate_answer", question_text, cache_key)
+        if cached is not None:
+            return cached
+
         try:
             prompt = f"""You are an expert in finance, banking, and regulatory exams (CACS, CMFAS, MAS regulations).
 
@@ -817,7 +940,13 @@ Respond in JSON ONLY:
 
 Be quick but thorough."""
 
-            response = await self._generate_text_with_retry(prompt, max_tokens=300, temperature=0.3)
+            response = await self._generate_text_hedged(
+                prompt,
+                "quick_validate_answer",
+                max_tokens=300,
+                temperature=0.3,
+                task="micro_classification",
+            )
 
             # Parse response
             import json
@@ -827,11 +956,15 @@ Be quick but thorough."""
 
             if json_start >= 0 and json_end > json_start:
                 result = json.loads(response[json_start:json_end])
-                return {
+                verdict = {
                     "is_plausible": result.get("is_plausible", True),
                     "confidence": float(result.get("confidence", 0.5)),
                     "reasoning": result.get("reasoning", ""),
                 }
+                verdict_cache.store_verdict(
+                    "quick_validate_answer", question_text, cache_key, verdict
+                )
+                return verdict
 
         except Exception as e:
             logger.error(f"Error in quick validation: {e}")
@@ -877,7 +1010,9 @@ Reply with JSON only:
   "reasoning": "<one sentence>"
 }}"""
 
-            response = await self._generate_text_with_retry(prompt, max_tokens=200, temperature=0.1)
+            response = await self._generate_text_with_retry(
+                prompt, max_tokens=200, temperature=0.1, task="micro_classification"
+            )
             logger.info(f"Explanation consistency raw response: {response[:300]}")
 
             json_start = response.find("{")
@@ -939,6 +1074,19 @@ Reply with JSON only:
                 - should_auto_correct: True if confidence >= 0.90 and answer is wrong
                 - validation_stage: 'quick' or 'full'
         """
+        cache_key = verdict_cache.make_verdict_key(
+            question_text,
+            choices,
+            claimed_correct_index,
+            self._get_model_family("short_generation"),
+            scenario=scenario,
+            use_two_stage=use_two_stage,
+        )
+        cached = verdict_cache.get_verdict("validate_answer_correctness", question_text, cache_key)
+        if cached is not None:
+            logger.info("Using cached answer validation verdict (question unchanged)")
+            return cached
+
         try:
             # Stage 1: Quick validation (cheaper)
             if use_two_stage:
@@ -952,7 +1100,7 @@ Reply with JSON only:
                     logger.info(
                         f"Quick validation passed (confidence: {quick_result['confidence']:.2f}) - skipping full analysis"
                     )
-                    return {
+                    validation_result = {
                         "is_valid": True,
                         "confidence": quick_result["confidence"],
                         "ai_suggested_index": claimed_correct_index,
@@ -961,6 +1109,10 @@ Reply with JSON only:
                         "should_auto_correct": False,
                         "validation_stage": "quick",
                     }
+                    verdict_cache.store_verdict(
+                        "validate_answer_correctness", question_text, cache_key, validation_result
+                    )
+                    return validation_result
 
                 logger.info(
                     f"Quick validation uncertain (confidence: {quick_result['confidence']:.2f}) - proceeding to full analysis"
@@ -971,7 +1123,7 @@ Reply with JSON only:
                 question_text, choices, claimed_correct_index, scenario
             )
             response = await self._generate_text_with_retry(
-                prompt, max_tokens=1000, temperature=0.3
+                prompt, max_tokens=1000, temperature=0.3, task="short_generation"
             )
 
             # Parse the AI response
@@ -980,6 +1132,12 @@ Reply with JSON only:
             )
             validation_result["validation_stage"] = "full"
 
+            # Fallback results (AI error / unparseable response) carry zero confidence
+            if not response.startswith("Error:") and validation_result["confidence"] > 0.0:
+                verdict_cache.store_verdict(
+                    "validate_answer_correctness", question_text, cache_key, validation_result
+                )
+
             return validation_result
 
         except Exception as e:
@@ -1037,24 +1195,29 @@ Reply with JSON only:
             }
 
     async def _generate_text(
-        self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7
+        self,
+        prompt: str,
+        max_tokens: int = 2000,
+        temperature: float = 0.7,
+        model: Optional[str] = None,
+        system_prompt: Optional[str] = None,
     ) -> str:
         """Generate text using OpenRouter API with enhanced error handling"""
         if not self.api_key:
             raise ValueError("OpenRouter API key not configured")
 
+        current_model = model or self.model
+        started_at = time.monotonic()
+
         try:
             async with httpx.AsyncClient(timeout=60.0) as client:
                 response = await client.post(
                     f"{self.base_url}/chat/completions",
                     headers=self.headers,
                     json={
-                        "model": self.model,
+                        "model": current_model,
                         "messages": [
-                            {
-                                "role": "system",
-                                "content": "You are an expert educational content creator and exam specialist. Provide clear, accurate, and helpful responses.",
-                            },
+                            {"role": "system", "content": system_prompt or DEFAULT_SYSTEM_PROMPT},
                             {"role": "user", "content": prompt},
                         ],
                         "max_tokens": max_tokens,
@@ -1067,25 +1230,41 @@ Reply with JSON only:
 
                 if response.status_code == 200:
                     data = response.json()
+                    self._record_model_success(current_model, time.monotonic() - started_at)
                     return data["choices"][0]["message"]["content"].strip()
                 else:
                     logger.error(f"OpenRouter API error: {response.status_code} - {response.text}")
+                    self._record_model_failure(current_model)
                     return "Error: Unable to generate content at this time."
 
         except httpx.TimeoutException:
             logger.error("OpenRouter API timeout")
+            self._record_model_failure(current_model)
             return "Error: Request timed out. Please try again."
         except Exception as e:
             logger.error(f"Error calling OpenRouter API: {e}")
+            self._record_model_failure(current_model)
             return "Error: Unable to connect to AI service."
 
     async def _generate_text_with_retry(
-        self, prompt: str, max_tokens: int = 2000, temperature: float = 0.7, model: str = None
+        self,
+        prompt: str,
+        max_tokens: int = 2000,
+        temperature: float = 0.7,
+        model: str = None,
+        task: Optional[str] = None,
     ) -> str:
-        """Generate text with model cascade fallback - tries free models first, paid as backup"""
+        """
+        Generate text with model cascade fallback - tries free models first, paid as backup.
 
-        # Use specified model or cascade through all models
-        models_to_try = [model] if model else self.models
+        If a task class is given, its route from models_config.json picks the cascade,
+        caps max_tokens and supplies a lighter system prompt.
+        """
+
+        # Use specified model or cascade through the task's models
+        models_to_try = [model] if model else self._get_route_models(task)
+        max_tokens = self._apply_route_limits(task, max_tokens)
+        system_prompt = self._get_route(task).get("system_prompt")
 
         for model_index, current_model in enumerate(models_to_try):
             try:
@@ -1093,25 +1272,21 @@ Reply with JSON only:
                 if model_index > 0:
                     await asyncio.sleep(self.rate_limit_delay * model_index)
 
-                # Temporarily set the model
-                old_model = self.model
-                self.model = current_model
-
-                try:
-                    logger.info(
-                        f"Trying model {model_index + 1}/{len(models_to_try)}: {current_model}"
-                    )
-                    result = await self._generate_text(prompt, max_tokens, temperature)
-
-                    # Check if result indicates an error
-                    if not result.startswith("Error:"):
-                        logger.info(f"✅ Success with model: {current_model}")
-                        return result
-                    else:
-                        logger.warning(f"❌ Model {current_model} returned error: {result}")
+                logger.info(f"Trying model {model_index + 1}/{len(models_to_try)}: {current_model}")
+                result = await self._generate_text(
+                    prompt,
+                    max_tokens,
+                    temperature,
+                    model=current_model,
+                    system_prompt=system_prompt,
+                )
 
-                finally:
-                    self.model = old_model
+                # Check if result indicates an error
+                if not result.startswith("Error:"):
+                    logger.info(f"✅ Success with model: {current_model}")
+                    return result
+                else:
+                    logger.warning(f"❌ Model {current_model} returned error: {result}")
 
             except Exception as e:
                 logger.error(f"❌ Model {current_model} failed with exception: {e}")
@@ -1125,6 +1300,133 @@ Reply with JSON only:
 
         return "Error: Unable to generate content after trying all models in cascade."
 
+    async def _generate_text_hedged(
+        self,
+        prompt: str,
+        feature: str,
+        max_tokens: int = 2000,
+        temperature: float = 0.7,
+        task: Optional[str] = None,
+    ) -> str:
+        """
+        Generate text with request hedging for latency-critical features.
+
+        The prompt goes to the first healthy model in the cascade. If it has not answered
+        within its observed p90 latency, the same prompt is fired at the next healthy model
+        and whichever succeeds first wins; the other request is cancelled. Hedges are capped
+        per feature by "max_hedge_rate" so extra spend stays bounded. Features without an
+        enabled policy (or with fewer than two healthy models) use the normal cascade.
+        """
+        policy = self._get_hedge_policy(feature)
+        healthy_models = self._get_healthy_models(task)
+
+        if not policy or len(healthy_models) < 2:
+            return await self._generate_text_with_retry(prompt, max_tokens, temperature, task=task)
+
+        max_tokens = self._apply_route_limits(task, max_tokens)
+        system_prompt = self._get_route(task).get("system_prompt")
+
+        primary_model, backup_model = healthy_models[0], healthy_models[1]
+        hedge_window = _hedge_windows.setdefault(feature, deque(maxlen=HEDGE_RATE_WINDOW))
+
+        primary_task = asyncio.create_task(
+            self._generate_text(
+                prompt, max_tokens, temperature, model=primary_model, system_prompt=system_prompt
+            )
+        )
+        hedge_delay = self._get_hedge_delay(primary_model)
+        done, _ = await asyncio.wait({primary_task}, timeout=hedge_delay)
+
+        if done or not self._hedge_allowed(hedge_window, policy):
+            hedge_window.append(False)
+            result = await self._await_generation(primary_task)
+            if result is not None:
+                return result
+            return await self._generate_text_with_retry(prompt, max_tokens, temperature, task=task)
+
+        hedge_window.append(True)
+        logger.info(
+            f"Hedging '{feature}': {primary_model} exceeded {hedge_delay:.1f}s, "
+            f"also trying {backup_model}"
+        )
+        hedge_task = asyncio.create_task(
+            self._generate_text(
+                prompt, max_tokens, temperature, model=backup_model, system_prompt=system_prompt
+            )
+        )
+
+        pending = {primary_task, hedge_task}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = await self._await_generation(task)
+                    if result is not None:
+                        winner = primary_model if task is primary_task else backup_model
+                        logger.info(f"✅ Hedged request for '{feature}' won by {winner}")
+                        return result
+        finally:
+            for task in pending:
+                task.cancel()
+
+        # Both hedged attempts failed - fall back to the full cascade
+        return await self._generate_text_with_retry(prompt, max_tokens, temperature, task=task)
+
+    async def _await_generation(self, task: "asyncio.Task") -> Optional[str]:
+        """Return a generation task's text, or None if it failed or returned an error marker"""
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Generation task failed: {e}")
+            return None
+        return None if result.startswith("Error:") else result
+
+    def _get_hedge_policy(self, feature: str) -> Optional[Dict[str, Any]]:
+        """Get the enabled hedging policy for a feature, or None"""
+        policy = self.hedging.get("features", {}).get(feature)
+        if isinstance(policy, dict) and policy.get("enabled", False):
+            return policy
+        return None
+
+    def _get_healthy_models(self, task: Optional[str] = None) -> List[str]:
+        """Cascade models (for the task's route) that have not failed repeatedly in a row"""
+        return [
+            m
+            for m in self._get_route_models(task)
+            if _model_failures.get(m, 0) < UNHEALTHY_FAILURE_THRESHOLD
+        ]
+
+    def _get_hedge_delay(self, model: str) -> float:
+        """Observed p90 latency of a model, or the configured default until enough samples exist"""
+        default_delay = float(self.hedging.get("default_delay_seconds", 5.0))
+        min_samples = int(self.hedging.get("min_latency_samples", 5))
+
+        samples = _model_latencies.get(model)
+        if not samples or len(samples) < min_samples:
+            return default_delay
+
+        ordered = sorted(samples)
+        return ordered[int(0.9 * (len(ordered) - 1))]
+
+    def _hedge_allowed(self, hedge_window: deque, policy: Dict[str, Any]) -> bool:
+        """Check the feature's recent hedge rate against its cap"""
+        max_rate = float(policy.get("max_hedge_rate", 0.1))
+        if max_rate <= 0:
+            return False
+        recent_requests = len(hedge_window) + 1
+        return sum(hedge_window) < max(1, int(max_rate * recent_requests))
+
+    def _record_model_success(self, model: str, latency: float):
+        """Record a successful call's latency and reset the model's failure streak"""
+        _model_latencies.setdefault(model, deque(maxlen=LATENCY_SAMPLE_SIZE)).append(latency)
+        _model_failures[model] = 0
+
+    def _record_model_failure(self, model: str):
+        """Count a consecutive failure against a model's health"""
+        _model_failures[model] = _model_failures.get(model, 0) + 1
+
     def _create_cache_key(
         self,
         question: str,
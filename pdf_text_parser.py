@@ -0,0 +1,258 @@
+"""
+Structured Question Parser for Extracted PDF Text
+Deterministic fast path for text PDFs laid out as "1. question / A. choice / Answer: X".
+Each question gets a confidence score; only low-confidence regions are sent to the AI.
+
+Question blocks and their numbering come from document_chunking (shared with the chunker).
+The line patterns are its own: the inline ones in DocumentParser._parse_word_structured and
+ingest._parse_text_block only know "A." labels (ingest: exactly four, A-D, with answers
+searched anywhere in a line), while scoring confidence needs "(A)"/"A)" labels, lettered
+sub-items, combination choices and anchored answer lines.
+"""
+
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from document_chunking import QUESTION_NUMBER_PREFIX_PATTERN, parse_document_blocks
+
+logger = logging.getLogger(__name__)
+
+# Questions at or above this confidence are accepted without an AI call
+STRUCTURED_CONFIDENCE_THRESHOLD = 0.85
+
+# "A. text", "(B) text", "C) text"
+CHOICE_PATTERN = re.compile(r"^\s*\(?([A-H])[\.\)]\s+(.+)$")
+# Lettered sub-items that belong to the question stem: "a. Speed of execution", "(b) Price"
+SUB_ITEM_PATTERN = re.compile(r"^\s*\(?([a-h]|i{1,3}|iv|v)[\.\)]\s+(.+)$")
+# Unlabelled combination choices that refer to the sub-items: "(a), (c) and (d)", "All of the above"
+COMBINATION_CHOICE_PATTERN = re.compile(
+    r"^\s*(?:\(?(?:[a-h]|i{1,3}|iv|v)\)?(?:\s*(?:,|and|&|or)\s*\(?(?:[a-h]|i{1,3}|iv|v)\)?)+"
+    r"|(?:all|none|both|neither)\s+of\s+the\s+(?:above|options))\s*\.?\s*(?:\[CORRECT\])?\s*$",
+    re.IGNORECASE,
+)
+# "Answer: B", "Ans (c)", "Correct answer - D"; a bare "Correct" needs a separator or
+# parentheses ("Correct: B", "Correct (b)") so lines like "Correct a mistake..." stay text
+ANSWER_LINE_PATTERN = re.compile(
+    r"^\s*(?:(?:Answer|Ans|Correct\s+Answer)\s*[:\.\-]?\s*\(?|Correct\s*(?:[:\.\-]\s*\(?|\())"
+    r"([A-Ha-h])\)?(?![A-Za-z])",
+    re.IGNORECASE,
+)
+EXPLANATION_LINE_PATTERN = re.compile(
+    r"^\s*(?:Explanation|Rationale)\s*[:\.\-]?\s*(.*)$", re.IGNORECASE
+)
+# Choice text marked correct inline: "Paris *", "Paris [CORRECT]", "Paris (correct)"
+CORRECT_MARKER_PATTERN = re.compile(r"\s*(?:\*|\[CORRECT\]|\(correct\))\s*$", re.IGNORECASE)
+# OCR letter-spacing ("p e r s h a r e") - text layer is not clean enough to trust
+LETTER_SPACING_PATTERN = re.compile(r"(?:\b\w\s){5,}")
+# Lines that look like choices in a non-question block (unnumbered questions)
+CHOICE_LIKE_LINE_PATTERN = re.compile(r"^\s*\(?[A-Da-d][\.\)]\s+\S", re.MULTILINE)
+
+
+def _parse_question_block(
+    lines: List[str], answer_letter: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Parse one numbered question block.
+
+    Returns:
+        {'question', 'choices', 'correct_index', 'explanation_seed', 'confidence'} or None
+    """
+    stem_lines: List[str] = []
+    choices: List[str] = []
+    sub_items: List[str] = []
+    combinations: List[str] = []
+    explanation_lines: List[str] = []
+    marked_correct: Optional[int] = None
+    in_explanation = False
+
+    for raw_line in lines:
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        if in_explanation:
+            explanation_lines.append(line)
+            continue
+
+        answer_match = ANSWER_LINE_PATTERN.match(line)
+        if answer_match:
+            answer_letter = answer_match.group(1).upper()
+            continue
+
+        explanation_match = EXPLANATION_LINE_PATTERN.match(line)
+        if explanation_match:
+            in_explanation = True
+            if explanation_match.group(1):
+                explanation_lines.append(explanation_match.group(1))
+            continue
+
+        choice_match = CHOICE_PATTERN.match(line)
+        expected_letter = chr(ord("A") + len(choices))
+        if choice_match and choice_match.group(1) == expected_letter:
+            text = choice_match.group(2).strip()
+            if CORRECT_MARKER_PATTERN.search(text):
+                marked_correct = len(choices)
+                text = CORRECT_MARKER_PATTERN.sub("", text)
+            choices.append(text)
+            continue
+
+        if not choices and COMBINATION_CHOICE_PATTERN.match(line) and sub_items:
+            text = line
+            if CORRECT_MARKER_PATTERN.search(text):
+                marked_correct = len(combinations)
+                text = CORRECT_MARKER_PATTERN.sub("", text)
+            combinations.append(text.strip())
+            continue
+
+        if not choices and not combinations and SUB_ITEM_PATTERN.match(line):
+            sub_items.append(line)
+            continue
+
+        if choices:
+            # Wrapped choice text continues on the next line
+            choices[-1] = f"{choices[-1]} {line}"
+        elif combinations:
+            combinations[-1] = f"{combinations[-1]} {line}"
+        elif sub_items:
+            sub_items[-1] = f"{sub_items[-1]} {line}"
+        else:
+            stem_lines.append(line)
+
+    if not stem_lines:
+        return None
+    stem_lines[0] = QUESTION_NUMBER_PREFIX_PATTERN.sub("", stem_lines[0])
+    question_text = " ".join(stem_lines).strip()
+
+    if not choices and combinations:
+        # Lettered sub-items are part of the question; the combinations are the choices
+        question_text = question_text + "\n\n" + "\n".join(sub_items)
+        choices = combinations
+    elif not choices and sub_items:
+        # Lower-case lettered choices with nothing after them
+        choices = [SUB_ITEM_PATTERN.match(item).group(2).strip() for item in sub_items]
+        sub_items = []
+    elif sub_items:
+        question_text = question_text + "\n\n" + "\n".join(sub_items)
+
+    correct_index = marked_correct
+    if answer_letter:
+        index = ord(answer_letter.upper()) - ord("A")
+        if 0 <= index < len(choices):
+            correct_index = index
+
+    confidence = _score_question(question_text, choices, correct_index, sub_items, combinations)
+    return {
+        "question": question_text,
+        "choices": choices,
+        "correct_index": correct_index,
+        "correct_answer": correct_index,
+        "explanation_seed": " ".join(explanation_lines) or None,
+        "confidence": confidence,
+    }
+
+
+def _score_question(
+    question_text: str,
+    choices: List[str],
+    correct_index: Optional[int],
+    sub_items: List[str],
+    combinations: List[str],
+) -> float:
+    """Confidence (0.0-1.0) that the deterministic parse matches what the AI would extract"""
+    if not question_text or len(choices) < 2:
+        return 0.0
+
+    confidence = 0.4
+    if len(choices) == 4:
+        confidence += 0.2
+    elif len(choices) in (3, 5):
+        confidence += 0.1
+    if correct_index is not None:
+        confidence += 0.25
+    if len(question_text) > 15:
+        confidence += 0.05
+
+    all_text = " ".join([question_text] + choices)
+    if not LETTER_SPACING_PATTERN.search(all_text):
+        confidence += 0.1
+
+    if len(set(c.lower() for c in choices)) != len(choices):
+        confidence -= 0.3
+    if len(choices) > 6 or any(len(c) > 400 or not c.strip() for c in choices):
+        confidence -= 0.3
+    if sub_items and not combinations and len(sub_items) < 2:
+        confidence -= 0.1
+
+    return round(max(0.0, min(1.0, confidence)), 2)
+
+
+def parse_structured_text(
+    text: str, threshold: float = STRUCTURED_CONFIDENCE_THRESHOLD
+) -> Dict[str, Any]:
+    """
+    Deterministically parse extracted PDF text.
+
+    Returns:
+        {
+            'questions': accepted questions (confidence >= threshold), each with
+                         'position' (document order) and 'confidence',
+            'regions': list of {'position', 'text'} that need AI extraction,
+            'stats': {'accepted', 'low_confidence', 'regions'}
+        }
+    """
+    parsed = parse_document_blocks(text)
+    blocks = parsed["blocks"]
+    answer_key = parsed["answer_key"]
+
+    questions: List[Dict[str, Any]] = []
+    regions: List[Dict[str, Any]] = []
+    low_confidence = 0
+
+    def add_region(position: int, region_text: str):
+        # Merge neighbouring low-confidence blocks into one region
+        if regions and regions[-1]["end"] == position - 1:
+            regions[-1]["text"] += region_text
+            regions[-1]["end"] = position
+        else:
+            regions.append({"position": position, "end": position, "text": region_text})
+
+    for position, block in enumerate(blocks):
+        if block["kind"] == "scenario":
+            # Attached to its questions below; unlinked scenarios are just context
+            continue
+
+        if block["kind"] == "text":
+            # Preamble/headers are skipped unless they look like unnumbered questions
+            if len(CHOICE_LIKE_LINE_PATTERN.findall(block["text"])) >= 2:
+                add_region(position, block["text"])
+            continue
+
+        scenario_text = None
+        if block.get("scenario") is not None:
+            scenario_text = blocks[block["scenario"]]["text"].strip() or None
+
+        result = _parse_question_block(block["lines"], answer_key.get(block["number"]))
+        if result and result["confidence"] >= threshold:
+            result["scenario"] = scenario_text
+            result["position"] = position
+            questions.append(result)
+        else:
+            low_confidence += 1
+            region_text = block["text"]
+            if scenario_text:
+                region_text = scenario_text + "\n" + region_text
+            if block["number"] in answer_key:
+                region_text += f"Answer: {answer_key[block['number']]}\n"
+            add_region(position, region_text)
+
+    stats = {"accepted": len(questions), "low_confidence": low_confidence, "regions": len(regions)}
+    logger.info(
+        f"Structured parse: {stats['accepted']} questions accepted, "
+        f"{stats['low_confidence']} low-confidence in {stats['regions']} regions for AI"
+    )
+    return {
+        "questions": questions,
+        "regions": [{"position": r["position"], "text": r["text"]} for r in regions],
+        "stats": stats,
+    }
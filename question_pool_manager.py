@@ -4,15 +4,61 @@ Handles question bank storage, AI-powered duplicate detection, and pool manageme
 """
 
 import hashlib
+import json
 import logging
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
+from ai_scheduler import ai_scheduler
 from openrouter_utils import OpenRouterManager
+from similarity_index import (
+    BORDERLINE_SIMILARITY,
+    NEAR_DUPLICATE_SIMILARITY,
+    SimilarityIndex,
+    build_similarity_index,
+    same_numbers,
+)
 
 logger = logging.getLogger(__name__)
 
 
+def calculate_question_hash(question: Dict[str, Any]) -> str:
+    """
+    Normalized content hash of a question (question text + sorted choices)
+    Stored as pool_questions.content_hash, so changing it requires a re-backfill
+    """
+    # Normalize question text (lowercase, strip whitespace)
+    # Handle None values by converting to empty string
+    q_text = (question.get("question") or "").lower().strip()
+
+    # Normalize choices (lowercase, strip whitespace, sort)
+    # Handle None values in choices
+    choices = [(c or "").lower().strip() for c in question.get("choices", [])]
+    choices_str = "|".join(sorted(choices))
+
+    # Create hash from question + choices
+    hash_content = f"{q_text}|{choices_str}"
+    return hashlib.md5(hash_content.encode(), usedforsecurity=False).hexdigest()
+
+
+def stored_question_hash(question_text: Optional[str], choices: Any) -> str:
+    """
+    content_hash of a pool_questions row from its stored question_text and choices
+    (JSON string or list) - recompute it whenever either is updated
+    """
+    if isinstance(choices, str):
+        try:
+            choices = json.loads(choices)
+        except json.JSONDecodeError:
+            choices = [choices]
+    return calculate_question_hash({"question": question_text, "choices": choices or []})
+
+
+def _pair_key(hash_a: str, hash_b: str) -> Tuple[str, str]:
+    """Order-independent key of a question pair (as stored in duplicate_cache)"""
+    return (hash_a, hash_b) if hash_a <= hash_b else (hash_b, hash_a)
+
+
 class QuestionPoolManager:
     """
     Manages question pools with automatic duplicate detection
@@ -23,39 +69,40 @@ class QuestionPoolManager:
     def __init__(self):
         self.ai = OpenRouterManager()
         self.similarity_threshold = 0.95  # 95% similarity = duplicate
+        # Near-duplicate candidates checked per new question (from the local index)
+        self.similarity_top_k = 5
+        # Borderline candidates per new question sent to the AI (all in one prompt)
+        self.max_ai_adjudications = 5
 
     def calculate_question_hash(self, question: Dict[str, Any]) -> str:
         """
         Calculate unique hash for a question based on its content
-        Used for exact duplicate detection
+        Used for exact duplicate detection (stored as pool_questions.content_hash)
         """
-        # Normalize question text (lowercase, strip whitespace)
-        # Handle None values by converting to empty string
-        q_text = (question.get("question") or "").lower().strip()
-
-        # Normalize choices (lowercase, strip whitespace, sort)
-        # Handle None values in choices
-        choices = [(c or "").lower().strip() for c in question.get("choices", [])]
-        choices_str = "|".join(sorted(choices))
-
-        # Create hash from question + choices
-        hash_content = f"{q_text}|{choices_str}"
-        return hashlib.md5(hash_content.encode(), usedforsecurity=False).hexdigest()
+        return calculate_question_hash(question)
 
     def detect_exact_duplicates(
-        self, new_questions: List[Dict[str, Any]], existing_questions: List[Dict[str, Any]]
+        self,
+        new_questions: List[Dict[str, Any]],
+        existing_questions: Optional[List[Dict[str, Any]]] = None,
+        existing_hashes: Optional[Set[str]] = None,
     ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         """
         Detect exact duplicates between new and existing questions
 
+        Args:
+            new_questions: Questions being uploaded
+            existing_questions: Existing pool questions (hashes are computed for each)
+            existing_hashes: Content hashes already in the pool, e.g. from
+                db.get_existing_content_hashes (no need to load the pool)
+
         Returns:
             (unique_questions, duplicate_questions)
         """
-        # Build hash map of existing questions
-        existing_hashes = {}
-        for q in existing_questions:
-            q_hash = self.calculate_question_hash(q)
-            existing_hashes[q_hash] = q
+        # Build hash set of existing questions
+        seen_hashes = set(existing_hashes or ())
+        for q in existing_questions or ():
+            seen_hashes.add(self.calculate_question_hash(q))
 
         unique_questions = []
         duplicate_questions = []
@@ -63,82 +110,217 @@ class QuestionPoolManager:
         for new_q in new_questions:
             new_hash = self.calculate_question_hash(new_q)
 
-            if new_hash in existing_hashes:
+            if new_hash in seen_hashes:
                 # Exact duplicate found
                 duplicate_questions.append(new_q)
             else:
                 # Unique question
                 unique_questions.append(new_q)
-                # Add to existing hashes to check for duplicates within new batch
-                existing_hashes[new_hash] = new_q
+                # Add to seen hashes to check for duplicates within new batch
+                seen_hashes.add(new_hash)
 
         return unique_questions, duplicate_questions
 
+    def build_similarity_index(self, existing_questions: List[Dict[str, Any]]) -> SimilarityIndex:
+        """
+        Local near-duplicate index of a pool (keys are positions in existing_questions).
+        Build once per upload and pass to detect_similar_questions_with_ai.
+        """
+        return build_similarity_index(existing_questions)
+
     async def detect_similar_questions_with_ai(
         self,
         new_question: Dict[str, Any],
         existing_questions: List[Dict[str, Any]],
         threshold: float = 0.90,
+        index: Optional[SimilarityIndex] = None,
     ) -> Tuple[List[Tuple[Dict[str, Any], float]], Optional[str]]:
         """
-        Use AI to detect semantically similar questions
+        Detect semantically similar questions across the whole pool (see
+        detect_similar_questions_batch)
         Returns (list of (question, similarity_score) tuples above threshold, error_message)
         error_message is None on success, or a string describing the error
         """
-        try:
-            similar_questions = []
-
-            # For efficiency, only check against random sample if too many questions
-            # Reduced from 50 to 15 to avoid rate limits (16 req/min limit)
-            sample_size = min(len(existing_questions), 15)
-            import random
+        results, error = await self.detect_similar_questions_batch(
+            [new_question], existing_questions, threshold=threshold, index=index
+        )
+        return results[0] or [], error
 
-            questions_to_check = (
-                random.sample(existing_questions, sample_size)
-                if len(existing_questions) > sample_size
-                else existing_questions
-            )
+    async def detect_similar_questions_batch(
+        self,
+        new_questions: List[Dict[str, Any]],
+        existing_questions: List[Dict[str, Any]],
+        threshold: float = 0.90,
+        index: Optional[SimilarityIndex] = None,
+    ) -> Tuple[List[Optional[List[Tuple[Dict[str, Any], float]]]], Optional[str]]:
+        """
+        Detect semantically similar pool questions for a batch of new questions
+
+        1. Candidates for every new question come from the local MinHash/LSH index;
+           near-exact ones (at least NEAR_DUPLICATE_SIMILARITY and threshold, same numbers)
+           count as duplicates directly, every other candidate is borderline
+        2. Cached AI verdicts for all borderline pairs are read in one bulk lookup
+           (duplicate_cache)
+        3. Only borderline pairs without a cached verdict are sent to the AI - one call per
+           new question rating all of its candidates, run concurrently through the shared
+           AI scheduler
+        4. The new verdicts are saved in one bulk insert
 
-            for existing_q in questions_to_check:
-                similarity, error = await self._calculate_semantic_similarity(
-                    new_question, existing_q
+        Returns:
+            (results, error_message) - results[i] is the list of (question, similarity_score)
+            tuples above threshold for new_questions[i], or None if it could not be fully
+            checked because the AI hit a rate limit (error_message says so)
+        """
+        try:
+            if index is None:
+                index = self.build_similarity_index(existing_questions)
+
+            results: List[Optional[List[Tuple[Dict[str, Any], float]]]] = [
+                [] for _ in new_questions
+            ]
+            existing_hashes: Dict[int, str] = {}
+            borderline = []  # (new index, existing position, ordered hash pair)
+            near_exact = max(NEAR_DUPLICATE_SIMILARITY, threshold)
+
+            for i, new_question in enumerate(new_questions):
+                candidates = index.query(
+                    new_question, top_k=self.similarity_top_k, min_similarity=BORDERLINE_SIMILARITY
+                )
+                new_hash = None
+                for position, overlap in candidates:
+                    if overlap >= near_exact and same_numbers(
+                        new_question, existing_questions[position]
+                    ):
+                        # Same wording apart from trivial edits - no need to ask the AI
+                        results[i].append((existing_questions[position], overlap))
+                        continue
+                    if new_hash is None:
+                        new_hash = calculate_question_hash(new_question)
+                    if position not in existing_hashes:
+                        existing_hashes[position] = calculate_question_hash(
+                            existing_questions[position]
+                        )
+                    borderline.append((i, position, _pair_key(new_hash, existing_hashes[position])))
+
+            cached = await self._get_cached_verdicts([pair for _, _, pair in borderline])
+            if borderline:
+                logger.info(
+                    f"Duplicate check: {len(borderline)} borderline pairs, "
+                    f"{len(cached)} cached verdicts"
                 )
 
-                # If we hit a rate limit or error, propagate it up
+            new_verdicts: Dict[Tuple[str, str], float] = {}
+            # new index -> borderline (existing position, pair) without a cached verdict
+            pending: Dict[int, List[Tuple[int, Tuple[str, str]]]] = {}
+
+            for i, position, pair in borderline:
+                if pair in cached:
+                    if cached[pair] >= threshold:
+                        results[i].append((existing_questions[position], cached[pair]))
+                elif len(pending.setdefault(i, [])) < self.max_ai_adjudications:
+                    pending[i].append((position, pair))
+
+            work = list(pending.items())
+            unchecked = set()
+            rate_limit_error = None
+
+            async def adjudicate(_, item):
+                nonlocal rate_limit_error
+                i, candidates = item
+                # Paced by the shared AI scheduler (process-wide rate limit)
+                async with ai_scheduler.slot():
+                    if rate_limit_error:
+                        # Stop asking the AI after a rate limit; cached verdicts still apply
+                        unchecked.add(i)
+                        return None
+                    scores, error = await self._adjudicate_candidates(
+                        new_questions[i], [existing_questions[p] for p, _ in candidates]
+                    )
                 if error:
                     if "rate limit" in error.lower() or "429" in error:
-                        return [], error
+                        rate_limit_error = error
+                        unchecked.add(i)
+                        return None
                     # For other errors, log but continue
                     logger.warning(f"Error calculating similarity (continuing): {error}")
-                    continue
+                    return None
+                return scores
+
+            # One AI call per new question, run concurrently
+            outcomes = await ai_scheduler.map_ordered(work, adjudicate)
 
-                if similarity >= threshold:
-                    similar_questions.append((existing_q, similarity))
+            for (i, candidates), (scores, _) in zip(work, outcomes):
+                if not scores:
+                    continue
+                for (position, pair), similarity in zip(candidates, scores):
+                    if similarity is None:
+                        continue
+                    new_verdicts[pair] = similarity
+                    if similarity >= threshold:
+                        results[i].append((existing_questions[position], similarity))
 
-                # Add small delay to pace requests and reduce rate limit hits
-                import asyncio
-                await asyncio.sleep(0.5)
+            await self._store_verdicts(new_verdicts, threshold)
 
-            # Sort by similarity descending
-            similar_questions.sort(key=lambda x: x[1], reverse=True)
+            for i in unchecked:
+                if not results[i]:
+                    results[i] = None
+            for similar_questions in results:
+                if similar_questions:
+                    # Sort by similarity descending
+                    similar_questions.sort(key=lambda x: x[1], reverse=True)
 
-            return similar_questions, None
+            return results, rate_limit_error
 
         except Exception as e:
             error_msg = f"Error detecting similar questions with AI: {e}"
             logger.error(error_msg)
-            return [], error_msg
+            return [[] for _ in new_questions], error_msg
+
+    async def _get_cached_verdicts(
+        self, pairs: List[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], float]:
+        """Cached AI similarity (0.0-1.0) per ordered hash pair, from duplicate_cache"""
+        if not pairs:
+            return {}
+        from db import db
+
+        verdicts = await db.get_duplicate_verdicts(pairs)
+        return {pair: verdict["similarity_score"] / 100 for pair, verdict in verdicts.items()}
+
+    async def _store_verdicts(self, verdicts: Dict[Tuple[str, str], float], threshold: float):
+        """Save new AI similarity verdicts to duplicate_cache"""
+        if not verdicts:
+            return
+        from db import db
+
+        await db.store_duplicate_verdicts(
+            [
+                {
+                    "question1_hash": pair[0],
+                    "question2_hash": pair[1],
+                    "similarity_score": round(similarity * 100, 2),
+                    "is_duplicate": similarity >= threshold,
+                }
+                for pair, similarity in verdicts.items()
+            ]
+        )
 
-    async def _calculate_semantic_similarity(
-        self, q1: Dict[str, Any], q2: Dict[str, Any]
-    ) -> Tuple[float, Optional[str]]:
+    async def _adjudicate_candidates(
+        self, new_question: Dict[str, Any], candidates: List[Dict[str, Any]]
+    ) -> Tuple[List[Optional[float]], Optional[str]]:
         """
-        Use AI to calculate semantic similarity between two questions
-        Returns (score from 0.0 to 1.0, error_message)
+        Use one AI call to rate the semantic similarity of a new question to each of its
+        near-duplicate candidates
+        Returns (score from 0.0 to 1.0 per candidate - None if the AI left it out, error_message)
         error_message is None on success, or a string describing the error
         """
+        no_scores: List[Optional[float]] = [None] * len(candidates)
         try:
-            prompt = f"""Compare these two exam questions and rate their similarity from 0.0 to 1.0.
+            candidate_blocks = "\n\n".join(
+                f"C{n}:\n{q.get('question')}\nChoices: {', '.join(q.get('choices', []))}"
+                for n, q in enumerate(candidates, start=1)
+            )
+            prompt = f"""Compare the new exam question with each candidate question and rate their similarity from 0.0 to 1.0.
 
 Consider:
 - Same topic/concept being tested
@@ -146,16 +328,16 @@ Consider:
 - Overlapping answer choices
 - Different wording but same intent
 
-Question 1:
-{q1.get('question')}
-Choices: {', '.join(q1.get('choices', []))}
+New question:
+{new_question.get('question')}
+Choices: {', '.join(new_question.get('choices', []))}
 
-Question 2:
-{q2.get('question')}
-Choices: {', '.join(q2.get('choices', []))}
+Candidates:
+{candidate_blocks}
 
-Respond with ONLY a number between 0.0 and 1.0, nothing else.
-Examples:
+Respond with ONLY a JSON array, one entry per candidate, nothing else:
+[{{"id": "C1", "similarity": 0.0}}]
+Scale:
 - Exact same: 1.0
 - Very similar (rewording): 0.9-0.95
 - Same topic, different angle: 0.7-0.85
@@ -163,30 +345,42 @@ Examples:
 - Unrelated: 0.0-0.3
 """
 
-            # Use OpenRouterManager with cascading model fallback
-            response = await self.ai._generate_text(prompt, max_tokens=10, temperature=0.1)
-
-            if response and not response.startswith("Error:"):
-                # Extract number from response
-                try:
-                    # Clean the response (remove any extra text)
-                    content = response.strip()
-                    similarity = float(content)
-                    return max(0.0, min(1.0, similarity)), None  # Clamp between 0 and 1
-                except ValueError:
-                    logger.warning(f"Could not parse similarity score: {response}")
-                    return 0.0, None
-            else:
+            # Micro-classification route: fastest/cheapest models, minimal system prompt
+            response = await self.ai._generate_text_with_retry(
+                prompt,
+                max_tokens=40 + 20 * len(candidates),
+                temperature=0.1,
+                task="micro_classification",
+            )
+
+            if not response or response.startswith("Error:"):
                 # Check if it's a rate limit error
                 if response and ("rate limit" in response.lower() or "429" in response):
-                    return 0.0, response
+                    return no_scores, response
                 logger.warning(f"AI returned error: {response}")
-                return 0.0, None
+                return no_scores, None
+
+            json_start = response.find("[")
+            json_end = response.rfind("]") + 1
+            try:
+                if json_start < 0 or json_end <= json_start:
+                    raise ValueError("no JSON array")
+                entries = json.loads(response[json_start:json_end])
+                scores = list(no_scores)
+                for entry in entries:
+                    position = int(str(entry.get("id", "")).strip().upper().lstrip("C")) - 1
+                    if 0 <= position < len(candidates):
+                        # Clamp between 0 and 1
+                        scores[position] = max(0.0, min(1.0, float(entry.get("similarity"))))
+                return scores, None
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning(f"Could not parse similarity scores ({e}): {response}")
+                return no_scores, None
 
         except Exception as e:
             error_msg = f"Error calculating similarity: {e}"
             logger.error(error_msg)
-            return 0.0, error_msg
+            return no_scores, error_msg
 
     def merge_questions_to_pool(
         self,
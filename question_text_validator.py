@@ -8,6 +8,98 @@ from typing import Dict, List, Tuple
 
 logger = logging.getLogger(__name__)
 
+_UNUSUAL_CHARACTERS = re.compile(r'[^\w\s.,!?;:()\[\]{}\'-‑%$€£¥]')
+_INLINE_FLAGS = re.compile(r'\(\?[aiLmsux-]')
+
+
+def required_literal(pattern: str) -> str:
+    """
+    Longest plain-text run that every match of a regex must contain ('' if none can be
+    derived). If it is not in the text, the pattern cannot match there.
+    """
+    if _INLINE_FLAGS.search(pattern):
+        return ''  # e.g. (?i) - a plain substring check would not be equivalent
+    runs = []
+    run = ''
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        literal = None
+        if char == '\\':
+            escaped = pattern[i + 1:i + 2]
+            if depth == 0 and escaped and not escaped.isalnum():
+                literal = escaped  # escaped punctuation, e.g. \*
+            i += 2
+        elif char == '[':
+            # Skip the character class (a leading ] is part of it)
+            i += 2 if pattern[i + 1:i + 2] == '^' else 1
+            if pattern[i:i + 1] == ']':
+                i += 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            i += 1
+        elif char == '(':
+            depth += 1
+            i += 1
+        elif char == ')':
+            depth -= 1
+            i += 1
+        elif char == '|':
+            if depth == 0:
+                return ''  # top-level alternation: nothing is required
+            i += 1
+        else:
+            if depth == 0 and char not in '.^$*+?{}':
+                literal = char
+            i += 1
+
+        quantifier = pattern[i:i + 1]
+        if quantifier == '{':
+            i = pattern.find('}', i) + 1
+        elif quantifier in ('?', '*', '+'):
+            i += 1
+            if pattern[i:i + 1] == '?':
+                i += 1  # lazy quantifier
+
+        if literal is not None and quantifier not in ('?', '*', '{'):
+            run += literal
+            if quantifier == '+':
+                # Repeats of the character may sit between this run and the next
+                runs.append(run)
+                run = literal
+        else:
+            runs.append(run)
+            run = ''
+    runs.append(run)
+    return max(runs, key=len)
+
+
+class CompiledFixRules:
+    """
+    Auto-fix rules compiled once and applied in order - same result as one re.sub per
+    rule, but a rule whose required text is missing is skipped without running its regex
+    (rules without one, like the punctuation fixes, always run)
+    """
+
+    def __init__(self, rules: List[Tuple[str, str, str]]):
+        self.rules = [
+            (re.compile(pattern), replacement, description, required_literal(pattern))
+            for pattern, replacement, description in rules
+        ]
+
+    def apply(self, text: str) -> Tuple[str, List[str]]:
+        """Returns (fixed_text, fixes_applied)"""
+        fixes_applied = []
+        for pattern, replacement, description, required in self.rules:
+            if required and required not in text:
+                continue
+            new_text = pattern.sub(replacement, text)
+            if new_text != text:
+                fixes_applied.append(description)
+                text = new_text
+        return text, fixes_applied
+
 
 class QuestionTextValidator:
     """Validates and fixes corrupted question text"""
@@ -75,10 +167,18 @@ class QuestionTextValidator:
         (lambda text: len(text.strip()) < 15, 'Question text is very short (< 15 chars)'),
 
         # Contains unusual characters (but exclude common ones)
-        (lambda text: bool(re.search(r'[^\w\s.,!?;:()\[\]{}\'-‑%$€£¥]', text)),
-         'Contains unusual characters'),
+        (lambda text: bool(_UNUSUAL_CHARACTERS.search(text)), 'Contains unusual characters'),
     ]
 
+    _fix_rules = None  # AUTO_FIX_PATTERNS compiled on first use
+
+    @classmethod
+    def compiled_fix_rules(cls) -> CompiledFixRules:
+        """AUTO_FIX_PATTERNS compiled once per process"""
+        if cls._fix_rules is None:
+            cls._fix_rules = CompiledFixRules(cls.AUTO_FIX_PATTERNS)
+        return cls._fix_rules
+
     @staticmethod
     def validate_and_fix_question(question_text: str) -> Tuple[str, List[str], List[str]]:
         """
@@ -93,16 +193,12 @@ class QuestionTextValidator:
         if not question_text or not isinstance(question_text, str):
             return question_text, [], ['Question text is empty or invalid']
 
-        fixed_text = question_text
-        fixes_applied = []
         warnings = []
 
         # Apply auto-fixes
-        for pattern, replacement, description in QuestionTextValidator.AUTO_FIX_PATTERNS:
-            new_text = re.sub(pattern, replacement, fixed_text)
-            if new_text != fixed_text:
-                fixes_applied.append(description)
-                fixed_text = new_text
+        fixed_text, fixes_applied = QuestionTextValidator.compiled_fix_rules().apply(
+            question_text
+        )
 
         # Check for warnings
         for check, warning_message in QuestionTextValidator.WARNING_PATTERNS:
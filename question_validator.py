@@ -3,25 +3,59 @@ Question validation module for validating questions before uploading to database
 Can be imported and used by upload scripts.
 """
 
+import hashlib
 import json
+import logging
+import multiprocessing
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Any, Tuple
 
+logger = logging.getLogger(__name__)
+
+# Batches with at least this many unvalidated questions are split across worker processes
+PARALLEL_VALIDATION_THRESHOLD = 2000
+# Validation results kept per process (one upload is validated several times)
+VALIDATION_CACHE_SIZE = 20000
+
 
 class QuestionValidator:
     """Validates question data before database insertion"""
 
-    @staticmethod
-    def validate_question(question: Dict[str, Any]) -> Tuple[bool, List[str]]:
-        """
-        Validate a single question.
-
-        Returns:
-            Tuple of (is_valid, list_of_errors)
-        """
-        errors = []
+    # Case study questions that reference violations/guilt without the case study
+    CASE_STUDY_PATTERNS = [
+        (re.compile(r'\b(?:contravened?|violat(?:ed?|ing))\s+(?:the\s+)?(?:insider\s+trading\s+act|sfa|securities\s+act)'),
+         'references violations without case study'),
+        (re.compile(r'\b(?:is|are|was|were)\s+guilty\s+of\s+(?:insider\s+trading|market\s+manipulation)'),
+         'references guilt determination without case study'),
+        (re.compile(r'\b(?:had|has)\s+(?:contravened?|violat(?:ed?|ing))'),
+         'references past violations without context'),
+    ]
+    # Common test names: Sally, Kelly, Denny, Mary, Bernard, Alfred, Harry, Jeff
+    # Also match "Director X" or "Mr/Ms X" patterns
+    NAME_PATTERN = re.compile(
+        r'\b(?:Sally|Kelly|Denny|Mary|Bernard|Alfred|Harry|Jeff|Director\s+\w+|Mr\.?\s+\w+|Ms\.?\s+\w+|TR\s+\w+)\b',
+        re.IGNORECASE
+    )
+    # "The correct answer is X"
+    STATED_ANSWER_PATTERN = re.compile(r"(?:correct answer|right answer)(?:\s+is|\s*:)\s*([A-D])", re.IGNORECASE)
+    # Red flag phrases that indicate the AI got confused (lowercase)
+    WARNING_PHRASES = [
+        ("does not lead to this answer", "Explanation admits answer doesn't match calculation"),
+        ("doesn't lead to this answer", "Explanation admits answer doesn't match calculation"),
+        ("seems there was an oversight", "Explanation indicates possible error"),
+        ("however, the direct calculation", "Explanation contradicts itself"),
+        ("suggests a need for understanding", "Vague explanation suggesting confusion"),
+        ("might involve a different interpretation", "Explanation is uncertain about answer")
+    ]
+
+    # Content key -> (is_valid, errors), see validate_question
+    _results: Dict[str, Tuple[bool, List[str]]] = {}
 
-        # Normalize field names - support both upload format and database format
+    @staticmethod
+    def _normalize(question: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize field names - support both upload format and database format"""
         normalized = {}
         if 'question' in question:
             normalized['question_text'] = question['question']
@@ -36,6 +70,53 @@ class QuestionValidator:
         normalized['choices'] = question.get('choices')
         normalized['explanation'] = question.get('explanation')
         normalized['scenario'] = question.get('scenario', '')
+        return normalized
+
+    @staticmethod
+    def content_key(question: Dict[str, Any]) -> str:
+        """Hash of everything validation looks at, so re-validating unchanged content is free"""
+        normalized = QuestionValidator._normalize(question)
+        content = repr((
+            normalized.get('question_text'),
+            normalized['choices'],
+            normalized.get('correct_answer'),
+            normalized['explanation'],
+            normalized['scenario'],
+        ))
+        return hashlib.md5(content.encode('utf-8', 'surrogatepass')).hexdigest()
+
+    @staticmethod
+    def clear_cache():
+        """Forget memoized results (call when an upload is finished)"""
+        QuestionValidator._results.clear()
+
+    @staticmethod
+    def validate_question(question: Dict[str, Any]) -> Tuple[bool, List[str]]:
+        """
+        Validate a single question. Results are memoized by content, so the passes of one
+        upload only validate each question once.
+
+        Returns:
+            Tuple of (is_valid, list_of_errors)
+        """
+        key = QuestionValidator.content_key(question)
+        result = QuestionValidator._results.get(key)
+        if result is None:
+            result = QuestionValidator._check_question(question)
+            QuestionValidator._remember(key, result)
+        return result[0], list(result[1])
+
+    @staticmethod
+    def _remember(key: str, result: Tuple[bool, List[str]]):
+        if len(QuestionValidator._results) >= VALIDATION_CACHE_SIZE:
+            QuestionValidator._results.clear()
+        QuestionValidator._results[key] = result
+
+    @staticmethod
+    def _check_question(question: Dict[str, Any]) -> Tuple[bool, List[str]]:
+        """Validate a single question (uncached)"""
+        errors = []
+        normalized = QuestionValidator._normalize(question)
 
         # Check required fields
         required_fields = ['question_text', 'choices', 'correct_answer']
@@ -140,22 +221,10 @@ class QuestionValidator:
         # Look for questions asking "who did/didn't contravene/violate" or "who is/isn't guilty"
         if not has_adequate_scenario:
             # Common patterns in case study questions
-            case_study_patterns = [
-                (r'\b(?:contravened?|violat(?:ed?|ing))\s+(?:the\s+)?(?:insider\s+trading\s+act|sfa|securities\s+act)',
-                 'references violations without case study'),
-                (r'\b(?:is|are|was|were)\s+guilty\s+of\s+(?:insider\s+trading|market\s+manipulation)',
-                 'references guilt determination without case study'),
-                (r'\b(?:had|has)\s+(?:contravened?|violat(?:ed?|ing))',
-                 'references past violations without context'),
-            ]
-
-            for pattern, reason in case_study_patterns:
-                if re.search(pattern, q_lower):
+            for pattern, reason in QuestionValidator.CASE_STUDY_PATTERNS:
+                if pattern.search(q_lower):
                     # Check if the question also mentions multiple specific people (proper names)
-                    # Common test names: Sally, Kelly, Denny, Mary, Bernard, Alfred, Harry, Jeff
-                    # Also match "Director X" or "Mr/Ms X" patterns
-                    name_pattern = r'\b(?:Sally|Kelly|Denny|Mary|Bernard|Alfred|Harry|Jeff|Director\s+\w+|Mr\.?\s+\w+|Ms\.?\s+\w+|TR\s+\w+)\b'
-                    names_found = re.findall(name_pattern, question_text, re.IGNORECASE)
+                    names_found = QuestionValidator.NAME_PATTERN.findall(question_text)
 
                     if len(names_found) >= 1:  # At least one person mentioned
                         errors.append(
@@ -174,23 +243,14 @@ class QuestionValidator:
         errors = []
 
         # Check for red flag phrases that indicate the AI got confused
-        warning_phrases = [
-            ("does not lead to this answer", "Explanation admits answer doesn't match calculation"),
-            ("doesn't lead to this answer", "Explanation admits answer doesn't match calculation"),
-            ("seems there was an oversight", "Explanation indicates possible error"),
-            ("however, the direct calculation", "Explanation contradicts itself"),
-            ("suggests a need for understanding", "Vague explanation suggesting confusion"),
-            ("might involve a different interpretation", "Explanation is uncertain about answer")
-        ]
-
-        for phrase, error_msg in warning_phrases:
-            if phrase.lower() in explanation.lower():
+        explanation_lower = explanation.lower()
+        for phrase, error_msg in QuestionValidator.WARNING_PHRASES:
+            if phrase in explanation_lower:
                 errors.append(f"CRITICAL: {error_msg}")
 
         # Check if explanation explicitly states a different answer
         # Look for "The correct answer is X" where X doesn't match
-        pattern = r"(?:correct answer|right answer)(?:\s+is|\s*:)\s*([A-D])"
-        matches = re.findall(pattern, explanation, re.IGNORECASE)
+        matches = QuestionValidator.STATED_ANSWER_PATTERN.findall(explanation)
 
         for match in matches:
             mentioned_index = ord(match.upper()) - ord('A')
@@ -209,7 +269,8 @@ class QuestionValidator:
     @staticmethod
     def validate_batch(questions: List[Dict[str, Any]], strict: bool = True) -> Tuple[List[Dict], List[Dict]]:
         """
-        Validate a batch of questions.
+        Validate a batch of questions. Questions not validated earlier in the upload are
+        split across worker processes when there are many of them.
 
         Args:
             questions: List of question dictionaries
@@ -221,6 +282,8 @@ class QuestionValidator:
         valid = []
         rejected = []
 
+        QuestionValidator._validate_uncached(questions)
+
         for i, question in enumerate(questions):
             is_valid, errors = QuestionValidator.validate_question(question)
 
@@ -242,6 +305,37 @@ class QuestionValidator:
 
         return valid, rejected
 
+    @staticmethod
+    def _validate_uncached(questions: List[Dict[str, Any]]):
+        """Validate the questions without a memoized result in worker processes"""
+        workers = os.cpu_count() or 1
+        if workers < 2 or len(questions) < PARALLEL_VALIDATION_THRESHOLD:
+            return
+
+        pending = {}
+        for question in questions:
+            key = QuestionValidator.content_key(question)
+            if key not in QuestionValidator._results:
+                pending[key] = question
+        if len(pending) < PARALLEL_VALIDATION_THRESHOLD:
+            return
+
+        keys = list(pending)
+        chunk_size = -(-len(keys) // workers)
+        chunks = [keys[i:i + chunk_size] for i in range(0, len(keys), chunk_size)]
+        try:
+            # spawn: forking the Streamlit server (live threads, torch/EasyOCR loaded) is unsafe
+            with ProcessPoolExecutor(
+                max_workers=len(chunks), mp_context=multiprocessing.get_context('spawn')
+            ) as executor:
+                results = executor.map(_check_questions, [[pending[key] for key in chunk] for chunk in chunks])
+                for chunk, chunk_results in zip(chunks, results):
+                    for key, result in zip(chunk, chunk_results):
+                        QuestionValidator._remember(key, result)
+        except Exception as e:
+            # Questions left unvalidated are validated in this process instead
+            logger.warning(f"Parallel validation failed, validating serially: {e}")
+
     @staticmethod
     def print_validation_report(rejected: List[Dict]):
         """Print a formatted validation report for rejected questions"""
@@ -265,6 +359,11 @@ class QuestionValidator:
             print("-" * 80)
 
 
+def _check_questions(questions: List[Dict[str, Any]]) -> List[Tuple[bool, List[str]]]:
+    """Worker process entry point: uncached validation results of a chunk of questions"""
+    return [QuestionValidator._check_question(question) for question in questions]
+
+
 def validate_question_file(filepath: str, strict: bool = True) -> bool:
     """
     Validate questions from a JSON file.
@@ -3,8 +3,8 @@
 Scan for REAL OCR corruption (not false positives like "a TR")
 """
 import asyncio
-import re
 from db import db
+from ocr_corruption import scan_pool as scan_pool_for_corruption
 
 async def scan_pool():
     """Scan pool for truly corrupted questions"""
@@ -23,66 +23,37 @@ async def scan_pool():
 
     print(f"✅ Found pool: {target_pool['pool_name']} (ID: {target_pool['id']})")
 
-    # Get questions from pool
-    questions = await db.get_pool_questions(target_pool['id'])
-    print(f"\n📊 Total questions in pool: {len(questions)}")
+    # Stream the pool and scan it in worker processes
     print("\n🔍 Scanning for REAL OCR corruption (ignoring false positives)...\n")
+    total_questions, flagged = await scan_pool_for_corruption(target_pool['id'], ("split_words",))
+    print(f"📊 Total questions in pool: {total_questions}\n")
 
     corrupted_questions = []
 
-    # Real corruption patterns (space in middle of recognizable words)
-    corruption_words = [
-        r'\bCharli\s+e\b', r'\bpa\s+rt\b', r'\bma\s+rket\b', r'\btrou\s+ble\b',
-        r'\bsuspicion\s+s\b', r'\bordinar\s+y\b', r'\bfi\s+nancial\b',
-        r'\bgo\s+od\b', r'\bvar\s+ious\b', r'\bn\s+ot\b', r'\borde\s+r\b',
-        r'\bdoe\s+s\b', r'\ballo\s+we\s+d\b', r'\bbasi\s+s\b', r'\brea\s+lized\b',
-        r'\bprofi\s+t\b', r'\bi\s+nvestment\b', r'\bopen\s+a\s+CPF\b',
-        r'\bfo\s+r\b', r'\btha\s+t\b', r'\brequ\s+ires\s+a\b', r'\boffenc\s+e\b',
-        r'\bMembe\s+r\s+w\b', r'\bcor\s+p\s+orate\b', r'\bar\s+e\s+covered\b',
-        r'\bdifferen\s+c\s+e\b', r'\binfor\s+m\s+a\b', r'\brefe\s+r\s+ence\b',
-        r'\bdea\s+ling\b', r'\bdetecte\s+d\b', r'\bsuspect\s+ed\b'
-    ]
+    for result in flagged:
+        question_text = result['question'].get('question_text') or ''
+        corruptions_found = [f"In question: '{match}'" for _, _, match in result['question_hits']]
+        for choice_idx, hits in result['choice_hits'].items():
+            corruptions_found.extend(f"In choice {choice_idx}: '{match}'" for _, _, match in hits)
 
-    for idx, q in enumerate(questions, 1):
-        question_text = q['question_text']
-        choices = q['choices']
-        corruptions_found = []
+        corrupted_questions.append({
+            'id': result['id'],
+            'question': question_text[:100],
+            'corruptions': corruptions_found
+        })
 
-        # Check question text
-        for pattern in corruption_words:
-            if re.search(pattern, question_text, re.IGNORECASE):
-                match = re.search(pattern, question_text, re.IGNORECASE)
-                corruptions_found.append(f"In question: '{match.group()}'")
-
-        # Check choices
-        if isinstance(choices, list):
-            for choice_idx, choice in enumerate(choices):
-                if isinstance(choice, str):
-                    for pattern in corruption_words:
-                        if re.search(pattern, choice, re.IGNORECASE):
-                            match = re.search(pattern, choice, re.IGNORECASE)
-                            corruptions_found.append(f"In choice {choice_idx}: '{match.group()}'")
-
-        # If corruptions found, add to list
-        if corruptions_found:
-            corrupted_questions.append({
-                'id': q['id'],
-                'question': question_text[:100],
-                'corruptions': corruptions_found
-            })
-
-            print(f"{len(corrupted_questions)}. ID: {q['id']}")
-            print(f"   Question: {question_text[:80]}...")
-            for corruption in corruptions_found:
-                print(f"   ⚠️ {corruption}")
-            print()
+        print(f"{len(corrupted_questions)}. ID: {result['id']}")
+        print(f"   Question: {question_text[:80]}...")
+        for corruption in corruptions_found:
+            print(f"   ⚠️ {corruption}")
+        print()
 
     # Summary
     print("="*80)
     print(f"\n📊 Scan Results:")
-    print(f"   Total questions scanned: {len(questions)}")
+    print(f"   Total questions scanned: {total_questions}")
     print(f"   Questions with REAL corruption: {len(corrupted_questions)}")
-    print(f"   Clean questions: {len(questions) - len(corrupted_questions)}")
+    print(f"   Clean questions: {total_questions - len(corrupted_questions)}")
 
     if corrupted_questions:
         # Save IDs to file
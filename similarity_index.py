@@ -0,0 +1,231 @@
+"""
+Near-Duplicate Index for Question Pools
+MinHash signatures over word shingles of each question (stem + choices), bucketed with LSH,
+so the near-duplicates of a question are found among the whole pool without comparing it
+to every existing question (and without an AI call per pair).
+
+- Candidates come from LSH buckets and are ranked by exact Jaccard similarity of their
+  shingle sets
+- Similarity >= NEAR_DUPLICATE_SIMILARITY and the same numbers (same_numbers): same
+  question with trivial differences. Numeric variants of one template and one-word
+  rewordings ("after"/"before") score 0.8-0.9, so anything less similar needs an AI verdict
+- BORDERLINE_SIMILARITY <= similarity < NEAR_DUPLICATE_SIMILARITY: possibly a reworded
+  duplicate - worth asking the AI
+- Below BORDERLINE_SIMILARITY: different questions
+"""
+
+import logging
+import re
+import zlib
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# MinHash permutations = LSH_BANDS * rows per band. 32 bands of 4 rows make pairs with
+# Jaccard similarity >= ~0.4 land in a shared bucket with high probability.
+NUM_PERM = 128
+LSH_BANDS = 32
+SHINGLE_SIZE = 2  # word bigrams
+
+NEAR_DUPLICATE_SIMILARITY = 0.97
+BORDERLINE_SIMILARITY = 0.4
+
+# LSH buckets holding more questions than this (one template filled in with different
+# numbers) are skipped by candidate_pairs - comparing all of their pairs is quadratic
+MAX_BUCKET_SIZE = 50
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+_MASK_64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+_EMPTY_SIGNATURE_VALUE = np.uint64(0xFFFFFFFF)
+
+
+def question_text_for_similarity(question: Dict[str, Any]) -> str:
+    """Question stem plus its choices (order-independent), as compared for near-duplicates"""
+    text = question.get("question") or question.get("question_text") or ""
+    choices = question.get("choices") or []
+    if isinstance(choices, str):
+        choices = [choices]
+    return " ".join([text] + sorted(str(c or "") for c in choices))
+
+
+def shingle_hashes(text: str) -> Set[int]:
+    """32-bit hashes of the word shingles of normalized text"""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {zlib.crc32(word.encode("utf-8")) for word in words}
+    return {
+        zlib.crc32(" ".join(words[i : i + SHINGLE_SIZE]).encode("utf-8"))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def same_numbers(question_a: Dict[str, Any], question_b: Dict[str, Any]) -> bool:
+    """Whether two questions (stem + choices) contain the same numbers"""
+    numbers_a = _NUMBER_PATTERN.findall(question_text_for_similarity(question_a))
+    numbers_b = _NUMBER_PATTERN.findall(question_text_for_similarity(question_b))
+    return sorted(numbers_a) == sorted(numbers_b)
+
+
+def jaccard_similarity(a: Set[int], b: Set[int]) -> float:
+    """Exact Jaccard similarity of two shingle sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class SimilarityIndex:
+    """MinHash/LSH index of questions; keys are chosen by the caller (ids, list positions)"""
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = LSH_BANDS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Multiply-shift hash family: h(x) = ((a * x + b) mod 2^64) >> 32 with odd a
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(bands)]
+        self._shingles: Dict[Hashable, Set[int]] = {}
+        # key -> its bucket key per band (the same bytes objects as in _buckets)
+        self._key_bands: Dict[Hashable, List[bytes]] = {}
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._shingles
+
+    def signature(self, shingles: Set[int]) -> np.ndarray:
+        """MinHash signature (num_perm uint32 values) of a shingle set"""
+        if not shingles:
+            return np.full(self.num_perm, _EMPTY_SIGNATURE_VALUE, dtype=np.uint64)
+        values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        with np.errstate(over="ignore"):
+            hashed = (np.outer(self._a, values) + self._b[:, None]) & _MASK_64
+        return (hashed >> np.uint64(32)).min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[band * self.rows : (band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+    def add(self, key: Hashable, question: Dict[str, Any]):
+        """Index a question under key"""
+        self.add_text(key, question_text_for_similarity(question))
+
+    def add_text(self, key: Hashable, text: str):
+        """Index raw text under key"""
+        shingles = shingle_hashes(text)
+        self._shingles[key] = shingles
+        if not shingles:
+            return
+        band_keys = self._band_keys(self.signature(shingles))
+        self._key_bands[key] = band_keys
+        for band, band_key in enumerate(band_keys):
+            self._buckets[band].setdefault(band_key, []).append(key)
+
+    def query(
+        self,
+        question: Dict[str, Any],
+        top_k: int = 5,
+        min_similarity: float = BORDERLINE_SIMILARITY,
+        exclude: Optional[Hashable] = None,
+    ) -> List[Tuple[Hashable, float]]:
+        """
+        Near-duplicate candidates of a question
+
+        Returns:
+            Up to top_k (key, jaccard_similarity) pairs with similarity >= min_similarity,
+            most similar first
+        """
+        return self.query_text(
+            question_text_for_similarity(question), top_k, min_similarity, exclude
+        )
+
+    def query_text(
+        self,
+        text: str,
+        top_k: int = 5,
+        min_similarity: float = BORDERLINE_SIMILARITY,
+        exclude: Optional[Hashable] = None,
+    ) -> List[Tuple[Hashable, float]]:
+        """Near-duplicate candidates of raw text (see query)"""
+        shingles = shingle_hashes(text)
+        if not shingles:
+            return []
+        return self._rank(shingles, self._candidates(shingles), top_k, min_similarity, exclude)
+
+    def candidate_pairs(
+        self,
+        min_similarity: float = BORDERLINE_SIMILARITY,
+        max_bucket_size: int = MAX_BUCKET_SIZE,
+    ) -> Iterator[Tuple[Hashable, Hashable, float]]:
+        """
+        Every pair of indexed keys sharing an LSH bucket of at most max_bucket_size keys
+        (each pair once), for clustering a whole pool without querying it question by
+        question. Work per key is bounded by bands * max_bucket_size comparisons.
+
+        Yields:
+            (key_a, key_b, jaccard_similarity) with similarity >= min_similarity; key_a was
+            added to the index before key_b
+        """
+        order = {key: position for position, key in enumerate(self._key_bands)}
+        skipped_buckets = 0
+        for key_a, band_keys in self._key_bands.items():
+            position_a = order[key_a]
+            later: Set[Hashable] = set()
+            for band, band_key in enumerate(band_keys):
+                keys = self._buckets[band][band_key]
+                if len(keys) > max_bucket_size:
+                    if keys[0] == key_a:
+                        skipped_buckets += 1
+                    continue
+                later.update(key for key in keys if order[key] > position_a)
+            for key_b in sorted(later, key=order.__getitem__):
+                similarity = jaccard_similarity(self._shingles[key_a], self._shingles[key_b])
+                if similarity >= min_similarity:
+                    yield key_a, key_b, similarity
+        if skipped_buckets:
+            logger.warning(
+                f"Skipped {skipped_buckets} LSH buckets with more than {max_bucket_size} "
+                "questions (templated questions)"
+            )
+
+    def _candidates(self, shingles: Set[int]) -> Set[Hashable]:
+        candidates: Set[Hashable] = set()
+        for band, band_key in enumerate(self._band_keys(self.signature(shingles))):
+            candidates.update(self._buckets[band].get(band_key, ()))
+        return candidates
+
+    def _rank(
+        self,
+        shingles: Set[int],
+        candidates: Iterable[Hashable],
+        top_k: int,
+        min_similarity: float,
+        exclude: Optional[Hashable],
+    ) -> List[Tuple[Hashable, float]]:
+        scored = []
+        for key in candidates:
+            if key == exclude:
+                continue
+            similarity = jaccard_similarity(shingles, self._shingles[key])
+            if similarity >= min_similarity:
+                scored.append((key, similarity))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:top_k]
+
+
+def build_similarity_index(questions: List[Dict[str, Any]]) -> SimilarityIndex:
+    """Index a list of questions, keyed by their position in the list"""
+    index = SimilarityIndex()
+    for position, question in enumerate(questions):
+        index.add(position, question)
+    logger.info(f"Built similarity index over {len(index)} questions")
+    return index
@@ -0,0 +1,145 @@
+"""
+Verdict Cache for MockExamify
+Persists AI verdicts (answer validation, quick validation, AI fixes) on disk so that
+re-opening the AI-fix preview or restarting a background fix job does not re-run the
+LLM on questions that have not changed.
+
+Entries are content-addressed:
+    .cache/verdicts/<text_hash[:2]>/<text_hash>/<kind>__<entry_hash>.json
+
+- text_hash groups every verdict for one question text, so an edit can drop them all
+- entry_hash covers (question_text, choices, correct_answer, model family, call options)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(".cache", "verdicts")
+
+# Columns whose change makes cached verdicts for a question stale
+CONTENT_FIELDS = ("question_text", "choices", "correct_answer")
+
+
+def _get_cache_root() -> str:
+    """Get the verdict cache directory"""
+    return os.path.join(os.getcwd(), CACHE_DIR)
+
+
+def _hash_text(question_text: str) -> str:
+    """Hash of the normalized question text (groups all verdicts for one question)"""
+    normalized = " ".join((question_text or "").split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def get_model_family(model: str) -> str:
+    """
+    Reduce an OpenRouter model id to its family so that tier variants share verdicts
+    e.g. "meta-llama/llama-3.3-70b-instruct:free" -> "meta-llama/llama-3.3-70b-instruct"
+    """
+    return (model or "").split(":", 1)[0]
+
+
+def make_verdict_key(
+    question_text: str,
+    choices: Optional[List[str]],
+    correct_answer: Optional[int],
+    model_family: str,
+    **options: Any,
+) -> str:
+    """Hash of everything that can change a verdict"""
+    payload = json.dumps(
+        {
+            "question_text": question_text or "",
+            "choices": list(choices or []),
+            "correct_answer": correct_answer,
+            "model_family": model_family,
+            "options": options,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _question_dir(question_text: str) -> str:
+    text_hash = _hash_text(question_text)
+    return os.path.join(_get_cache_root(), text_hash[:2], text_hash)
+
+
+def _entry_path(kind: str, question_text: str, key: str) -> str:
+    safe_kind = re.sub(r"[^a-z0-9_]", "_", kind.lower())
+    return os.path.join(_question_dir(question_text), f"{safe_kind}__{key}.json")
+
+
+def get_verdict(kind: str, question_text: str, key: str) -> Optional[Dict[str, Any]]:
+    """Return a cached verdict, or None on a miss"""
+    path = _entry_path(kind, question_text, key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        return entry.get("verdict")
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable verdict cache entry {path}: {e}")
+        return None
+
+
+def store_verdict(kind: str, question_text: str, key: str, verdict: Dict[str, Any]):
+    """Persist a verdict (atomic write, failures are logged and ignored)"""
+    path = _entry_path(kind, question_text, key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_file = f"{path}.{os.getpid()}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "kind": kind,
+                    "cached_at": datetime.now(timezone.utc).isoformat(),
+                    "verdict": verdict,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(temp_file, path)
+    except Exception as e:
+        logger.warning(f"Could not write verdict cache entry: {e}")
+
+
+def invalidate_question(question_text: str) -> bool:
+    """Drop every cached verdict for a question text. Returns True if anything was removed"""
+    question_dir = _question_dir(question_text)
+    if not os.path.isdir(question_dir):
+        return False
+    shutil.rmtree(question_dir, ignore_errors=True)
+    logger.info(f"Invalidated cached verdicts for question ({os.path.basename(question_dir)[:12]})")
+    return True
+
+
+def invalidate_on_edit(client, question_id: str, updated_data: Dict[str, Any]) -> bool:
+    """
+    Invalidate-on-edit hook for update_question helpers.
+    Must be called BEFORE the update so the current (soon stale) content can be read.
+    Only edits that touch question content trigger a lookup.
+    """
+    if not any(field in updated_data for field in CONTENT_FIELDS):
+        return False
+    try:
+        response = (
+            client.table("pool_questions").select("question_text").eq("id", question_id).execute()
+        )
+        if not response.data:
+            return False
+        return invalidate_question(response.data[0].get("question_text") or "")
+    except Exception as e:
+        logger.warning(f"Could not invalidate cached verdicts for {question_id}: {e}")
+        return False